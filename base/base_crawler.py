@@ -17,11 +17,29 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 
+import httpx
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
+import config
+from proxy.proxy_ip_pool import ProxyIpPool, get_httpx_proxy_url
+from tools import utils
+from tools.http_client import RequestLatencyStats, create_async_http_client
+from tools.media_downloader import segmented_download, stream_download
+from tools.rate_limiter import (
+    ENDPOINT_DETAIL,
+    ENDPOINT_MEDIA,
+    get_media_rate_limit_platform,
+    get_rate_limiter,
+    parse_retry_after,
+)
+from tools.retry_policy import get_retry_stats, wait_host_available
+
 
 class AbstractCrawler(ABC):
 
@@ -93,12 +111,53 @@ class AbstractStore(ABC):
     async def store_comment(self, comment_item: Dict):
         pass
 
+    async def store_contents(self, content_items: List[Dict]):
+        """
+        批量存储内容，默认逐条调用 store_content，支持批量写入的存储方式可以覆盖该方法
+        :param content_items:
+        :return:
+        """
+        for content_item in content_items:
+            await self.store_content(content_item)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        批量存储一页评论，默认逐条调用 store_comment，支持批量写入的存储方式可以覆盖该方法
+        :param comment_items:
+        :return:
+        """
+        for comment_item in comment_items:
+            await self.store_comment(comment_item)
+
     # TODO support all platform
     # only xhs is supported, so @abstractmethod is commented
     @abstractmethod
     async def store_creator(self, creator: Dict):
         pass
 
+    async def store_creators(self, creators: List[Dict]):
+        """
+        批量存储创作者，默认逐条调用 store_creator
+        :param creators:
+        :return:
+        """
+        for creator in creators:
+            await self.store_creator(creator)
+
+    async def flush(self):
+        """
+        把存储缓冲的数据写入文件/数据库，运行结束时由 store.close_stores 调用
+        :return:
+        """
+        pass
+
+    async def close(self):
+        """
+        释放存储持有的资源，运行结束时在 flush 之后调用
+        :return:
+        """
+        pass
+
 
 class AbstractStoreImage(ABC):
     # TODO: support all platform
@@ -117,6 +176,14 @@ class AbstractStoreVideo(ABC):
 
 
 class AbstractApiClient(ABC):
+    # 请求限速使用的平台名称，与 config.PLATFORM 一致
+    platform: str = ""
+    # (url 片段, 接口类型)，send_request 按顺序匹配请求地址得到限速的接口类型，都不匹配时按 detail 限速
+    endpoint_classes: List[Tuple[str, str]] = []
+    # 表示被封禁或需要验证码的响应状态码，send_request 收到时减小该平台的并发数和速率
+    block_status_codes: Tuple[int, ...] = (429,)
+    # IP代理池，开启 ENABLE_IP_PROXY 时由爬虫设置，请求被封禁或代理快过期时自动换新代理
+    ip_pool: Optional[ProxyIpPool] = None
 
     @abstractmethod
     async def request(self, method, url, **kwargs):
@@ -125,3 +192,248 @@ class AbstractApiClient(ABC):
     @abstractmethod
     async def update_cookies(self, browser_context: BrowserContext):
         pass
+
+    @property
+    def latency_stats(self) -> RequestLatencyStats:
+        if "_latency_stats" not in self.__dict__:
+            self._latency_stats = RequestLatencyStats()
+        return self._latency_stats
+
+    def get_http_client(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        获取长连接复用的 httpx 客户端，同一个代理地址共享一个连接池
+        :param proxy: 代理地址，为空时使用客户端自身的 proxy 属性
+        :return:
+        """
+        proxy = proxy or getattr(self, "proxy", None)
+        http_clients: Dict[Optional[str], httpx.AsyncClient] = self.__dict__.setdefault("_http_clients", {})
+        http_client = http_clients.get(proxy)
+        if http_client is None or http_client.is_closed:
+            http_client = create_async_http_client(proxy=proxy, timeout=getattr(self, "timeout", 10))
+            http_clients[proxy] = http_client
+            if self.ip_pool and proxy:
+                # 代理被剔除后关闭它的连接池，轮换代理时不会一直占用连接
+                self.ip_pool.add_evict_listener(self._close_evicted_http_client)
+        return http_client
+
+    def _close_evicted_http_client(self, proxy: str) -> None:
+        """
+        代理被剔除时的回调：丢弃该代理对应的连接池并在后台关闭，close 时等待关闭完成
+        :param proxy: 被剔除的 httpx 代理地址
+        :return:
+        """
+        http_client = self.__dict__.get("_http_clients", {}).pop(proxy, None)
+        if http_client is None or http_client.is_closed:
+            return
+        closing_tasks: Set[asyncio.Task] = self.__dict__.setdefault("_closing_http_clients", set())
+        task = asyncio.create_task(http_client.aclose())
+        closing_tasks.add(task)
+        task.add_done_callback(closing_tasks.discard)
+
+    def classify_endpoint(self, url: str, **kwargs) -> str:
+        """
+        获取请求对应的限速接口类型
+        :param url: 请求地址
+        :param kwargs: 请求参数，请求地址无法区分接口时（例如 graphql）子类可以根据请求参数判断
+        :return:
+        """
+        for url_part, endpoint_class in self.endpoint_classes:
+            if url_part in url:
+                return endpoint_class
+        return ENDPOINT_DETAIL
+
+    async def wait_rate_limit(self, endpoint_class: str) -> None:
+        """
+        获取一个请求令牌，超过该平台该类接口的限速时等待，不经过 send_request 的请求（例如浏览器访问页面）需要自行调用
+        :param endpoint_class: 接口类型
+        :return:
+        """
+        await get_rate_limiter().acquire(self.rate_limit_platform, endpoint_class)
+
+    @property
+    def rate_limit_platform(self) -> str:
+        return self.platform or self.__class__.__name__
+
+    def report_blocked(
+        self, response: Optional[httpx.Response] = None, rate_limit_platform: Optional[str] = None
+    ) -> None:
+        """
+        上报被封禁或出现验证码，减小该平台的并发数和速率，并暂停请求直到 Retry-After（没有时暂停 ADAPTIVE_BLOCK_PAUSE_SEC 秒）
+        使用代理池时同时剔除该请求使用的代理，下一次请求换新代理
+        状态码无法区分的封禁（例如响应内容为 blocked）由子类在解析响应时调用
+        :param response: 对应的响应，用于读取 Retry-After 和该请求使用的代理
+        :param rate_limit_platform: 上报的限速平台名称，为空时使用 rate_limit_platform
+        :return:
+        """
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        get_rate_limiter().record_block(rate_limit_platform or self.rate_limit_platform, retry_after)
+        proxy = response.extensions.get("proxy") if response is not None else getattr(self, "proxy", None)
+        if self.ip_pool and proxy:
+            self.ip_pool.report_blocked(proxy)
+
+    def report_error(
+        self, response: Optional[httpx.Response] = None, rate_limit_platform: Optional[str] = None
+    ) -> None:
+        """
+        上报一次失败的请求，错误率超过 ADAPTIVE_ERROR_RATE_THRESHOLD 时减小该平台的并发数和速率
+        :param response: 对应的响应，用于读取 Retry-After
+        :param rate_limit_platform: 上报的限速平台名称，为空时使用 rate_limit_platform
+        :return:
+        """
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        get_rate_limiter().record_error(rate_limit_platform or self.rate_limit_platform, retry_after)
+
+    def check_response_health(self, response: httpx.Response, rate_limit_platform: Optional[str] = None) -> None:
+        """
+        根据响应状态码上报请求结果
+        :param response:
+        :param rate_limit_platform: 上报的限速平台名称，为空时使用 rate_limit_platform
+        :return:
+        """
+        if response.status_code in self.block_status_codes:
+            self.report_blocked(response, rate_limit_platform)
+        elif response.status_code >= 500:
+            self.report_error(response, rate_limit_platform)
+        else:
+            get_rate_limiter().record_success(rate_limit_platform or self.rate_limit_platform)
+
+    async def lease_proxy(self) -> Optional[str]:
+        """
+        获取本次请求使用的代理：PROXY_LEASE_MODE 为 request 时每次请求从代理池选健康分最高的代理
+        为 session 时一直使用当前代理，直到它被剔除（被封禁、连续失败）或快要过期才换新代理
+        :return: httpx 代理地址
+        """
+        if not self.ip_pool:
+            return getattr(self, "proxy", None)
+        if config.PROXY_LEASE_MODE == "request":
+            return get_httpx_proxy_url(await self.ip_pool.get_proxy())
+        current_proxy = getattr(self, "proxy", None)
+        if current_proxy and self.ip_pool.is_usable(current_proxy):
+            return current_proxy
+        self.proxy = get_httpx_proxy_url(await self.ip_pool.get_proxy())
+        utils.logger.info(f"[{self.__class__.__name__}.lease_proxy] switch to new proxy from ip pool")
+        return self.proxy
+
+    async def send_request(
+        self, method: str, url: str, proxy: Optional[str] = None, endpoint_class: Optional[str] = None, **kwargs
+    ) -> httpx.Response:
+        """
+        等待域名熔断结束、按限速获取令牌和并发名额后通过连接池发送请求，记录接口耗时并按状态码上报请求结果
+        :param method: 请求方法
+        :param url: 请求地址
+        :param proxy: 代理地址，为空时按 lease_proxy 获取
+        :param endpoint_class: 限速的接口类型，为空时按 classify_endpoint 判断
+        :param kwargs: 其他 httpx 请求参数
+        :return:
+        """
+        await wait_host_available(urlparse(url).netloc)
+        await self.wait_rate_limit(endpoint_class or self.classify_endpoint(url, **kwargs))
+        proxy = proxy or await self.lease_proxy()
+        kwargs.setdefault("timeout", getattr(self, "timeout", 10))
+        async with get_rate_limiter().concurrency_slot(self.rate_limit_platform):
+            begin = time.perf_counter()
+            try:
+                if config.ENABLE_HTTP_CONNECTION_POOL:
+                    response = await self.get_http_client(proxy).request(method, url, **kwargs)
+                else:
+                    async with httpx.AsyncClient(proxy=proxy) as client:
+                        response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                self.report_error()
+                if self.ip_pool and proxy and isinstance(e, httpx.TransportError):
+                    self.ip_pool.report_failure(proxy)
+                raise
+        elapsed = time.perf_counter() - begin
+        self.latency_stats.record(method, url, elapsed)
+        # 记录该请求使用的代理，解析响应时发现被封禁可以剔除对应的代理
+        response.extensions["proxy"] = proxy
+        if self.ip_pool and proxy and response.status_code not in self.block_status_codes:
+            self.ip_pool.report_success(proxy, elapsed)
+        self.check_response_health(response)
+        return response
+
+    async def _download_with_proxy(
+        self,
+        url: str,
+        download: Callable[
+            [httpx.AsyncClient, Callable[[httpx.Response], None], Callable[[httpx.TransportError], None]],
+            Awaitable[bool],
+        ],
+    ) -> bool:
+        """
+        媒体下载和 send_request 一样等待域名熔断结束、按限速获取令牌并租用代理
+        CDN 的响应按 get_media_rate_limit_platform 单独上报，不影响该平台接口的限速；
+        只有网络错误和封禁状态码计入代理失败，过期的媒体地址返回 403/404 等不剔除代理
+        :param url: 媒体文件地址
+        :param download: 下载函数，参数为该代理的连接池、收到响应头后的回调和网络错误的回调
+        :return: 是否下载成功
+        """
+        media_rate_limit_platform = get_media_rate_limit_platform(self.rate_limit_platform)
+        await wait_host_available(urlparse(url).netloc)
+        await get_rate_limiter().acquire(media_rate_limit_platform, ENDPOINT_MEDIA)
+        proxy = await self.lease_proxy()
+
+        def on_response(response: httpx.Response) -> None:
+            response.extensions["proxy"] = proxy
+            self.check_response_health(response, media_rate_limit_platform)
+
+        def on_transport_error(exc: httpx.TransportError) -> None:
+            get_rate_limiter().record_error(media_rate_limit_platform)
+            if self.ip_pool and proxy:
+                self.ip_pool.report_failure(proxy)
+
+        success = await download(self.get_http_client(proxy), on_response, on_transport_error)
+        if success and self.ip_pool and proxy:
+            # 下载耗时取决于文件大小，不计入代理延迟
+            self.ip_pool.report_success(proxy)
+        return success
+
+    async def download_media(self, url: str, save_path: str, headers: Optional[Dict] = None) -> bool:
+        """
+        流式下载媒体文件到本地路径，支持断点续传
+        :param url: 媒体文件地址
+        :param save_path: 保存路径
+        :param headers: 请求头
+        :return: 是否下载成功
+        """
+        return await self._download_with_proxy(
+            url,
+            lambda http_client, on_response, on_transport_error: stream_download(
+                http_client, url, save_path, headers=headers,
+                on_response=on_response, on_transport_error=on_transport_error,
+            ),
+        )
+
+    async def download_large_media(
+        self, url: str, save_path: str, headers: Optional[Dict] = None, total_size: Optional[int] = None
+    ) -> bool:
+        """
+        多分段并发下载大文件（长视频），每个分段单独重试和续传
+        :param url: 媒体文件地址
+        :param save_path: 保存路径
+        :param headers: 请求头
+        :param total_size: 已知的文件大小，为None时先探测
+        :return: 是否下载成功
+        """
+        return await self._download_with_proxy(
+            url,
+            lambda http_client, on_response, on_transport_error: segmented_download(
+                http_client, url, save_path, headers=headers, total_size=total_size,
+                on_response=on_response, on_transport_error=on_transport_error,
+            ),
+        )
+
+    async def close(self):
+        """
+        关闭连接池并输出接口耗时统计、重试统计和自适应限速的当前状态
+        :return:
+        """
+        http_clients: Dict[Optional[str], httpx.AsyncClient] = self.__dict__.pop("_http_clients", {})
+        for http_client in http_clients.values():
+            await http_client.aclose()
+        await asyncio.gather(*self.__dict__.pop("_closing_http_clients", set()))
+        if config.ENABLE_REQUEST_LATENCY_STATS:
+            self.latency_stats.log_summary(self.__class__.__name__)
+        get_retry_stats().log_summary()
+        if config.ENABLE_ADAPTIVE_RATE_LIMIT:
+            get_rate_limiter().log_metrics(self.rate_limit_platform)
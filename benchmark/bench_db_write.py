@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmark/bench_db_write.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 数据库写入吞吐量：多个并发写入任务通过 DouyinDbStoreImplement.store_comment 逐条写入评论，输出每秒写入条数
+#            sqlite 对比默认的 rollback journal（DELETE + FULL）与 WAL + NORMAL，mysql 使用 config/db_config.py 中的连接池配置
+#            运行方式（项目根目录）: python -m benchmark.bench_db_write --db sqlite --items 2000
+#                                   python -m benchmark.bench_db_write --db mysql --items 2000（需要可连接的 mysql）
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# 将项目根目录添加到 sys.path，直接运行脚本（python benchmark/bench_db_write.py）时也能导入项目模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from config.db_config import sqlite_db_config
+from database.db_session import create_tables, dispose_engines
+from store.douyin import DouyinDbStoreImplement
+from tools import utils
+
+
+def build_comment(index: int) -> dict:
+    return {
+        "comment_id": 7300000000000000000 + index,
+        "aweme_id": 7000000000000000000 + index % 50,
+        "create_time": 1700000000 + index,
+        "user_id": str(index % 100),
+        "nickname": f"user_{index % 100}",
+        "content": "评论内容" * 20,
+        "sub_comment_count": "0",
+        "like_count": str(index),
+    }
+
+
+async def bench(db_type: str, items: int, concurrency: int) -> float:
+    await create_tables(db_type)
+    store = DouyinDbStoreImplement()
+    queue = asyncio.Queue()
+    for index in range(items):
+        queue.put_nowait(index)
+
+    async def writer():
+        while not queue.empty():
+            await store.store_comment(build_comment(queue.get_nowait()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[writer() for _ in range(concurrency)])
+    rate = items / (time.perf_counter() - start)
+    await dispose_engines()
+    return rate
+
+
+async def run(db_type: str, items: int):
+    utils.logger.setLevel(logging.WARNING)
+    config.SAVE_DATA_OPTION = db_type
+    if db_type == "sqlite":
+        modes = (("rollback journal", "DELETE", "FULL"), ("WAL", "WAL", "NORMAL"))
+    else:
+        modes = (("pooled", None, None),)
+    for concurrency in (1, 4, 16):
+        for name, journal_mode, synchronous in modes:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                if db_type == "sqlite":
+                    sqlite_db_config.update(
+                        db_path=os.path.join(temp_dir, "bench.db"), journal_mode=journal_mode, synchronous=synchronous
+                    )
+                rate = await bench(db_type, items, concurrency)
+            print(f"{db_type} concurrency={concurrency:<3} {name:<17} {rate:8.1f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", choices=["sqlite", "mysql"], default="sqlite", help="数据库类型")
+    parser.add_argument("--items", type=int, default=2000, help="每种配置写入的评论条数")
+    args = parser.parse_args()
+    asyncio.run(run(args.db, args.items))
+
+
+if __name__ == "__main__":
+    main()
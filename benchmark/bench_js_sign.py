@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmark/bench_js_sign.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : JS 签名吞吐量对比：execjs（每次调用新起 node 进程） vs 常驻 node 签名进程池
+#            运行方式（项目根目录）: python -m benchmark.bench_js_sign --count 200
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import execjs
+
+# 将项目根目录添加到 sys.path，直接运行脚本（python benchmark/bench_js_sign.py）时也能导入项目模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.js_sign_pool import JsSignWorkerPool
+
+SIGN_PARAMS = "device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7525082444551310602"
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+
+def bench_execjs(count: int) -> float:
+    with open("libs/douyin.js", encoding="utf-8-sig") as f:
+        ctx = execjs.compile(f.read())
+    start = time.perf_counter()
+    for _ in range(count):
+        ctx.call("sign_datail", SIGN_PARAMS, USER_AGENT)
+    return count / (time.perf_counter() - start)
+
+
+async def bench_worker_pool(count: int, pool_size: int) -> float:
+    pool = JsSignWorkerPool("libs/douyin.js", size=pool_size)
+    # 预热，排除 worker 进程启动的耗时
+    await asyncio.gather(*[pool.call("sign_datail", SIGN_PARAMS, USER_AGENT) for _ in range(pool_size)])
+    start = time.perf_counter()
+    await asyncio.gather(*[pool.call("sign_datail", SIGN_PARAMS, USER_AGENT) for _ in range(count)])
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=200, help="每种方式的签名次数")
+    parser.add_argument("--pool_sizes", type=str, default="1,2,4", help="要测试的 worker 数量，逗号分隔")
+    args = parser.parse_args()
+
+    print(f"execjs ({execjs.get().name}): {bench_execjs(args.count):.1f} signs/sec")
+    for pool_size in [int(size) for size in args.pool_sizes.split(",")]:
+        rate = asyncio.run(bench_worker_pool(args.count, pool_size))
+        print(f"node worker pool (size={pool_size}): {rate:.1f} signs/sec")
+
+
+if __name__ == "__main__":
+    main()
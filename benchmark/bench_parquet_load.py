@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmark/bench_parquet_load.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 分析侧加载耗时：同一批评论分别保存为 json 数组、csv 和 parquet 数据集，对比文件大小和加载为 pandas DataFrame 的耗时
+#            运行方式（项目根目录）: python -m benchmark.bench_parquet_load --items 200000（需要安装 pyarrow）
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+# 将项目根目录添加到 sys.path，直接运行脚本（python benchmark/bench_parquet_load.py）时也能导入项目模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import utils
+from tools.csv_writer import BufferedCsvWriter
+from tools.parquet_writer import ParquetDatasetWriter, ensure_pyarrow_available
+
+
+def build_comment(index: int) -> dict:
+    return {
+        "comment_id": str(7300000000000000000 + index),
+        "aweme_id": str(7000000000000000000 + index % 500),
+        "create_time": 1700000000 + index,
+        "user_id": str(index % 1000),
+        "nickname": f"user_{index % 1000}",
+        "content": "评论内容" * 20,
+        "sub_comment_count": index % 7,
+        "like_count": index,
+        "ip_location": ["北京", "上海", "广东"][index % 3],
+        "last_modify_ts": 1700000000000 + index,
+    }
+
+
+def get_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+async def write_all(temp_dir: str, comments: list) -> dict:
+    json_path = os.path.join(temp_dir, "comments.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(comments, f, ensure_ascii=False, indent=4)
+
+    csv_path = os.path.join(temp_dir, "comments.csv")
+    csv_writer = BufferedCsvWriter(csv_path)
+    for comment in comments:
+        await csv_writer.append(comment)
+    await csv_writer.close()
+
+    parquet_dir = os.path.join(temp_dir, "comments")
+    parquet_writer = ParquetDatasetWriter(parquet_dir)
+    for comment in comments:
+        await parquet_writer.append(comment)
+    await parquet_writer.close()
+    return {"json": json_path, "csv": csv_path, "parquet": parquet_dir}
+
+
+def load_json(path: str) -> pd.DataFrame:
+    with open(path, "r", encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f))
+
+
+LOADERS = {
+    "json": load_json,
+    "csv": lambda path: pd.read_csv(path, encoding="utf-8-sig"),
+    "parquet": pd.read_parquet,
+}
+
+
+def run(items: int):
+    ensure_pyarrow_available()
+    utils.logger.setLevel(logging.WARNING)
+    comments = [build_comment(index) for index in range(items)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = asyncio.run(write_all(temp_dir, comments))
+        for name, path in paths.items():
+            start = time.perf_counter()
+            data_frame = LOADERS[name](path)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} size={get_size(path) / 1024 / 1024:8.1f} MB  load={elapsed:6.2f} s  rows={len(data_frame)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200000, help="评论条数")
+    args = parser.parse_args()
+    run(args.items)
+
+
+if __name__ == "__main__":
+    main()
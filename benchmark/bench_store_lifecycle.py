@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmark/bench_store_lifecycle.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 存储实例生命周期回归测试：每条数据新建一个存储实例 vs 整个运行共用一个存储实例
+#            在临时目录中按 json/csv 存储方式连续写入数据，分段输出每条数据的平均耗时，共用实例时耗时不应随输出文件增大而增长
+#            运行方式（项目根目录）: python -m benchmark.bench_store_lifecycle --items 5000 --blocks 5
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+# 将项目根目录添加到 sys.path，直接运行脚本（python benchmark/bench_store_lifecycle.py）时也能导入项目模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from base.base_crawler import AbstractStore
+from store import close_stores, open_store
+from store.douyin import DouyinCsvStoreImplement, DouyinJsonStoreImplement
+from tools.csv_writer import close_csv_writers
+from tools.jsonl_writer import close_jsonl_writers
+from tools import utils
+from tools.seen_index import close_seen_indexes
+
+
+def build_aweme(index: int) -> dict:
+    return {
+        "aweme_id": str(7000000000000000000 + index),
+        "aweme_type": "0",
+        "title": f"benchmark aweme {index} " + "描述" * 50,
+        "desc": "描述" * 50,
+        "create_time": 1700000000 + index,
+        "user_id": str(index % 100),
+        "nickname": f"user_{index % 100}",
+        "liked_count": str(index),
+        "comment_count": "0",
+        "aweme_url": f"https://www.douyin.com/video/{index}",
+    }
+
+
+async def bench(get_store: Callable[[], AbstractStore], items: int, blocks: int) -> List[float]:
+    """
+    连续写入 items 条数据，返回每一段的单条平均耗时（微秒）
+    """
+    block_size = items // blocks
+    per_item_us = []
+    for block in range(blocks):
+        start = time.perf_counter()
+        for index in range(block * block_size, (block + 1) * block_size):
+            await get_store().store_content(build_aweme(index))
+        per_item_us.append((time.perf_counter() - start) / block_size * 1e6)
+    await close_stores()
+    await close_jsonl_writers(export_json=False)
+    await close_csv_writers()
+    close_seen_indexes()
+    return per_item_us
+
+
+async def run(items: int, blocks: int):
+    # 每条数据的 INFO 日志会掩盖存储本身的耗时
+    utils.logger.setLevel(logging.WARNING)
+    # 直接测存储本身的写入耗时，不经过写入队列
+    config.ENABLE_STORE_WRITE_BEHIND = False
+    cwd = os.getcwd()
+    for save_option, store_class in (("json", DouyinJsonStoreImplement), ("csv", DouyinCsvStoreImplement)):
+        config.SAVE_DATA_OPTION = save_option
+        for name, get_store in (
+                ("store per item", store_class),
+                ("one store per run", lambda: open_store("douyin", store_class)),
+        ):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                os.chdir(temp_dir)
+                try:
+                    per_item_us = await bench(get_store, items, blocks)
+                finally:
+                    os.chdir(cwd)
+            blocks_text = "  ".join(f"{us:8.1f}" for us in per_item_us)
+            print(f"{save_option:<5} {name:<18} us/item per {items // blocks} items: {blocks_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5000, help="每种方式写入的数据条数")
+    parser.add_argument("--blocks", type=int, default=5, help="分成多少段统计耗时")
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.blocks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/benchmark/bench_tieba_client.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 贴吧客户端吞吐量对比：线程池中一次性的 requests 请求 vs httpx 长连接池
+#            对本地模拟服务按并发 1/4/16 请求页面，输出每秒页面数
+#            运行方式（项目根目录）: python -m benchmark.bench_tieba_client --pages 200 --latency_ms 20
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+# 将项目根目录添加到 sys.path，直接运行脚本（python benchmark/bench_tieba_client.py）时也能导入项目模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from media_platform.tieba.client import BaiduTieBaClient
+from tools import rate_limiter
+
+PAGE_CONTENT = ("<html><body>" + "<div class='s_post'>tieba note</div>" * 2000 + "</body></html>").encode()
+
+
+class MockTiebaServer:
+    """本地 HTTP/1.1 keep-alive 服务，模拟贴吧页面的响应延迟"""
+
+    def __init__(self, latency_ms: int):
+        self.latency = latency_ms / 1000
+        self.url = ""
+        self.connection_count = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connection_count += 1
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                await asyncio.sleep(self.latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                    + f"Content-Length: {len(PAGE_CONTENT)}\r\n\r\n".encode()
+                    + PAGE_CONTENT
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _requests_get(url: str, headers):
+    """改造前的实现：每次请求都在线程池里调用一次性的 requests.request"""
+    return requests.request(method="GET", url=url, headers=headers, proxies=None, timeout=10).text
+
+
+async def bench_requests_thread(server: MockTiebaServer, pages: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"User-Agent": "benchmark"}
+
+    async def fetch(page: int):
+        async with semaphore:
+            await asyncio.to_thread(_requests_get, f"{server.url}/f?kw=test&pn={page}", headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(page) for page in range(pages)])
+    return pages / (time.perf_counter() - start)
+
+
+async def bench_pooled_client(server: MockTiebaServer, pages: int, concurrency: int) -> float:
+    client = BaiduTieBaClient(headers={"User-Agent": "benchmark"})
+    client._host = server.url
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page: int):
+        async with semaphore:
+            await client.get("/f", params={"kw": "test", "pn": page}, return_ori_content=True)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(page) for page in range(pages)])
+    rate = pages / (time.perf_counter() - start)
+    await client.close()
+    return rate
+
+
+def disable_rate_limits():
+    """对比的是连接复用的吞吐量，关闭请求限速和自适应并发，否则结果只反映 RATE_LIMITS 配置的速率"""
+    config.PLATFORM_RATE_LIMITS = {}
+    config.ENABLE_ADAPTIVE_RATE_LIMIT = False
+    config.RATE_LIMITS = {rate_limiter.ENDPOINT_DETAIL: {"rate": 0}}
+    # 丢弃按原配置创建的令牌桶
+    rate_limiter._rate_limiter = None
+
+
+async def run(pages: int, latency_ms: int):
+    disable_rate_limits()
+    for concurrency in (1, 4, 16):
+        for name, bench in (("requests + to_thread", bench_requests_thread), ("httpx pooled", bench_pooled_client)):
+            server = MockTiebaServer(latency_ms)
+            await server.start()
+            rate = await bench(server, pages, concurrency)
+            await server.close()
+            print(f"concurrency={concurrency:<3} {name:<22} {rate:8.1f} pages/sec, tcp connections: {server.connection_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200, help="每种方式请求的页面数")
+    parser.add_argument("--latency_ms", type=int, default=20, help="模拟服务端的响应延迟")
+    args = parser.parse_args()
+    asyncio.run(run(args.pages, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
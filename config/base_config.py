@@ -35,6 +35,18 @@ IP_PROXY_POOL_COUNT = 2
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"  # kuaidaili | wandouhttp
 
+# 代理的使用方式：session（一直使用同一个代理，被封禁或快过期时才换新代理）| request（每次请求从代理池选健康分最高的代理）
+PROXY_LEASE_MODE = "session"
+
+# 代理连续多少次网络错误后从代理池剔除，被封禁的代理立即剔除
+PROXY_MAX_CONSECUTIVE_FAILURES = 3
+
+# 代理在过期前多少秒就不再使用并从代理池剔除
+PROXY_EXPIRE_BUFFER_SEC = 60
+
+# 后台检查代理池的间隔（秒），剔除快过期的代理并补充到 IP_PROXY_POOL_COUNT 个
+PROXY_REFRESH_INTERVAL_SEC = 30
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -71,8 +83,57 @@ BROWSER_LAUNCH_TIMEOUT = 60
 # 设置为False可以保持浏览器运行，便于调试
 AUTO_CLOSE_BROWSER = True
 
-# 数据保存类型选项配置,支持四种类型：csv、db、json、sqlite, 最好保存到DB，有排重的功能。
-SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite
+# 数据保存类型选项配置,支持五种类型：csv、db、json、sqlite、parquet, 最好保存到DB，有排重的功能。
+# parquet 为列式存储，适合用 pandas/pyarrow/duckdb 等工具做大数据量分析，需要额外安装 pyarrow 依赖：pip install pyarrow
+SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite or parquet
+
+# json 存储方式下数据先以一行一条的方式追加写入 .jsonl 文件，写入耗时不随数据量增长
+# 追加写入后至少每隔多少秒调用一次 fsync 落盘
+JSONL_FSYNC_INTERVAL_SEC = 5
+
+# 运行结束时是否把 .jsonl 导出为格式化的 .json 数组文件（与旧版本的输出格式一致）
+ENABLE_JSONL_EXPORT_JSON = True
+
+# csv 存储方式下缓冲的行数达到该值时批量写入文件
+CSV_FLUSH_ROWS = 100
+
+# csv 存储方式下距离上次写入超过该秒数时，下一次写入会把缓冲数据一起落盘
+CSV_FLUSH_INTERVAL_SEC = 5
+
+# parquet 存储方式下每个 row group 的行数，缓冲的数据达到该值时写入一个 row group
+# 数据保存在 data/{platform}/parquet/{crawler_type}/{item_type}/ 目录，每个目录是一个 parquet 数据集
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# parquet 文件的压缩算法，zstd | snappy | gzip | none
+PARQUET_COMPRESSION = "zstd"
+
+# 单个 parquet 文件的大小上限（字节），超过后开始写新文件
+PARQUET_MAX_FILE_SIZE = 128 * 1024 * 1024
+
+# 是否开启存储写入队列：爬虫投递数据后立即继续抓取，由后台写入任务批量写入文件/数据库，运行结束或收到中断信号时写完队列中的数据
+ENABLE_STORE_WRITE_BEHIND = True
+
+# 存储写入队列的长度上限，队列满时爬虫投递数据会等待
+STORE_WRITE_QUEUE_SIZE = 1000
+
+# 存储写入队列每批最多写入的数据条数
+STORE_WRITE_BATCH_SIZE = 100
+
+# 写入队列批量写入失败时的重试次数，仍然失败的数据不会记录到已爬取索引，断点续爬时重新爬取
+STORE_WRITE_MAX_RETRIES = 3
+
+# 写入队列批量写入失败后重试的等待时间（秒），第n次重试等待n倍
+STORE_WRITE_RETRY_WAIT_SEC = 1
+
+# 是否开启已爬取索引（断点续爬），对所有平台和所有存储方式生效，索引保存在 data/{platform}/seen_index.db
+# 开启后已经爬取过的帖子/视频不再请求详情，已经爬取过评论的帖子/视频不再请求评论
+ENABLE_SEEN_INDEX = True
+
+# 已爬取索引前置布隆过滤器的容量，超过容量后误判率上升（只影响速度，不影响结果），设置为0表示不使用布隆过滤器
+SEEN_INDEX_BLOOM_CAPACITY = 1000000
+
+# 已爬取索引布隆过滤器的误判率
+SEEN_INDEX_BLOOM_ERROR_RATE = 0.01
 
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
@@ -117,8 +178,128 @@ STOP_WORDS_FILE = "./docs/hit_stopwords.txt"
 # 中文字体文件路径
 FONT_PATH = "./docs/STZHONGS.TTF"
 
-# 爬取间隔时间
-CRAWLER_MAX_SLEEP_SEC = 15
+# ==================== 请求限速配置 ====================
+# 所有请求按 平台 + 接口类型 分别用令牌桶限速：请求前先获取令牌，令牌不足时等待，不再在每次请求后固定休眠
+# 接口类型：search（搜索和列表分页，包括创作者主页的作品列表）| detail（帖子/视频/创作者详情）| comments（评论分页）| media（图片/视频下载）
+# rate 为每秒补充的令牌数，即长期平均每秒请求数，设置为0表示不限速；burst 为令牌桶容量，即允许连续突发的请求数
+# 爬取速度由这里的速率决定，MAX_CONCURRENCY_NUM 只决定在速率允许的范围内同时进行的请求数
+RATE_LIMITS = {
+    "search": {"rate": 0.1, "burst": 1},
+    "detail": {"rate": 0.2, "burst": 2},
+    "comments": {"rate": 0.2, "burst": 2},
+    "media": {"rate": 2, "burst": 4},
+}
+
+# 按平台覆盖上面的限速配置，平台名称与 PLATFORM 一致，例如 {"xhs": {"detail": {"rate": 0.1, "burst": 1}}}
+PLATFORM_RATE_LIMITS = {}
+
+# 需要排队等待令牌的请求额外随机等待 0 ~ RATE_LIMIT_JITTER / rate 秒，避免请求间隔过于规律
+RATE_LIMIT_JITTER = 0.5
+
+# ==================== 自适应限速配置 ====================
+# 是否根据平台的响应自动调整并发数和速率（AIMD）：响应正常时逐步加大，遇到封禁/验证码或错误率升高时成倍减小
+# 开启后每个平台同时进行的请求数从1开始，逐步增大到 MAX_CONCURRENCY_NUM；令牌桶的实际速率为 RATE_LIMITS 中的速率乘以速率倍数
+ENABLE_ADAPTIVE_RATE_LIMIT = True
+
+# 连续多少个请求正常时，并发数加1、速率倍数加 ADAPTIVE_RATE_INCREASE_STEP
+ADAPTIVE_INCREASE_INTERVAL = 20
+
+# 速率倍数每次增加的步长
+ADAPTIVE_RATE_INCREASE_STEP = 0.1
+
+# 速率倍数的上下限，上限控制最多能比 RATE_LIMITS 配置的速率快多少
+ADAPTIVE_MAX_RATE_FACTOR = 2.0
+ADAPTIVE_MIN_RATE_FACTOR = 0.1
+
+# 遇到封禁/验证码或错误率超过阈值时，并发数和速率倍数乘以该系数
+ADAPTIVE_DECREASE_FACTOR = 0.5
+
+# 统计错误率的最近请求数，以及触发减小的错误率阈值
+ADAPTIVE_ERROR_WINDOW = 20
+ADAPTIVE_ERROR_RATE_THRESHOLD = 0.3
+
+# 两次减小之间的最短间隔（秒），避免同一批并发请求同时失败时被连续减小多次
+ADAPTIVE_DECREASE_COOLDOWN_SEC = 10
+
+# 遇到封禁/验证码且响应没有 Retry-After 时，该平台所有请求暂停的秒数
+ADAPTIVE_BLOCK_PAUSE_SEC = 30
+
+# ==================== 请求重试配置 ====================
+# 按错误类型设置重试策略：transient（网络错误、超时、5xx）| throttled（限流/封禁/验证码）| auth_expired（登录态/签名失效）| permanent（数据不存在等确定性错误）
+# max_attempts 为包含首次请求在内的最大请求次数；重试前在 0 ~ min(max_delay, base_delay * 2^(已请求次数-1)) 秒之间随机等待
+RETRY_POLICIES = {
+    "transient": {"max_attempts": 3, "base_delay": 1, "max_delay": 10},
+    "throttled": {"max_attempts": 3, "base_delay": 5, "max_delay": 60},
+    "auth_expired": {"max_attempts": 2, "base_delay": 1, "max_delay": 3},
+    "permanent": {"max_attempts": 1, "base_delay": 0, "max_delay": 0},
+}
+
+# 全局重试预算：每个首次请求积累 RETRY_BUDGET_RATIO 次重试机会，最多积累 RETRY_BUDGET_MAX 次，用完后失败的请求不再重试
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MAX = 20
+
+# 同一域名连续失败多少次（网络错误或被限流）后熔断，熔断期间发往该域名的请求等待 HOST_CIRCUIT_BREAKER_COOLDOWN_SEC 秒
+HOST_CIRCUIT_BREAKER_THRESHOLD = 5
+HOST_CIRCUIT_BREAKER_COOLDOWN_SEC = 30
+
+# ==================== HTTP 连接池配置 ====================
+# 是否复用HTTP连接池（keep-alive），每个API客户端持有一个长连接池，避免每次请求都重新进行TCP+TLS握手
+# 设置为False时每次请求都新建连接，可配合耗时统计对比开启前后的接口延迟
+ENABLE_HTTP_CONNECTION_POOL = True
+
+# 是否启用HTTP/2多路复用，需要额外安装 h2 依赖：pip install "httpx[http2]"，未安装时自动回退到HTTP/1.1
+ENABLE_HTTP2 = False
+
+# 连接池最大连接数
+HTTP_POOL_MAX_CONNECTIONS = 100
+
+# 连接池最大保持keep-alive的空闲连接数
+HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# 空闲连接的保持时间（秒）
+HTTP_POOL_KEEPALIVE_EXPIRY = 30
+
+# 是否在API客户端关闭时输出各接口的请求耗时统计（次数、平均值、P50、P95）
+ENABLE_REQUEST_LATENCY_STATS = True
+
+# 请求签名所需的浏览器状态（localStorage中的 b1、msToken、wbi keys 等）快照缓存时间（秒）
+# 缓存期间签名不再访问浏览器；更新cookies或出现签名相关错误时会立即刷新，设置为0表示每次请求都重新读取
+BROWSER_STATE_CACHE_TTL = 300
+
+# 是否使用常驻的 node 进程池执行抖音/知乎的 JS 签名脚本，关闭或未安装 node 时使用 execjs（Node运行时下每次签名都会新起一个进程）
+ENABLE_JS_SIGN_WORKER_POOL = True
+
+# JS 签名 worker 进程数量
+JS_SIGN_WORKER_POOL_SIZE = 2
+
+# ==================== 媒体下载配置 ====================
+# 媒体文件流式下载时每次写入磁盘的分块大小（字节），内存占用只和该值有关，和视频大小无关
+MEDIA_DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# 媒体文件下载失败的最大重试次数，重试时会通过 HTTP Range 从已下载的位置续传
+MEDIA_DOWNLOAD_MAX_RETRIES = 3
+
+# 大视频分段并发下载时每个分段的大小（字节），超过一个分段大小的视频才会分段下载
+MEDIA_DOWNLOAD_SEGMENT_SIZE = 8 * 1024 * 1024
+
+# 单个视频同时下载的分段数量，设置为1时不分段
+MEDIA_DOWNLOAD_SEGMENT_CONCURRENCY = 4
+
+# 媒体下载流水线的 worker 数量，爬虫只投递下载任务，由这些 worker 在后台下载，不阻塞帖子元数据的爬取
+MEDIA_DOWNLOAD_WORKERS = 4
+
+# 同一个CDN域名同时下载的最大文件数
+MEDIA_DOWNLOAD_PER_HOST_CONCURRENCY = 2
+
+# 媒体下载的总带宽限制（字节/秒），0 表示不限制
+MEDIA_DOWNLOAD_MAX_BYTES_PER_SEC = 0
+
+# 等待下载的任务队列长度上限，队列满时爬虫投递任务会等待
+MEDIA_DOWNLOAD_QUEUE_SIZE = 1000
+
+# 是否开启媒体文件去重：文件按内容哈希只保存一份到 data/{platform}/blobs，帖子目录下为硬链接
+# 同时记录 url -> 内容哈希 的索引，之前下载过的url不会再次下载
+ENABLE_MEDIA_DEDUP = True
 
 from .bilibili_config import *
 from .xhs_config import *
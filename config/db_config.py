@@ -27,12 +27,20 @@ MYSQL_DB_HOST = os.getenv("MYSQL_DB_HOST", "localhost")
 MYSQL_DB_PORT = os.getenv("MYSQL_DB_PORT", 3306)
 MYSQL_DB_NAME = os.getenv("MYSQL_DB_NAME", "media_crawler")
 
+# mysql 连接池配置：常驻连接数、高峰期允许额外创建的连接数、连接回收时间（秒，需小于服务端 wait_timeout）
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 10))
+MYSQL_MAX_OVERFLOW = int(os.getenv("MYSQL_MAX_OVERFLOW", 20))
+MYSQL_POOL_RECYCLE = int(os.getenv("MYSQL_POOL_RECYCLE", 3600))
+
 mysql_db_config = {
     "user": MYSQL_DB_USER,
     "password": MYSQL_DB_PWD,
     "host": MYSQL_DB_HOST,
     "port": MYSQL_DB_PORT,
     "db_name": MYSQL_DB_NAME,
+    "pool_size": MYSQL_POOL_SIZE,
+    "max_overflow": MYSQL_MAX_OVERFLOW,
+    "pool_recycle": MYSQL_POOL_RECYCLE,
 }
 
 
@@ -49,8 +57,18 @@ CACHE_TYPE_MEMORY = "memory"
 # sqlite config
 SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "sqlite_tables.db")
 
+# sqlite 日志模式，WAL 模式下读写互不阻塞，写入只追加到 -wal 文件
+SQLITE_JOURNAL_MODE = "WAL"
+# sqlite 同步级别，WAL 模式下 NORMAL 只在 checkpoint 时 fsync，断电可能丢失最后几个事务但不会损坏数据库
+SQLITE_SYNCHRONOUS = "NORMAL"
+# 数据库被其它连接锁住时等待的毫秒数，超时后才报 database is locked
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
 sqlite_db_config = {
-    "db_path": SQLITE_DB_PATH
+    "db_path": SQLITE_DB_PATH,
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
 }
 
 # mongodb config
@@ -59,6 +77,12 @@ MONGODB_PORT = os.getenv("MONGODB_PORT", 27017)
 MONGODB_USER = os.getenv("MONGODB_USER", "")
 MONGODB_PWD = os.getenv("MONGODB_PWD", "")
 MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "media_crawler")
+# mongodb 连接池最大连接数
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", 50))
+# mongodb 写关注：1 表示主节点确认即返回，majority 表示多数节点确认后返回（更安全但更慢）
+MONGODB_WRITE_CONCERN = os.getenv("MONGODB_WRITE_CONCERN", "1")
+# mongodb 写入是否等待日志落盘后再返回
+MONGODB_WRITE_JOURNAL = os.getenv("MONGODB_WRITE_JOURNAL", "false").lower() == "true"
 
 mongodb_config = {
     "host": MONGODB_HOST,
@@ -66,4 +90,7 @@ mongodb_config = {
     "user": MONGODB_USER,
     "password": MONGODB_PWD,
     "db_name": MONGODB_DB_NAME,
+    "max_pool_size": MONGODB_MAX_POOL_SIZE,
+    "write_concern": int(MONGODB_WRITE_CONCERN) if MONGODB_WRITE_CONCERN.isdigit() else MONGODB_WRITE_CONCERN,
+    "write_journal": MONGODB_WRITE_JOURNAL,
 }
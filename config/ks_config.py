@@ -38,3 +38,9 @@ KS_CREATOR_ID_LIST = [
     "3x4sm73aye7jq7i",
     # ........................
 ]
+
+# 爬取评论时疑似被封禁后，评论请求暂停的秒数，暂停结束后刷新一次 cookie 再继续
+KS_BLOCK_COOLDOWN_SEC = 20
+
+# 因疑似被封禁而中断的视频评论任务，最多重新排队的次数
+KS_COMMENT_MAX_REQUEUE = 3
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/database/bulk_upsert.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tools import utils
+
+# 单条语句最多写入的行数，避免超过 SQLite 单条语句的参数数量上限
+MAX_ROWS_PER_STATEMENT = 500
+
+
+async def bulk_upsert(
+    session: AsyncSession,
+    model,
+    items: List[Dict],
+    conflict_column: str,
+    update_columns: Optional[Sequence[str]] = None,
+) -> None:
+    """
+    批量写入一整页数据，已存在的记录（按 conflict_column 唯一约束判断）更新，不存在的插入
+    MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 使用 INSERT ... ON CONFLICT DO UPDATE
+    一页数据只需要一条语句、一次事务，不再逐条 SELECT 后再 INSERT/UPDATE
+    Args:
+        session: 数据库会话
+        model: ORM 模型类，conflict_column 上需要有唯一约束
+        items: 待写入的数据
+        conflict_column: 唯一约束字段
+        update_columns: 记录已存在时更新的字段，为None时更新除 conflict_column 和 add_ts 之外的所有字段，某一行没有提供的字段不会更新
+
+    Returns:
+
+    """
+    column_names = set(model.__table__.columns.keys())
+    add_ts = utils.get_current_timestamp()
+    # 同一页数据中重复的记录只保留最后一条
+    rows_by_key: Dict = {}
+    for item in items:
+        if item.get(conflict_column) in (None, ""):
+            continue
+        row = {key: value for key, value in item.items() if key in column_names}
+        row.setdefault("add_ts", add_ts)
+        rows_by_key[row[conflict_column]] = row
+    if not rows_by_key:
+        return
+
+    # 多行 VALUES 要求每一行的字段一致，按字段集合分组写入
+    # 不补 None，避免插入时覆盖字段的默认值、更新时把已有的值改为 NULL
+    rows_by_columns: Dict[Tuple[str, ...], List[Dict]] = {}
+    for row in rows_by_key.values():
+        rows_by_columns.setdefault(tuple(sorted(row.keys())), []).append(row)
+
+    dialect_name = session.bind.dialect.name
+    for row_columns, rows in rows_by_columns.items():
+        # 只更新这一组数据里提供了的字段
+        group_update_columns = [
+            column for column in (row_columns if update_columns is None else update_columns)
+            if column in row_columns and column not in (conflict_column, "add_ts", "id")
+        ]
+        for start in range(0, len(rows), MAX_ROWS_PER_STATEMENT):
+            chunk = rows[start:start + MAX_ROWS_PER_STATEMENT]
+            if dialect_name == "mysql":
+                stmt = mysql_insert(model).values(chunk)
+                # 没有要更新的字段时把唯一约束字段更新为自身，相当于什么都不做
+                stmt = stmt.on_duplicate_key_update(
+                    {column: stmt.inserted[column] for column in group_update_columns or [conflict_column]}
+                )
+            elif dialect_name == "sqlite":
+                stmt = sqlite_insert(model).values(chunk)
+                if group_update_columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[conflict_column],
+                        set_={column: stmt.excluded[column] for column in group_update_columns},
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=[conflict_column])
+            else:
+                raise ValueError(f"[bulk_upsert] Unsupported database dialect: {dialect_name}")
+            await session.execute(stmt)
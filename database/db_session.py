@@ -16,16 +16,18 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
+from typing import Dict
 from .models import Base
 import config
 from config.db_config import mysql_db_config, sqlite_db_config
 
-# Keep a cache of engines
-_engines = {}
+# Keep a cache of engines and session factories, one per db type for the whole run
+_engines: Dict[str, AsyncEngine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
 
 
 async def create_database_if_not_exists(db_type: str):
@@ -50,16 +52,74 @@ def get_async_engine(db_type: str = None):
 
     if db_type == "sqlite":
         db_url = f"sqlite+aiosqlite:///{sqlite_db_config['db_path']}"
+        engine = create_async_engine(db_url, echo=False)
+        _set_sqlite_pragmas(engine)
     elif db_type == "mysql" or db_type == "db":
         db_url = f"mysql+asyncmy://{mysql_db_config['user']}:{mysql_db_config['password']}@{mysql_db_config['host']}:{mysql_db_config['port']}/{mysql_db_config['db_name']}"
+        engine = create_async_engine(
+            db_url,
+            echo=False,
+            pool_size=mysql_db_config["pool_size"],
+            max_overflow=mysql_db_config["max_overflow"],
+            pool_recycle=mysql_db_config["pool_recycle"],
+            pool_pre_ping=True,
+        )
     else:
         raise ValueError(f"Unsupported database type: {db_type}")
 
-    engine = create_async_engine(db_url, echo=False)
     _engines[db_type] = engine
     return engine
 
 
+def _set_sqlite_pragmas(engine: AsyncEngine):
+    """
+    每个新建的 sqlite 连接都设置 WAL 日志模式、同步级别和锁等待时间
+    Args:
+        engine: sqlite 异步引擎
+
+    Returns:
+
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={sqlite_db_config['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={sqlite_db_config['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(sqlite_db_config['busy_timeout'])}")
+        cursor.close()
+
+
+def get_session_factory(db_type: str = None):
+    """
+    获取数据库类型对应的会话工厂，整个运行期间只创建一次
+    Args:
+        db_type: 数据库类型，默认取 SAVE_DATA_OPTION
+
+    Returns:
+        会话工厂，json/csv 等非数据库存储方式返回None
+    """
+    if db_type is None:
+        db_type = config.SAVE_DATA_OPTION
+    if db_type not in _session_factories:
+        engine = get_async_engine(db_type)
+        if not engine:
+            return None
+        _session_factories[db_type] = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return _session_factories[db_type]
+
+
+async def dispose_engines():
+    """
+    关闭所有引擎的连接池，运行结束时调用
+    Returns:
+
+    """
+    for engine in list(_engines.values()):
+        await engine.dispose()
+    _engines.clear()
+    _session_factories.clear()
+
+
 async def create_tables(db_type: str = None):
     if db_type is None:
         db_type = config.SAVE_DATA_OPTION
@@ -72,11 +132,10 @@ async def create_tables(db_type: str = None):
 
 @asynccontextmanager
 async def get_session() -> AsyncSession:
-    engine = get_async_engine(config.SAVE_DATA_OPTION)
-    if not engine:
+    AsyncSessionFactory = get_session_factory(config.SAVE_DATA_OPTION)
+    if not AsyncSessionFactory:
         yield None
         return
-    AsyncSessionFactory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     session = AsyncSessionFactory()
     try:
         yield session
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/database/migrate_engagement_columns.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# 一次性迁移已有的 MySQL/SQLite 数据库，使表结构与 database/models.py 一致：
+# 1. 互动计数字段（liked_count、comment_count、video_play_count、like_count 等）由文本改为整数，"1.2万" 这类旧数据转换为 12000
+# 2. source_keyword 改为 VARCHAR(255)，以便和发布时间建立联合索引
+# 3. 评论表的 comment_id 改为唯一索引（迁移前删除重复的评论，保留最后写入的一条），补齐 (note_id, create_time) 等联合索引
+# 运行方式（项目根目录）: python -m database.migrate_engagement_columns --db sqlite
+#                        python -m database.migrate_engagement_columns --db mysql
+# 迁移前请先备份数据库，可以重复运行
+
+import argparse
+import asyncio
+from typing import List, Set
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection
+
+from database.db_session import dispose_engines, get_async_engine
+from database.models import Base, CountInteger
+from tools import utils
+
+# 本次迁移修改了类型的文本字段
+KEYWORD_COLUMN = "source_keyword"
+KEYWORD_MAX_LENGTH = 255
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def _normalize_counter_values(conn: Connection, table: Table, counter_columns: List[str]) -> None:
+    """
+    把计数字段中不是纯数字的旧数据（"1.2万"、"10万+"、"None"、"" 等）转换为整数，无法解析的置为 NULL
+    Args:
+        conn: 数据库连接
+        table: 表
+        counter_columns: 需要转换的计数字段
+
+    Returns:
+
+    """
+    table_name = _quote(conn, table.name)
+    for column in counter_columns:
+        column_name = _quote(conn, column)
+        rows = conn.exec_driver_sql(f"SELECT id, {column_name} FROM {table_name} WHERE {column_name} IS NOT NULL")
+        updates = []
+        for row_id, value in rows:
+            if isinstance(value, int):
+                continue
+            count = utils.parse_count(value)
+            if count is None or str(count) != str(value):
+                updates.append({"id": row_id, "value": count})
+        if updates:
+            conn.execute(text(f"UPDATE {table_name} SET {column_name} = :value WHERE id = :id"), updates)
+            utils.logger.info(f"[migrate] {table.name}.{column}: converted {len(updates)} values")
+
+
+def _rebuild_sqlite_table(conn: Connection, table: Table, existing_columns: Set[str], counter_columns: List[str]) -> None:
+    """
+    SQLite 不支持修改字段类型，按新的表结构重建表后把数据复制过去
+    Args:
+        conn: 数据库连接
+        table: 表
+        existing_columns: 旧表中已有的字段
+        counter_columns: 需要转换为整数的计数字段
+
+    Returns:
+
+    """
+    table_name = _quote(conn, table.name)
+    old_table_name = _quote(conn, f"{table.name}_before_migration")
+    # 索引名在 SQLite 中全局唯一，先删掉旧表的索引，新表才能用同样的名字建索引
+    for index in inspect(conn).get_indexes(table.name):
+        conn.exec_driver_sql(f"DROP INDEX {_quote(conn, index['name'])}")
+    conn.exec_driver_sql(f"ALTER TABLE {table_name} RENAME TO {old_table_name}")
+    table.create(conn)
+
+    columns = [column.name for column in table.columns if column.name in existing_columns]
+    select_columns = [
+        f"CAST({_quote(conn, column)} AS INTEGER)" if column in counter_columns else _quote(conn, column)
+        for column in columns
+    ]
+    # comment_id 改为唯一索引后，重复的评论按 id 顺序由后写入的覆盖
+    conn.exec_driver_sql(
+        f"INSERT OR REPLACE INTO {table_name} ({', '.join(_quote(conn, column) for column in columns)}) "
+        f"SELECT {', '.join(select_columns)} FROM {old_table_name} ORDER BY id"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {old_table_name}")
+
+
+def _alter_mysql_table(conn: Connection, table: Table, existing_columns: Set[str], counter_columns: List[str]) -> None:
+    """
+    MySQL 直接修改字段类型，删除重复的评论后同步索引
+    Args:
+        conn: 数据库连接
+        table: 表
+        existing_columns: 表中已有的字段
+        counter_columns: 需要转换为整数的计数字段
+
+    Returns:
+
+    """
+    table_name = _quote(conn, table.name)
+    modify_columns = list(counter_columns)
+    if KEYWORD_COLUMN in existing_columns and KEYWORD_COLUMN in table.columns:
+        keyword_column = _quote(conn, KEYWORD_COLUMN)
+        conn.exec_driver_sql(
+            f"UPDATE {table_name} SET {keyword_column} = LEFT({keyword_column}, {KEYWORD_MAX_LENGTH}) "
+            f"WHERE CHAR_LENGTH({keyword_column}) > {KEYWORD_MAX_LENGTH}"
+        )
+        modify_columns.append(KEYWORD_COLUMN)
+    if modify_columns:
+        modify_clauses = [
+            f"MODIFY {_quote(conn, column)} {table.columns[column].type.compile(dialect=conn.dialect)}"
+            for column in modify_columns
+        ]
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} {', '.join(modify_clauses)}")
+
+    if "comment_id" in existing_columns and table.columns.get("comment_id") is not None and table.columns["comment_id"].unique:
+        result = conn.exec_driver_sql(
+            f"DELETE t1 FROM {table_name} t1 JOIN {table_name} t2 ON t1.comment_id = t2.comment_id AND t1.id < t2.id"
+        )
+        if result.rowcount:
+            utils.logger.info(f"[migrate] {table.name}: deleted {result.rowcount} duplicate comments")
+
+    existing_indexes = {index["name"]: index for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        existing_index = existing_indexes.get(index.name)
+        if existing_index is not None and bool(existing_index["unique"]) == bool(index.unique):
+            continue
+        if existing_index is not None:
+            index.drop(conn)
+        index.create(conn)
+
+
+def migrate_tables(conn: Connection) -> None:
+    """
+    迁移所有表，不存在的表按新的表结构创建
+    Args:
+        conn: 数据库连接
+
+    Returns:
+
+    """
+    for table in Base.metadata.sorted_tables:
+        if not inspect(conn).has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspect(conn).get_columns(table.name)}
+        counter_columns = [
+            column.name for column in table.columns
+            if isinstance(column.type, CountInteger) and column.name in existing_columns
+        ]
+        _normalize_counter_values(conn, table, counter_columns)
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, table, existing_columns, counter_columns)
+        else:
+            _alter_mysql_table(conn, table, existing_columns, counter_columns)
+        utils.logger.info(f"[migrate] {table.name} migrated")
+    Base.metadata.create_all(conn)
+
+
+async def migrate(db_type: str) -> None:
+    engine = get_async_engine(db_type)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(migrate_tables)
+    finally:
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="迁移互动计数字段和分析索引")
+    parser.add_argument("--db", choices=["sqlite", "mysql"], required=True, help="数据库类型")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.db))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,39 +16,58 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-from sqlalchemy import create_engine, Column, Integer, Text, String, BigInteger
+from sqlalchemy import create_engine, Column, Index, Integer, Text, String, BigInteger
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from tools import utils
+
 Base = declarative_base()
 
+
+class CountInteger(TypeDecorator):
+    """互动计数字段（点赞数、评论数、播放数等），写入时把平台返回的 "1.2万"、"10万+" 等字符串转换为整数"""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return utils.parse_count(value)
+
+
 class BilibiliVideo(Base):
     __tablename__ = 'bilibili_video'
+    __table_args__ = (
+        Index('ix_bilibili_video_source_keyword_create_time', 'source_keyword', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     video_id = Column(BigInteger, nullable=False, index=True, unique=True)
     video_url = Column(Text, nullable=False)
     user_id = Column(BigInteger, index=True)
     nickname = Column(Text)
     avatar = Column(Text)
-    liked_count = Column(Integer)
+    liked_count = Column(CountInteger)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
     video_type = Column(Text)
     title = Column(Text)
     desc = Column(Text)
     create_time = Column(BigInteger, index=True)
-    disliked_count = Column(Text)
-    video_play_count = Column(Text)
-    video_favorite_count = Column(Text)
-    video_share_count = Column(Text)
-    video_coin_count = Column(Text)
-    video_danmaku = Column(Text)
-    video_comment = Column(Text)
+    disliked_count = Column(CountInteger)
+    video_play_count = Column(CountInteger)
+    video_favorite_count = Column(CountInteger)
+    video_share_count = Column(CountInteger)
+    video_coin_count = Column(CountInteger)
+    video_danmaku = Column(CountInteger)
+    video_comment = Column(CountInteger)
     video_cover_url = Column(Text)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
 
 class BilibiliVideoComment(Base):
     __tablename__ = 'bilibili_video_comment'
+    __table_args__ = (
+        Index('ix_bilibili_video_comment_video_id_create_time', 'video_id', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -57,13 +76,13 @@ class BilibiliVideoComment(Base):
     avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    comment_id = Column(BigInteger, index=True)
+    comment_id = Column(BigInteger, index=True, unique=True)
     video_id = Column(BigInteger, index=True)
     content = Column(Text)
     create_time = Column(BigInteger)
-    sub_comment_count = Column(Text)
+    sub_comment_count = Column(CountInteger)
     parent_comment_id = Column(String(255))
-    like_count = Column(Text, default='0')
+    like_count = Column(CountInteger, default=0)
 
 class BilibiliUpInfo(Base):
     __tablename__ = 'bilibili_up_info'
@@ -111,6 +130,9 @@ class BilibiliUpDynamic(Base):
 
 class DouyinAweme(Base):
     __tablename__ = 'douyin_aweme'
+    __table_args__ = (
+        Index('ix_douyin_aweme_source_keyword_create_time', 'source_keyword', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     sec_uid = Column(String(255))
@@ -127,19 +149,22 @@ class DouyinAweme(Base):
     title = Column(Text)
     desc = Column(Text)
     create_time = Column(BigInteger, index=True)
-    liked_count = Column(Text)
-    comment_count = Column(Text)
-    share_count = Column(Text)
-    collected_count = Column(Text)
+    liked_count = Column(CountInteger)
+    comment_count = Column(CountInteger)
+    share_count = Column(CountInteger)
+    collected_count = Column(CountInteger)
     aweme_url = Column(Text)
     cover_url = Column(Text)
     video_download_url = Column(Text)
     music_download_url = Column(Text)
     note_download_url = Column(Text)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
 
 class DouyinAwemeComment(Base):
     __tablename__ = 'douyin_aweme_comment'
+    __table_args__ = (
+        Index('ix_douyin_aweme_comment_aweme_id_create_time', 'aweme_id', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     sec_uid = Column(String(255))
@@ -151,13 +176,13 @@ class DouyinAwemeComment(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    comment_id = Column(BigInteger, index=True)
+    comment_id = Column(BigInteger, index=True, unique=True)
     aweme_id = Column(BigInteger, index=True)
     content = Column(Text)
     create_time = Column(BigInteger)
-    sub_comment_count = Column(Text)
+    sub_comment_count = Column(CountInteger)
     parent_comment_id = Column(String(255))
-    like_count = Column(Text, default='0')
+    like_count = Column(CountInteger, default=0)
     pictures = Column(Text, default='')
 
 class DyCreator(Base):
@@ -171,13 +196,16 @@ class DyCreator(Base):
     last_modify_ts = Column(BigInteger)
     desc = Column(Text)
     gender = Column(Text)
-    follows = Column(Text)
-    fans = Column(Text)
-    interaction = Column(Text)
-    videos_count = Column(String(255))
+    follows = Column(CountInteger)
+    fans = Column(CountInteger)
+    interaction = Column(CountInteger)
+    videos_count = Column(CountInteger)
 
 class KuaishouVideo(Base):
     __tablename__ = 'kuaishou_video'
+    __table_args__ = (
+        Index('ix_kuaishou_video_source_keyword_create_time', 'source_keyword', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(64))
     nickname = Column(Text)
@@ -189,29 +217,35 @@ class KuaishouVideo(Base):
     title = Column(Text)
     desc = Column(Text)
     create_time = Column(BigInteger, index=True)
-    liked_count = Column(Text)
-    viewd_count = Column(Text)
+    liked_count = Column(CountInteger)
+    viewd_count = Column(CountInteger)
     video_url = Column(Text)
     video_cover_url = Column(Text)
     video_play_url = Column(Text)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
 
 class KuaishouVideoComment(Base):
     __tablename__ = 'kuaishou_video_comment'
+    __table_args__ = (
+        Index('ix_kuaishou_video_comment_video_id_create_time', 'video_id', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Text)
     nickname = Column(Text)
     avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    comment_id = Column(BigInteger, index=True)
+    comment_id = Column(BigInteger, index=True, unique=True)
     video_id = Column(String(255), index=True)
     content = Column(Text)
     create_time = Column(BigInteger)
-    sub_comment_count = Column(Text)
+    sub_comment_count = Column(CountInteger)
 
 class WeiboNote(Base):
     __tablename__ = 'weibo_note'
+    __table_args__ = (
+        Index('ix_weibo_note_source_keyword_create_time', 'source_keyword', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -225,14 +259,17 @@ class WeiboNote(Base):
     content = Column(Text)
     create_time = Column(BigInteger, index=True)
     create_date_time = Column(String(255), index=True)
-    liked_count = Column(Text)
-    comments_count = Column(Text)
-    shared_count = Column(Text)
+    liked_count = Column(CountInteger)
+    comments_count = Column(CountInteger)
+    shared_count = Column(CountInteger)
     note_url = Column(Text)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
 
 class WeiboNoteComment(Base):
     __tablename__ = 'weibo_note_comment'
+    __table_args__ = (
+        Index('ix_weibo_note_comment_note_id_create_time', 'note_id', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -242,13 +279,13 @@ class WeiboNoteComment(Base):
     ip_location = Column(Text, default='')
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    comment_id = Column(BigInteger, index=True)
+    comment_id = Column(BigInteger, index=True, unique=True)
     note_id = Column(BigInteger, index=True)
     content = Column(Text)
     create_time = Column(BigInteger)
     create_date_time = Column(String(255), index=True)
-    comment_like_count = Column(Text)
-    sub_comment_count = Column(Text)
+    comment_like_count = Column(CountInteger)
+    sub_comment_count = Column(CountInteger)
     parent_comment_id = Column(String(255))
 
 class WeiboCreator(Base):
@@ -262,8 +299,8 @@ class WeiboCreator(Base):
     last_modify_ts = Column(BigInteger)
     desc = Column(Text)
     gender = Column(Text)
-    follows = Column(Text)
-    fans = Column(Text)
+    follows = Column(CountInteger)
+    fans = Column(CountInteger)
     tag_list = Column(Text)
 
 class XhsCreator(Base):
@@ -277,13 +314,16 @@ class XhsCreator(Base):
     last_modify_ts = Column(BigInteger)
     desc = Column(Text)
     gender = Column(Text)
-    follows = Column(Text)
-    fans = Column(Text)
-    interaction = Column(Text)
+    follows = Column(CountInteger)
+    fans = Column(CountInteger)
+    interaction = Column(CountInteger)
     tag_list = Column(Text)
 
 class XhsNote(Base):
     __tablename__ = 'xhs_note'
+    __table_args__ = (
+        Index('ix_xhs_note_source_keyword_time', 'source_keyword', 'time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -298,18 +338,21 @@ class XhsNote(Base):
     video_url = Column(Text)
     time = Column(BigInteger, index=True)
     last_update_time = Column(BigInteger)
-    liked_count = Column(Text)
-    collected_count = Column(Text)
-    comment_count = Column(Text)
-    share_count = Column(Text)
+    liked_count = Column(CountInteger)
+    collected_count = Column(CountInteger)
+    comment_count = Column(CountInteger)
+    share_count = Column(CountInteger)
     image_list = Column(Text)
     tag_list = Column(Text)
     note_url = Column(Text)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
     xsec_token = Column(Text)
 
 class XhsNoteComment(Base):
     __tablename__ = 'xhs_note_comment'
+    __table_args__ = (
+        Index('ix_xhs_note_comment_note_id_create_time', 'note_id', 'create_time'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -317,17 +360,20 @@ class XhsNoteComment(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    comment_id = Column(String(255), index=True)
+    comment_id = Column(String(255), index=True, unique=True)
     create_time = Column(BigInteger, index=True)
     note_id = Column(String(255))
     content = Column(Text)
-    sub_comment_count = Column(Integer)
+    sub_comment_count = Column(CountInteger)
     pictures = Column(Text)
     parent_comment_id = Column(String(255))
-    like_count = Column(Text)
+    like_count = Column(CountInteger)
 
 class TiebaNote(Base):
     __tablename__ = 'tieba_note'
+    __table_args__ = (
+        Index('ix_tieba_note_source_keyword_publish_time', 'source_keyword', 'publish_time'),
+    )
     id = Column(Integer, primary_key=True)
     note_id = Column(String(644), index=True)
     title = Column(Text)
@@ -345,12 +391,15 @@ class TiebaNote(Base):
     ip_location = Column(Text, default='')
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
-    source_keyword = Column(Text, default='')
+    source_keyword = Column(String(255), default='')
 
 class TiebaComment(Base):
     __tablename__ = 'tieba_comment'
+    __table_args__ = (
+        Index('ix_tieba_comment_note_id_publish_time', 'note_id', 'publish_time'),
+    )
     id = Column(Integer, primary_key=True)
-    comment_id = Column(String(255), index=True)
+    comment_id = Column(String(255), index=True, unique=True)
     parent_comment_id = Column(String(255), default='')
     content = Column(Text)
     user_link = Column(Text, default='')
@@ -378,12 +427,15 @@ class TiebaCreator(Base):
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
     gender = Column(Text)
-    follows = Column(Text)
-    fans = Column(Text)
+    follows = Column(CountInteger)
+    fans = Column(CountInteger)
     registration_duration = Column(Text)
 
 class ZhihuContent(Base):
     __tablename__ = 'zhihu_content'
+    __table_args__ = (
+        Index('ix_zhihu_content_source_keyword_created_time', 'source_keyword', 'created_time'),
+    )
     id = Column(Integer, primary_key=True)
     content_id = Column(String(64), index=True)
     content_type = Column(Text)
@@ -396,7 +448,7 @@ class ZhihuContent(Base):
     updated_time = Column(Text)
     voteup_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
-    source_keyword = Column(Text)
+    source_keyword = Column(String(255))
     user_id = Column(String(255))
     user_link = Column(Text)
     user_nickname = Column(Text)
@@ -412,8 +464,11 @@ class ZhihuContent(Base):
 
 class ZhihuComment(Base):
     __tablename__ = 'zhihu_comment'
+    __table_args__ = (
+        Index('ix_zhihu_comment_content_id_publish_time', 'content_id', 'publish_time'),
+    )
     id = Column(Integer, primary_key=True)
-    comment_id = Column(String(64), index=True)
+    comment_id = Column(String(64), index=True, unique=True)
     parent_comment_id = Column(String(64))
     content = Column(Text)
     publish_time = Column(String(32), index=True)
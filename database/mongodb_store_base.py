@@ -18,28 +18,79 @@
 
 """MongoDB存储基类：提供连接管理和通用存储方法"""
 import asyncio
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from config import db_config
 from tools import utils
 
+# 索引定义：(索引字段, 是否唯一)
+MongoIndex = Tuple[List[Tuple[str, int]], bool]
+
+# 各平台集合的索引：唯一索引保证 upsert 按ID定位文档时不需要全集合扫描，联合索引用于按关键词/帖子查询最新数据
+# 每个集合在本次运行第一次访问时创建一次
+MONGODB_INDEXES: Dict[str, Dict[str, List[MongoIndex]]] = {
+    "xhs": {
+        "contents": [([("note_id", 1)], True), ([("source_keyword", 1), ("time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("note_id", 1), ("create_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "douyin": {
+        "contents": [([("aweme_id", 1)], True), ([("source_keyword", 1), ("create_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("aweme_id", 1), ("create_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "kuaishou": {
+        "contents": [([("video_id", 1)], True), ([("source_keyword", 1), ("create_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("video_id", 1), ("create_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "bilibili": {
+        "contents": [([("video_id", 1)], True), ([("source_keyword", 1), ("create_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("video_id", 1), ("create_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "weibo": {
+        "contents": [([("note_id", 1)], True), ([("source_keyword", 1), ("create_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("note_id", 1), ("create_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "tieba": {
+        "contents": [([("note_id", 1)], True), ([("source_keyword", 1), ("publish_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("note_id", 1), ("publish_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+    "zhihu": {
+        "contents": [([("content_id", 1)], True), ([("source_keyword", 1), ("created_time", -1)], False)],
+        "comments": [([("comment_id", 1)], True), ([("content_id", 1), ("publish_time", -1)], False)],
+        "creators": [([("user_id", 1)], True)],
+    },
+}
+
 
 class MongoDBConnection:
     """MongoDB连接管理（单例模式）"""
     _instance = None
     _client: Optional[AsyncIOMotorClient] = None
     _db: Optional[AsyncIOMotorDatabase] = None
-    _lock = asyncio.Lock()
+    # 在第一次连接时创建，保证绑定在爬虫运行的事件循环上
+    _lock: Optional[asyncio.Lock] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MongoDBConnection, cls).__new__(cls)
         return cls._instance
 
+    def _get_lock(self) -> asyncio.Lock:
+        if MongoDBConnection._lock is None:
+            MongoDBConnection._lock = asyncio.Lock()
+        return MongoDBConnection._lock
+
     async def get_client(self) -> AsyncIOMotorClient:
         """获取客户端"""
         if self._client is None:
-            async with self._lock:
+            async with self._get_lock():
                 if self._client is None:
                     await self._connect()
         return self._client
@@ -47,7 +98,7 @@ class MongoDBConnection:
     async def get_db(self) -> AsyncIOMotorDatabase:
         """获取数据库"""
         if self._db is None:
-            async with self._lock:
+            async with self._get_lock():
                 if self._db is None:
                     await self._connect()
         return self._db
@@ -68,7 +119,13 @@ class MongoDBConnection:
             else:
                 connection_url = f"mongodb://{host}:{port}/"
 
-            self._client = AsyncIOMotorClient(connection_url, serverSelectionTimeoutMS=5000)
+            self._client = AsyncIOMotorClient(
+                connection_url,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=mongo_config["max_pool_size"],
+                w=mongo_config["write_concern"],
+                journal=mongo_config["write_journal"],
+            )
             await self._client.server_info()  # 测试连接
             self._db = self._client[db_name]
             utils.logger.info(f"[MongoDBConnection] Connected to {host}:{port}/{db_name}")
@@ -87,6 +144,8 @@ class MongoDBConnection:
 
 class MongoDBStoreBase:
     """MongoDB存储基类：提供通用的CRUD操作"""
+    # 本次运行已经创建过索引的集合
+    _indexed_collections: Set[str] = set()
 
     def __init__(self, collection_prefix: str):
         """初始化存储基类
@@ -100,7 +159,20 @@ class MongoDBStoreBase:
         """获取集合：{prefix}_{suffix}"""
         db = await self._connection.get_db()
         collection_name = f"{self.collection_prefix}_{collection_suffix}"
-        return db[collection_name]
+        collection = db[collection_name]
+        if collection_name not in MongoDBStoreBase._indexed_collections:
+            MongoDBStoreBase._indexed_collections.add(collection_name)
+            await self._ensure_indexes(collection, collection_suffix)
+        return collection
+
+    async def _ensure_indexes(self, collection: AsyncIOMotorCollection, collection_suffix: str):
+        """创建 MONGODB_INDEXES 中定义的索引，索引已存在时 MongoDB 不会重复创建"""
+        for keys, unique in MONGODB_INDEXES.get(self.collection_prefix, {}).get(collection_suffix, []):
+            try:
+                await collection.create_index(keys, unique=unique)
+            except Exception as e:
+                # 旧数据中存在重复文档时唯一索引会创建失败，需要先清理重复数据
+                utils.logger.error(f"[MongoDBStoreBase] Ensure index {keys} on {collection.name} failed: {e}")
 
     async def save_or_update(self, collection_suffix: str, query: Dict, data: Dict) -> bool:
         """保存或更新数据（upsert）"""
@@ -112,6 +184,28 @@ class MongoDBStoreBase:
             utils.logger.error(f"[MongoDBStoreBase] Save failed ({self.collection_prefix}_{collection_suffix}): {e}")
             return False
 
+    async def bulk_save_or_update(self, collection_suffix: str, key_field: str, items: List[Dict]) -> bool:
+        """批量保存或更新数据：一页数据合并为一次无序的 bulk_write，按 key_field 匹配文档"""
+        operations = [
+            UpdateOne({key_field: item[key_field]}, {"$set": item}, upsert=True)
+            for item in items if item.get(key_field)
+        ]
+        if not operations:
+            return True
+        try:
+            collection = await self.get_collection(collection_suffix)
+            await collection.bulk_write(operations, ordered=False)
+            return True
+        except BulkWriteError as e:
+            utils.logger.error(
+                f"[MongoDBStoreBase] Bulk save partially failed ({self.collection_prefix}_{collection_suffix}): "
+                f"{len(e.details.get('writeErrors', []))} of {len(operations)} failed"
+            )
+            return False
+        except Exception as e:
+            utils.logger.error(f"[MongoDBStoreBase] Bulk save failed ({self.collection_prefix}_{collection_suffix}): {e}")
+            return False
+
     async def find_one(self, collection_suffix: str, query: Dict) -> Optional[Dict]:
         """查询单条数据"""
         try:
@@ -0,0 +1,41 @@
+// 长驻的 JS 签名 worker，由 tools/js_sign_pool.py 启动
+// 启动时只加载一次签名脚本，之后通过 stdin/stdout 按行收发 JSON：
+//   请求: {"id": 1, "fn": "sign_datail", "args": [...]}
+//   响应: {"id": 1, "result": ...} 或 {"id": 1, "error": "..."}
+// 仅供学习交流使用，严禁用于商业用途
+
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+
+// 签名脚本里的 console.log 不能写到 stdout，否则会破坏通信协议
+console.log = console.error;
+globalThis.require = require;
+
+const scriptPath = process.argv[2];
+const source = fs.readFileSync(scriptPath, 'utf-8').replace(/^\uFEFF/, '');
+vm.runInThisContext(source, {filename: scriptPath});
+
+const functions = new Map();
+
+function resolveFunction(name) {
+    if (!functions.has(name)) {
+        functions.set(name, vm.runInThisContext(name));
+    }
+    return functions.get(name);
+}
+
+const rl = readline.createInterface({input: process.stdin});
+rl.on('line', (line) => {
+    let request = null;
+    let response;
+    try {
+        request = JSON.parse(line);
+        const result = resolveFunction(request.fn).apply(null, request.args || []);
+        response = {id: request.id, result: result === undefined ? null : result};
+    } catch (e) {
+        response = {id: request && request.id, error: String((e && e.stack) || e)};
+    }
+    process.stdout.write(JSON.stringify(response) + '\n');
+});
+rl.on('close', () => process.exit(0));
@@ -19,14 +19,13 @@
 
 
 import asyncio
-import sys
 import signal
 from typing import Optional
 
 import cmd_arg
 import config
 from database import db
-from base.base_crawler import AbstractCrawler
+from base.base_crawler import AbstractApiClient, AbstractCrawler
 from media_platform.bilibili import BilibiliCrawler
 from media_platform.douyin import DouYinCrawler
 from media_platform.kuaishou import KuaishouCrawler
@@ -34,7 +33,14 @@ from media_platform.tieba import TieBaCrawler
 from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
-from tools.async_file_writer import AsyncFileWriter
+from store import close_stores
+from tools.async_file_writer import generate_wordcloud_from_comments
+from tools.js_sign_pool import close_js_sign_pools
+from tools.csv_writer import close_csv_writers
+from tools.jsonl_writer import close_jsonl_writers
+from tools.parquet_writer import close_parquet_writers
+from tools.media_pipeline import MediaDownloadPipeline
+from tools.seen_index import close_seen_indexes
 from var import crawler_type_var
 
 
@@ -82,21 +88,55 @@ async def main():
 
 
     crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
+    install_signal_handlers(asyncio.current_task())
+    try:
+        await crawler.start()
+    except asyncio.CancelledError:
+        # 收到中断信号，在 finally 中写完剩余数据后正常退出
+        print("[Main] 爬虫已中断，正在写入剩余数据...")
+        return
+    finally:
+        await close_api_clients(crawler)
+        # 签名 worker 子进程绑定在当前事件循环上，需要在这里关闭
+        await close_js_sign_pools()
+        # 在爬虫运行的事件循环中写完写入队列、关闭浏览器和数据库连接池
+        await async_cleanup()
 
     # Generate wordcloud after crawling is complete
-    # Only for JSON save mode
+    # Only for JSON save mode，直接读取已落盘的评论数据，不重新打开已关闭的写入器和索引
     if config.SAVE_DATA_OPTION == "json" and config.ENABLE_GET_WORDCLOUD:
         try:
-            file_writer = AsyncFileWriter(
-                platform=config.PLATFORM,
-                crawler_type=crawler_type_var.get()
-            )
-            await file_writer.generate_wordcloud_from_comments()
+            await generate_wordcloud_from_comments(config.PLATFORM, crawler_type_var.get())
         except Exception as e:
             print(f"Error generating wordcloud: {e}")
 
 
+async def close_api_clients(crawler_obj: AbstractCrawler):
+    """关闭爬虫持有的API客户端连接池（异常退出时爬虫自身无法关闭），关闭前先等待后台媒体下载完成"""
+    for attr_value in list(vars(crawler_obj).values()):
+        if isinstance(attr_value, MediaDownloadPipeline):
+            try:
+                await attr_value.drain()
+            except Exception as e:
+                print(f"[Main] 等待媒体下载任务完成时出错: {e}")
+    for attr_value in list(vars(crawler_obj).values()):
+        if isinstance(attr_value, AbstractApiClient):
+            try:
+                await attr_value.close()
+            except Exception as e:
+                print(f"[Main] 关闭API客户端连接池时出错: {e}")
+
+
+async def close_store_writers():
+    """写完存储写入队列中剩余的数据，flush 并关闭本次运行的存储实例，然后关闭文件写入器和已爬取索引，可以重复调用"""
+    await close_stores()
+    # json 存储方式下把 jsonl 落盘并导出为 json 文件，csv/parquet 存储方式下写入缓冲的数据
+    await close_jsonl_writers()
+    await close_csv_writers()
+    await close_parquet_writers()
+    close_seen_indexes()
+
+
 async def async_cleanup():
     """异步清理函数，用于处理CDP浏览器等异步资源"""
     global crawler
@@ -123,36 +163,37 @@ async def async_cleanup():
                 if "closed" not in error_msg and "disconnected" not in error_msg:
                     print(f"[Main] 关闭浏览器上下文时出错: {e}")
 
-    # 关闭数据库连接
-    if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
-        await db.close()
-
-def cleanup():
-    """同步清理函数"""
+    # 把写入队列中剩余的数据写完，存储、文件写入器和数据库连接池都绑定在当前事件循环上
     try:
-        # 创建新的事件循环来执行异步清理
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(async_cleanup())
-        loop.close()
+        await close_store_writers()
     except Exception as e:
-        print(f"[Main] 清理时出错: {e}")
+        print(f"[Main] 写入剩余数据时出错: {e}")
 
+    # 关闭数据库连接
+    await db.close()
 
-def signal_handler(signum, _frame):
-    """信号处理器，处理Ctrl+C等中断信号"""
-    print(f"\n[Main] 收到中断信号 {signum}，正在清理资源...")
-    cleanup()
-    sys.exit(0)
 
-if __name__ == "__main__":
-    # 注册信号处理器
-    signal.signal(signal.SIGINT, signal_handler)   # Ctrl+C
-    signal.signal(signal.SIGTERM, signal_handler)  # 终止信号
+def install_signal_handlers(main_task: asyncio.Task):
+    """
+    收到 SIGINT/SIGTERM 时取消主任务，由 main 的 finally 在仍在运行的事件循环中写完剩余数据并释放资源
+    清理过程中再次收到信号时忽略，避免写入到一半被打断
+    """
+    loop = asyncio.get_running_loop()
 
-    try:
-        asyncio.get_event_loop().run_until_complete(main())
-    except KeyboardInterrupt:
-        print("\n[Main] 收到键盘中断，正在清理资源...")
-    finally:
-        cleanup()
+    def on_signal(signum: int):
+        if main_task.cancelling():
+            print("\n[Main] 正在写入剩余数据并清理资源，请稍候...")
+            return
+        print(f"\n[Main] 收到中断信号 {signum}，正在清理资源...")
+        main_task.cancel()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, on_signal, signum)
+        except NotImplementedError:
+            # Windows 的事件循环不支持 add_signal_handler，在信号处理器中切回事件循环线程取消主任务
+            signal.signal(signum, lambda sig, _frame: loop.call_soon_threadsafe(on_signal, sig))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -27,12 +27,13 @@ import random
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.browser_state_cache import BrowserStateCache
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_SEARCH
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
@@ -40,6 +41,14 @@ from .help import BilibiliSign
 
 
 class BilibiliClient(AbstractApiClient):
+    platform = "bili"
+    endpoint_classes = [
+        ("/search/type", ENDPOINT_SEARCH),
+        ("/arc/search", ENDPOINT_SEARCH),
+        ("/relation/", ENDPOINT_SEARCH),
+        ("/web-dynamic/", ENDPOINT_SEARCH),
+        ("/v2/reply/", ENDPOINT_COMMENTS),
+    ]
 
     def __init__(
         self,
@@ -56,15 +65,22 @@ class BilibiliClient(AbstractApiClient):
         self._host = "https://api.bilibili.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # wbi 签名 key 的快照，避免每次请求都访问浏览器或者请求 nav 接口
+        self._wbi_keys_cache = BrowserStateCache(self._load_wbi_keys)
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, **kwargs)
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
             utils.logger.error(f"[BilibiliClient.request] Failed to decode JSON from response. status_code: {response.status_code}, response_text: {response.text}")
             raise DataFetchError(f"Failed to decode JSON, content: {response.text}")
+        if data.get("code") in (-352, -403):
+            # 风控校验失败/访问权限不足，可能是 wbi key 已经轮换，下次请求重新获取
+            self._wbi_keys_cache.invalidate()
+        if data.get("code") in (-352, -412):
+            # 风控校验失败/请求被拦截
+            self.report_blocked(response)
         if data.get("code") != 0:
             raise DataFetchError(data.get("message", "unkonw error"))
         else:
@@ -85,7 +101,14 @@ class BilibiliClient(AbstractApiClient):
 
     async def get_wbi_keys(self) -> Tuple[str, str]:
         """
-        获取最新的 img_key 和 sub_key
+        获取 img_key 和 sub_key，优先使用缓存的快照
+        :return:
+        """
+        return await self._wbi_keys_cache.get()
+
+    async def _load_wbi_keys(self) -> Tuple[str, str]:
+        """
+        从浏览器 localStorage 或 nav 接口获取最新的 img_key 和 sub_key
         :return:
         """
         local_storage = await self.playwright_page.evaluate("() => window.localStorage")
@@ -138,6 +161,7 @@ class BilibiliClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        self._wbi_keys_cache.invalidate()
 
     async def search_video_by_keyword(
         self,
@@ -210,21 +234,15 @@ class BilibiliClient(AbstractApiClient):
 
         return await self.get(uri, params, enable_params_sign=True)
 
-    async def get_video_media(self, url: str) -> Union[bytes, None]:
-        # Follow CDN 302 redirects and treat any 2xx as success (some endpoints return 206)
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=True) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-                response.raise_for_status()
-                if 200 <= response.status_code < 300:
-                    return response.content
-                utils.logger.error(
-                    f"[BilibiliClient.get_video_media] Unexpected status {response.status_code} for {url}"
-                )
-                return None
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[BilibiliClient.get_video_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
+    async def download_video_media(self, url: str, save_path: str, total_size: Optional[int] = None) -> bool:
+        """
+        多分段并发下载视频到本地文件，长视频不会整体读入内存
+        :param url: 视频地址
+        :param save_path: 保存路径
+        :param total_size: durl 中返回的视频大小
+        :return: 是否下载成功
+        """
+        return await self.download_large_media(url, save_path, headers=self.headers, total_size=total_size)
 
     async def get_video_comments(
         self,
@@ -245,7 +263,6 @@ class BilibiliClient(AbstractApiClient):
     async def get_video_all_comments(
         self,
         video_id: str,
-        crawl_interval: float = 1.0,
         is_fetch_sub_comments=False,
         callback: Optional[Callable] = None,
         max_count: int = 10,
@@ -253,7 +270,6 @@ class BilibiliClient(AbstractApiClient):
         """
         get video all comments include sub comments
         :param video_id:
-        :param crawl_interval:
         :param is_fetch_sub_comments:
         :param callback:
         max_count: 一次笔记爬取的最大评论数量
@@ -304,12 +320,11 @@ class BilibiliClient(AbstractApiClient):
                 for comment in comment_list:
                     comment_id = comment['rpid']
                     if (comment.get("rcount", 0) > 0):
-                        {await self.get_video_all_level_two_comments(video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval, callback)}
+                        {await self.get_video_all_level_two_comments(video_id, comment_id, CommentOrderType.DEFAULT, 10, callback)}
             if len(result) + len(comment_list) > max_count:
                 comment_list = comment_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
             if not is_fetch_sub_comments:
                 result.extend(comment_list)
                 continue
@@ -321,7 +336,6 @@ class BilibiliClient(AbstractApiClient):
         level_one_comment_id: int,
         order_mode: CommentOrderType,
         ps: int = 10,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> Dict:
         """
@@ -330,7 +344,6 @@ class BilibiliClient(AbstractApiClient):
         :param level_one_comment_id: 一级评论 ID
         :param order_mode:
         :param ps: 一页评论数
-        :param crawl_interval:
         :param callback:
         :return:
         """
@@ -341,7 +354,6 @@ class BilibiliClient(AbstractApiClient):
             comment_list: List[Dict] = result.get("replies", [])
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
             if (int(result["page"]["count"]) <= pn * ps):
                 break
 
@@ -466,14 +478,12 @@ class BilibiliClient(AbstractApiClient):
     async def get_creator_all_fans(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 100,
     ) -> List:
         """
         get creator all fans
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大粉丝数量
 
@@ -491,7 +501,6 @@ class BilibiliClient(AbstractApiClient):
                 fans_list = fans_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, fans_list)
-            await asyncio.sleep(crawl_interval)
             if not fans_list:
                 break
             result.extend(fans_list)
@@ -500,14 +509,12 @@ class BilibiliClient(AbstractApiClient):
     async def get_creator_all_followings(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 100,
     ) -> List:
         """
         get creator all followings
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大关注者数量
 
@@ -525,7 +532,6 @@ class BilibiliClient(AbstractApiClient):
                 followings_list = followings_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, followings_list)
-            await asyncio.sleep(crawl_interval)
             if not followings_list:
                 break
             result.extend(followings_list)
@@ -534,14 +540,12 @@ class BilibiliClient(AbstractApiClient):
     async def get_creator_all_dynamics(
         self,
         creator_info: Dict,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 20,
     ) -> List:
         """
         get creator all followings
         :param creator_info:
-        :param crawl_interval:
         :param callback:
         :param max_count: 一个up主爬取的最大动态数量
 
@@ -560,6 +564,5 @@ class BilibiliClient(AbstractApiClient):
                 dynamics_list = dynamics_list[:max_count - len(result)]
             if callback:
                 await callback(creator_info, dynamics_list)
-            await asyncio.sleep(crawl_interval)
             result.extend(dynamics_list)
         return result
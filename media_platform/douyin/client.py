@@ -21,13 +21,14 @@ import asyncio
 import copy
 import json
 import urllib.parse
-from typing import Any, Callable, Dict, Union, Optional
+from typing import Any, Callable, Dict, Optional
 
-import httpx
 from playwright.async_api import BrowserContext
 
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.browser_state_cache import BrowserStateCache
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_SEARCH
 from var import request_keyword_var
 
 from .exception import *
@@ -36,6 +37,12 @@ from .help import *
 
 
 class DouYinClient(AbstractApiClient):
+    platform = "dy"
+    endpoint_classes = [
+        ("/general/search/", ENDPOINT_SEARCH),
+        ("/aweme/post/", ENDPOINT_SEARCH),
+        ("/comment/list/", ENDPOINT_COMMENTS),
+    ]
 
     def __init__(
         self,
@@ -52,6 +59,11 @@ class DouYinClient(AbstractApiClient):
         self._host = "https://www.douyin.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # 签名用到的 localStorage（msToken）快照，避免每次请求都访问浏览器
+        self._local_storage_cache = BrowserStateCache(self._load_local_storage)
+
+    async def _load_local_storage(self) -> Dict:
+        return await self.playwright_page.evaluate("() => window.localStorage")  # type: ignore
 
     async def __process_req_params(
         self,
@@ -64,7 +76,7 @@ class DouYinClient(AbstractApiClient):
         if not params:
             return
         headers = headers or self.headers
-        local_storage: Dict = await self.playwright_page.evaluate("() => window.localStorage")  # type: ignore
+        local_storage: Dict = await self._local_storage_cache.get()
         common_params = {
             "device_platform": "webapp",
             "aid": "6383",
@@ -106,10 +118,12 @@ class DouYinClient(AbstractApiClient):
             params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, **kwargs)
         try:
             if response.text == "" or response.text == "blocked":
+                # 签名参数失效时也会返回空内容，下次请求重新从浏览器读取 msToken
+                self._local_storage_cache.invalidate()
+                self.report_blocked(response)
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
                 raise Exception("account blocked")
             return response.json()
@@ -141,6 +155,7 @@ class DouYinClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        self._local_storage_cache.invalidate()
 
     async def search_info_by_keyword(
         self,
@@ -229,7 +244,6 @@ class DouYinClient(AbstractApiClient):
     async def get_aweme_all_comments(
         self,
         aweme_id: str,
-        crawl_interval: float = 1.0,
         is_fetch_sub_comments=False,
         callback: Optional[Callable] = None,
         max_count: int = 10,
@@ -237,7 +251,6 @@ class DouYinClient(AbstractApiClient):
         """
         获取帖子的所有评论，包括子评论
         :param aweme_id: 帖子ID
-        :param crawl_interval: 抓取间隔
         :param is_fetch_sub_comments: 是否抓取子评论
         :param callback: 回调函数，用于处理抓取到的评论
         :param max_count: 一次帖子爬取的最大评论数量
@@ -259,7 +272,6 @@ class DouYinClient(AbstractApiClient):
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(aweme_id, comments)
 
-            await asyncio.sleep(crawl_interval)
             if not is_fetch_sub_comments:
                 continue
             # 获取二级评论
@@ -282,7 +294,6 @@ class DouYinClient(AbstractApiClient):
                         result.extend(sub_comments)
                         if callback:  # 如果有回调函数，就执行回调函数
                             await callback(aweme_id, sub_comments)
-                        await asyncio.sleep(crawl_interval)
         return result
 
     async def get_user_info(self, sec_user_id: str):
@@ -322,19 +333,27 @@ class DouYinClient(AbstractApiClient):
             result.extend(aweme_list)
         return result
 
-    async def get_aweme_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, follow_redirects=True)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[DouYinClient.get_aweme_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
+    async def download_aweme_media(self, url: str, save_path: str) -> bool:
+        """
+        流式下载作品的图片或视频到本地文件
+        Args:
+            url: 媒体文件地址
+            save_path: 保存路径
+        Returns:
+            是否下载成功
+        """
+        return await self.download_media(url, save_path)
+
+    async def download_aweme_video(self, url: str, save_path: str) -> bool:
+        """
+        多分段并发下载作品视频到本地文件
+        Args:
+            url: 视频地址
+            save_path: 保存路径
+        Returns:
+            是否下载成功
+        """
+        return await self.download_large_media(url, save_path)
 
     async def resolve_short_url(self, short_url: str) -> str:
         """
@@ -344,19 +363,18 @@ class DouYinClient(AbstractApiClient):
         Returns:
             重定向后的完整URL
         """
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=False) as client:
-            try:
-                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
-                response = await client.get(short_url, timeout=10)
-
-                # 短链接通常返回302重定向
-                if response.status_code in [301, 302, 303, 307, 308]:
-                    redirect_url = response.headers.get("Location", "")
-                    utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
-                    return redirect_url
-                else:
-                    utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
-                    return ""
-            except Exception as e:
-                utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+        try:
+            utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
+            response = await self.send_request("GET", short_url, timeout=10, follow_redirects=False)
+
+            # 短链接通常返回302重定向
+            if response.status_code in [301, 302, 303, 307, 308]:
+                redirect_url = response.headers.get("Location", "")
+                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
+                return redirect_url
+            else:
+                utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
                 return ""
+        except Exception as e:
+            utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+            return ""
@@ -30,12 +30,23 @@ from playwright.async_api import BrowserContext, Page
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.circuit_breaker import CircuitBreaker
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_DETAIL, ENDPOINT_SEARCH
 
 from .exception import DataFetchError
 from .graphql import KuaiShouGraphQL
 
 
 class KuaiShouClient(AbstractApiClient):
+    platform = "ks"
+    # 所有接口都是同一个 graphql 地址，按 operationName 区分限速的接口类型
+    operation_endpoint_classes = {
+        "visionSearchPhoto": ENDPOINT_SEARCH,
+        "visionProfilePhotoList": ENDPOINT_SEARCH,
+        "commentListQuery": ENDPOINT_COMMENTS,
+        "visionSubCommentList": ENDPOINT_COMMENTS,
+    }
+
     def __init__(
         self,
         timeout=10,
@@ -52,12 +63,23 @@ class KuaiShouClient(AbstractApiClient):
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self.graphql = KuaiShouGraphQL()
+        # 按接口类型设置的熔断器，熔断期间该类请求异步等待
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+    def classify_endpoint(self, url: str, **kwargs) -> str:
+        data = kwargs.get("data")
+        operation_name = json.loads(data).get("operationName", "") if isinstance(data, str) else ""
+        return self.operation_endpoint_classes.get(operation_name, ENDPOINT_DETAIL)
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        circuit_breaker = self.circuit_breakers.get(self.classify_endpoint(url, **kwargs))
+        if circuit_breaker:
+            await circuit_breaker.wait_closed()
+        response = await self.send_request(method, url, **kwargs)
         data: Dict = response.json()
         if data.get("errors"):
+            # graphql 返回错误通常是触发了风控，计入错误率
+            self.report_error(response)
             raise DataFetchError(data.get("errors", "unkonw error"))
         else:
             return data.get("data", {})
@@ -189,14 +211,12 @@ class KuaiShouClient(AbstractApiClient):
     async def get_video_all_comments(
         self,
         photo_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ):
         """
         get video all comments include sub comments
         :param photo_id:
-        :param crawl_interval:
         :param callback:
         :param max_count:
         :return:
@@ -215,9 +235,8 @@ class KuaiShouClient(AbstractApiClient):
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(photo_id, comments)
             result.extend(comments)
-            await asyncio.sleep(crawl_interval)
             sub_comments = await self.get_comments_all_sub_comments(
-                comments, photo_id, crawl_interval, callback
+                comments, photo_id, callback
             )
             result.extend(sub_comments)
         return result
@@ -226,7 +245,6 @@ class KuaiShouClient(AbstractApiClient):
         self,
         comments: List[Dict],
         photo_id,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -234,7 +252,6 @@ class KuaiShouClient(AbstractApiClient):
         Args:
             comments: 评论列表
             photo_id: 视频id
-            crawl_interval: 爬取一次评论的延迟单位（秒）
             callback: 一次评论爬取结束后
         Returns:
 
@@ -268,7 +285,6 @@ class KuaiShouClient(AbstractApiClient):
                 comments = vision_sub_comment_list.get("subComments", {})
                 if callback:
                     await callback(photo_id, comments)
-                await asyncio.sleep(crawl_interval)
                 result.extend(comments)
         return result
 
@@ -284,14 +300,12 @@ class KuaiShouClient(AbstractApiClient):
     async def get_all_videos_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
         Args:
             user_id: 用户ID
-            crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
         Returns:
 
@@ -317,6 +331,5 @@ class KuaiShouClient(AbstractApiClient):
 
             if callback:
                 await callback(videos)
-            await asyncio.sleep(crawl_interval)
             result.extend(videos)
         return result
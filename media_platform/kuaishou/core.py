@@ -20,9 +20,6 @@
 
 import asyncio
 import os
-# import random  # Removed as we now use fixed config.CRAWLER_MAX_SLEEP_SEC intervals
-import time
-from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
 from playwright.async_api import (
@@ -36,11 +33,15 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from model.m_kuaishou import VideoUrlInfo, CreatorUrlInfo
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
 from store import kuaishou as kuaishou_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import comment_tasks_var, crawler_type_var, source_keyword_var
+from tools.circuit_breaker import CircuitBreaker
+from tools.rate_limiter import ENDPOINT_COMMENTS
+from tools.seen_index import SEEN_KIND_COMMENT, SEEN_KIND_CONTENT, filter_unseen
+from tools.store_write_queue import mark_seen_after_write
+from var import crawler_type_var, source_keyword_var
 
 from .client import KuaiShouClient
 from .exception import DataFetchError
@@ -58,9 +59,14 @@ class KuaishouCrawler(AbstractCrawler):
         self.index_url = "https://www.kuaishou.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        # 评论请求疑似被封禁时熔断，熔断结束后刷新一次会话
+        self.comment_circuit_breaker = CircuitBreaker(
+            "kuaishou comments", config.KS_BLOCK_COOLDOWN_SEC, self.refresh_session
+        )
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
+        ip_proxy_pool: Optional[ProxyIpPool] = None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
@@ -96,6 +102,8 @@ class KuaishouCrawler(AbstractCrawler):
 
             # Create a client to interact with the kuaishou website.
             self.ks_client = await self.create_ks_client(httpx_proxy_format)
+            # 请求被封禁或代理快过期时，客户端从代理池换一个新代理
+            self.ks_client.ip_pool = ip_proxy_pool
             if not await self.ks_client.pong():
                 login_obj = KuaishouLogin(
                     login_type=config.LOGIN_TYPE,
@@ -122,6 +130,12 @@ class KuaishouCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 释放API客户端持有的HTTP连接池
+            await self.comment_circuit_breaker.close()
+            await self.ks_client.close()
+            if ip_proxy_pool:
+                await ip_proxy_pool.close()
+
             utils.logger.info("[KuaishouCrawler.start] Kuaishou Crawler finished ...")
 
     async def search(self):
@@ -173,10 +187,6 @@ class KuaishouCrawler(AbstractCrawler):
                 # batch fetch video comments
                 page += 1
 
-                # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                 await self.batch_get_video_comments(video_id_list)
 
     async def get_specified_videos(self):
@@ -211,10 +221,6 @@ class KuaishouCrawler(AbstractCrawler):
             try:
                 result = await self.ks_client.get_video_info(video_id)
 
-                # Sleep after fetching video details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.get_video_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video details {video_id}")
-
                 utils.logger.info(
                     f"[KuaishouCrawler.get_video_info_task] Get video_id:{video_id} info result: {result} ..."
                 )
@@ -246,39 +252,46 @@ class KuaishouCrawler(AbstractCrawler):
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
         semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list: List[Task] = []
-        for video_id in video_id_list:
-            task = asyncio.create_task(
-                self.get_comments(video_id, semaphore), name=video_id
+        pending_video_ids = filter_unseen("kuaishou", SEEN_KIND_COMMENT, video_id_list)
+        for requeue_count in range(config.KS_COMMENT_MAX_REQUEUE + 1):
+            if not pending_video_ids:
+                return
+            if requeue_count:
+                utils.logger.info(
+                    f"[KuaishouCrawler.batch_get_video_comments] requeue interrupted video ids:{pending_video_ids}"
+                )
+            need_requeue = await asyncio.gather(
+                *[self.get_comments(video_id, semaphore) for video_id in pending_video_ids]
+            )
+            pending_video_ids = [
+                video_id for video_id, requeue in zip(pending_video_ids, need_requeue) if requeue
+            ]
+        if pending_video_ids:
+            utils.logger.error(
+                f"[KuaishouCrawler.batch_get_video_comments] give up video ids after {config.KS_COMMENT_MAX_REQUEUE} requeues:{pending_video_ids}"
             )
-            task_list.append(task)
-
-        comment_tasks_var.set(task_list)
-        await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore) -> bool:
         """
         get comment for video id
         :param video_id:
         :param semaphore:
-        :return:
+        :return: 是否因为疑似被封禁而中断，需要重新排队
         """
         async with semaphore:
+            await self.comment_circuit_breaker.wait_closed()
             try:
                 utils.logger.info(
                     f"[KuaishouCrawler.get_comments] begin get video_id: {video_id} comments ..."
                 )
 
-                # Sleep before fetching comments
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[KuaishouCrawler.get_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for video {video_id}")
-
                 await self.ks_client.get_video_all_comments(
                     photo_id=video_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                     callback=kuaishou_store.batch_update_ks_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
+                # 评论分页全部爬取完成后才记录，中途失败的视频下次运行会重新爬取
+                await mark_seen_after_write("kuaishou", SEEN_KIND_COMMENT, video_id)
             except DataFetchError as ex:
                 utils.logger.error(
                     f"[KuaishouCrawler.get_comments] get video_id: {video_id} comment error: {ex}"
@@ -287,16 +300,19 @@ class KuaishouCrawler(AbstractCrawler):
                 utils.logger.error(
                     f"[KuaishouCrawler.get_comments] may be been blocked, err:{e}"
                 )
-                # use time.sleeep block main coroutine instead of asyncio.sleep and cacel running comment task
-                # maybe kuaishou block our request, we will take a nap and update the cookie again
-                current_running_tasks = comment_tasks_var.get()
-                for task in current_running_tasks:
-                    task.cancel()
-                time.sleep(20)
-                await self.context_page.goto(f"{self.index_url}?isHome=1")
-                await self.ks_client.update_cookies(
-                    browser_context=self.browser_context
-                )
+                # 熔断评论请求：其他正在进行的评论任务在下一次请求前异步等待，熔断结束后只刷新一次会话
+                self.ks_client.report_blocked()
+                self.comment_circuit_breaker.trip(str(e))
+                return True
+        return False
+
+    async def refresh_session(self):
+        """
+        maybe kuaishou block our request, reload the home page and update the cookie again
+        :return:
+        """
+        await self.context_page.goto(f"{self.index_url}?isHome=1")
+        await self.ks_client.update_cookies(browser_context=self.browser_context)
 
     async def create_ks_client(self, httpx_proxy: Optional[str]) -> KuaiShouClient:
         """Create ks client"""
@@ -318,6 +334,7 @@ class KuaishouCrawler(AbstractCrawler):
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
         )
+        ks_client_obj.circuit_breakers[ENDPOINT_COMMENTS] = self.comment_circuit_breaker
         return ks_client_obj
 
     async def launch_browser(
@@ -410,7 +427,6 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                 callback=self.fetch_creator_video_detail,
             )
 
@@ -424,10 +440,10 @@ class KuaishouCrawler(AbstractCrawler):
         Concurrently obtain the specified post list and save the data
         """
         semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        task_list = [
-            self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
-            for post_item in video_list
-        ]
+        video_ids = filter_unseen(
+            "kuaishou", SEEN_KIND_CONTENT, [post_item.get("photo", {}).get("id") for post_item in video_list]
+        )
+        task_list = [self.get_video_info_task(video_id, semaphore) for video_id in video_ids]
 
         video_details = await asyncio.gather(*task_list)
         for video_detail in video_details:
@@ -20,10 +20,14 @@
 
 from httpx import RequestError
 
+from tools.retry_policy import ERROR_PERMANENT, ERROR_THROTTLED
+
 
 class DataFetchError(RequestError):
     """something error when fetch"""
+    error_class = ERROR_PERMANENT
 
 
 class IPBlockError(RequestError):
     """fetch so fast that the server block us ip"""
+    error_class = ERROR_THROTTLED
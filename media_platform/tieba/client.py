@@ -22,21 +22,24 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode, quote
 
-import requests
 from playwright.async_api import BrowserContext, Page
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import ProxyIpPool
 from tools import utils
+from tools.http_client import is_brotli_available
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_DETAIL, ENDPOINT_SEARCH
+from tools.retry_policy import retry_with_policy
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
 
 
 class BaiduTieBaClient(AbstractApiClient):
+    platform = "tieba"
 
     def __init__(
         self,
@@ -55,44 +58,19 @@ class BaiduTieBaClient(AbstractApiClient):
         }
         self._host = "https://tieba.baidu.com"
         self._page_extractor = TieBaExtractor()
-        self.default_ip_proxy = default_ip_proxy
+        self.proxy = default_ip_proxy
         self.playwright_page = playwright_page  # Playwright页面对象
-
-    def _sync_request(self, method, url, proxy=None, **kwargs):
-        """
-        同步的requests请求方法
-        Args:
-            method: 请求方法
-            url: 请求的URL
-            proxy: 代理IP
-            **kwargs: 其他请求参数
-
-        Returns:
-            response对象
-        """
-        # 构造代理字典
-        proxies = None
-        if proxy:
-            proxies = {
-                "http": proxy,
-                "https": proxy,
-            }
-
-        # 发送请求
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=self.headers,
-            proxies=proxies,
-            timeout=self.timeout,
-            **kwargs
-        )
-        return response
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        if "br" in accept_encoding and not is_brotli_available():
+            # 未安装 brotli 时无法解压 br 编码的响应，不声明支持 br
+            self.headers["Accept-Encoding"] = ", ".join(
+                encoding.strip() for encoding in accept_encoding.split(",") if encoding.strip() != "br"
+            )
+
+    @retry_with_policy()
     async def request(self, method, url, return_ori_content=False, proxy=None, **kwargs) -> Union[str, Any]:
         """
-        封装requests的公共请求方法，对请求响应做一些处理
+        封装httpx的公共请求方法，对请求响应做一些处理
         Args:
             method: 请求方法
             url: 请求的URL
@@ -103,16 +81,9 @@ class BaiduTieBaClient(AbstractApiClient):
         Returns:
 
         """
-        actual_proxy = proxy if proxy else self.default_ip_proxy
-
-        # 在线程池中执行同步的requests请求
-        response = await asyncio.to_thread(
-            self._sync_request,
-            method,
-            url,
-            actual_proxy,
-            **kwargs
-        )
+        # 通过按代理地址复用的长连接池发送请求，未指定代理时使用代理池中的代理
+        headers = kwargs.pop("headers", self.headers)
+        response = await self.send_request(method, url, proxy=proxy, headers=headers, **kwargs)
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -120,6 +91,7 @@ class BaiduTieBaClient(AbstractApiClient):
             raise Exception(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
 
         if response.text == "" or response.text == "blocked":
+            self.report_blocked(response)
             utils.logger.error(f"request params incorrect, response.text: {response.text}")
             raise Exception("account blocked")
 
@@ -147,12 +119,10 @@ class BaiduTieBaClient(AbstractApiClient):
             res = await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, **kwargs)
             return res
         except RetryError as e:
-            if self.ip_pool:
-                proxie_model = await self.ip_pool.get_proxy()
-                _, proxy = utils.format_proxy_info(proxie_model)
-                res = await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, proxy=proxy, **kwargs)
-                self.default_ip_proxy = proxy
-                return res
+            if self.ip_pool and self.proxy:
+                # 当前代理多次重试都失败，从代理池剔除后换新代理再请求
+                self.ip_pool.evict(self.proxy, "max retries reached")
+                return await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, **kwargs)
 
             utils.logger.error(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
             raise Exception(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
@@ -259,12 +229,10 @@ class BaiduTieBaClient(AbstractApiClient):
         utils.logger.info(f"[BaiduTieBaClient.get_notes_by_keyword] 访问搜索页面: {full_url}")
 
         try:
-            # 使用Playwright访问搜索页面
+            # 使用Playwright访问搜索页面，访问前按限速获取令牌
+            await self.wait_rate_limit(ENDPOINT_SEARCH)
             await self.playwright_page.goto(full_url, wait_until="domcontentloaded")
 
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
             utils.logger.info(f"[BaiduTieBaClient.get_notes_by_keyword] 成功获取搜索页面HTML,长度: {len(page_content)}")
@@ -296,12 +264,10 @@ class BaiduTieBaClient(AbstractApiClient):
         utils.logger.info(f"[BaiduTieBaClient.get_note_by_id] 访问帖子详情页面: {note_url}")
 
         try:
-            # 使用Playwright访问帖子详情页面
+            # 使用Playwright访问帖子详情页面，访问前按限速获取令牌
+            await self.wait_rate_limit(ENDPOINT_DETAIL)
             await self.playwright_page.goto(note_url, wait_until="domcontentloaded")
 
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
             utils.logger.info(f"[BaiduTieBaClient.get_note_by_id] 成功获取帖子详情HTML,长度: {len(page_content)}")
@@ -317,7 +283,6 @@ class BaiduTieBaClient(AbstractApiClient):
     async def get_note_all_comments(
         self,
         note_detail: TiebaNote,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ) -> List[TiebaComment]:
@@ -325,7 +290,6 @@ class BaiduTieBaClient(AbstractApiClient):
         获取指定帖子下的所有一级评论 (使用Playwright访问页面,避免API检测)
         Args:
             note_detail: 帖子详情对象
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后的回调函数
             max_count: 一次帖子爬取的最大评论数量
         Returns:
@@ -344,12 +308,10 @@ class BaiduTieBaClient(AbstractApiClient):
             utils.logger.info(f"[BaiduTieBaClient.get_note_all_comments] 访问评论页面: {comment_url}")
 
             try:
-                # 使用Playwright访问评论页面
+                # 使用Playwright访问评论页面，访问前按限速获取令牌
+                await self.wait_rate_limit(ENDPOINT_COMMENTS)
                 await self.playwright_page.goto(comment_url, wait_until="domcontentloaded")
 
-                # 等待页面加载,使用配置文件中的延时设置
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
                 # 获取页面HTML内容
                 page_content = await self.playwright_page.content()
 
@@ -373,10 +335,9 @@ class BaiduTieBaClient(AbstractApiClient):
 
                 # 获取所有子评论
                 await self.get_comments_all_sub_comments(
-                    comments, crawl_interval=crawl_interval, callback=callback
+                    comments, callback=callback
                 )
 
-                await asyncio.sleep(crawl_interval)
                 current_page += 1
 
             except Exception as e:
@@ -389,14 +350,12 @@ class BaiduTieBaClient(AbstractApiClient):
     async def get_comments_all_sub_comments(
         self,
         comments: List[TiebaComment],
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[TiebaComment]:
         """
         获取指定评论下的所有子评论 (使用Playwright访问页面,避免API检测)
         Args:
             comments: 评论列表
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后的回调函数
 
         Returns:
@@ -430,12 +389,10 @@ class BaiduTieBaClient(AbstractApiClient):
                 utils.logger.info(f"[BaiduTieBaClient.get_comments_all_sub_comments] 访问子评论页面: {sub_comment_url}")
 
                 try:
-                    # 使用Playwright访问子评论页面
+                    # 使用Playwright访问子评论页面，访问前按限速获取令牌
+                    await self.wait_rate_limit(ENDPOINT_COMMENTS)
                     await self.playwright_page.goto(sub_comment_url, wait_until="domcontentloaded")
 
-                    # 等待页面加载,使用配置文件中的延时设置
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
                     # 获取页面HTML内容
                     page_content = await self.playwright_page.content()
 
@@ -455,7 +412,6 @@ class BaiduTieBaClient(AbstractApiClient):
                         await callback(parment_comment.note_id, sub_comments)
 
                     all_sub_comments.extend(sub_comments)
-                    await asyncio.sleep(crawl_interval)
                     current_page += 1
 
                 except Exception as e:
@@ -487,12 +443,10 @@ class BaiduTieBaClient(AbstractApiClient):
         utils.logger.info(f"[BaiduTieBaClient.get_notes_by_tieba_name] 访问贴吧页面: {tieba_url}")
 
         try:
-            # 使用Playwright访问贴吧页面
+            # 使用Playwright访问贴吧页面，访问前按限速获取令牌
+            await self.wait_rate_limit(ENDPOINT_SEARCH)
             await self.playwright_page.goto(tieba_url, wait_until="domcontentloaded")
 
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
             utils.logger.info(f"[BaiduTieBaClient.get_notes_by_tieba_name] 成功获取贴吧页面HTML,长度: {len(page_content)}")
@@ -522,12 +476,10 @@ class BaiduTieBaClient(AbstractApiClient):
         utils.logger.info(f"[BaiduTieBaClient.get_creator_info_by_url] 访问创作者主页: {creator_url}")
 
         try:
-            # 使用Playwright访问创作者主页
+            # 使用Playwright访问创作者主页，访问前按限速获取令牌
+            await self.wait_rate_limit(ENDPOINT_DETAIL)
             await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
 
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
             utils.logger.info(f"[BaiduTieBaClient.get_creator_info_by_url] 成功获取创作者主页HTML,长度: {len(page_content)}")
@@ -557,12 +509,10 @@ class BaiduTieBaClient(AbstractApiClient):
         utils.logger.info(f"[BaiduTieBaClient.get_notes_by_creator] 访问创作者帖子列表: {creator_url}")
 
         try:
-            # 使用Playwright访问创作者帖子列表页面
+            # 使用Playwright访问创作者帖子列表页面，访问前按限速获取令牌
+            await self.wait_rate_limit(ENDPOINT_SEARCH)
             await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
 
-            # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-
             # 获取页面内容(这个接口返回JSON)
             page_content = await self.playwright_page.content()
 
@@ -585,7 +535,6 @@ class BaiduTieBaClient(AbstractApiClient):
     async def get_all_notes_by_creator_user_name(
         self,
         user_name: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_note_count: int = 0,
         creator_page_html_content: str = None,
@@ -594,7 +543,6 @@ class BaiduTieBaClient(AbstractApiClient):
         根据创作者用户名获取创作者所有帖子
         Args:
             user_name: 创作者用户名
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后的回调函数，是一个awaitable类型的函数
             max_note_count: 帖子最大获取数量，如果为0则获取所有
             creator_page_html_content: 创作者主页HTML内容
@@ -631,7 +579,6 @@ class BaiduTieBaClient(AbstractApiClient):
             notes = await asyncio.gather(*note_detail_task)
             if callback:
                 await callback(notes)
-            await asyncio.sleep(crawl_interval)
             result.extend(notes)
             page_number += 1
             total_get_count += page_per_count
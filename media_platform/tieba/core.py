@@ -38,6 +38,8 @@ from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
 from store import tieba as tieba_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.seen_index import SEEN_KIND_COMMENT, SEEN_KIND_CONTENT, filter_unseen
+from tools.store_write_queue import mark_seen_after_write
 from var import crawler_type_var, source_keyword_var
 
 from .client import BaiduTieBaClient
@@ -65,6 +67,7 @@ class TieBaCrawler(AbstractCrawler):
 
         """
         playwright_proxy_format, httpx_proxy_format = None, None
+        ip_proxy_pool: Optional[ProxyIpPool] = None
         if config.ENABLE_IP_PROXY:
             utils.logger.info(
                 "[BaiduTieBaCrawler.start] Begin create ip proxy pool ..."
@@ -110,7 +113,7 @@ class TieBaCrawler(AbstractCrawler):
             # Create a client to interact with the baidutieba website.
             self.tieba_client = await self.create_tieba_client(
                 httpx_proxy_format,
-                ip_proxy_pool if config.ENABLE_IP_PROXY else None
+                ip_proxy_pool
             )
 
             # Check login status and perform login if necessary
@@ -139,6 +142,11 @@ class TieBaCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 释放API客户端持有的HTTP连接池
+            await self.tieba_client.close()
+            if ip_proxy_pool:
+                await ip_proxy_pool.close()
+
             utils.logger.info("[BaiduTieBaCrawler.start] Tieba Crawler finished ...")
 
     async def search(self) -> None:
@@ -189,13 +197,11 @@ class TieBaCrawler(AbstractCrawler):
                         f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}"
                     )
                     await self.get_specified_notes(
-                        note_id_list=[note_detail.note_id for note_detail in notes_list]
+                        note_id_list=filter_unseen(
+                            "tieba", SEEN_KIND_CONTENT, [note_detail.note_id for note_detail in notes_list]
+                        )
                     )
 
-                    # Sleep after page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[TieBaCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page}")
-
                     page += 1
                 except Exception as ex:
                     utils.logger.error(
@@ -232,11 +238,9 @@ class TieBaCrawler(AbstractCrawler):
                 utils.logger.info(
                     f"[BaiduTieBaCrawler.get_specified_tieba_notes] tieba name: {tieba_name} note list len: {len(note_list)}"
                 )
-                await self.get_specified_notes([note.note_id for note in note_list])
-
-                # Sleep after processing notes
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_specified_tieba_notes] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after processing notes from page {page_number}")
+                await self.get_specified_notes(
+                    filter_unseen("tieba", SEEN_KIND_CONTENT, [note.note_id for note in note_list])
+                )
 
                 page_number += tieba_limit_count
 
@@ -283,10 +287,6 @@ class TieBaCrawler(AbstractCrawler):
                 )
                 note_detail: TiebaNote = await self.tieba_client.get_note_by_id(note_id)
 
-                # Sleep after fetching note details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_note_detail_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note details {note_id}")
-
                 if not note_detail:
                     utils.logger.error(
                         f"[BaiduTieBaCrawler.get_note_detail] Get note detail error, note_id: {note_id}"
@@ -316,9 +316,14 @@ class TieBaCrawler(AbstractCrawler):
         if not config.ENABLE_GET_COMMENTS:
             return
 
+        unseen_note_ids = set(
+            filter_unseen("tieba", SEEN_KIND_COMMENT, [note_detail.note_id for note_detail in note_detail_list])
+        )
         semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for note_detail in note_detail_list:
+            if note_detail.note_id not in unseen_note_ids:
+                continue
             task = asyncio.create_task(
                 self.get_comments_async_task(note_detail, semaphore),
                 name=note_detail.note_id,
@@ -343,16 +348,13 @@ class TieBaCrawler(AbstractCrawler):
                 f"[BaiduTieBaCrawler.get_comments] Begin get note id comments {note_detail.note_id}"
             )
 
-            # Sleep before fetching comments
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[TieBaCrawler.get_comments_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for note {note_detail.note_id}")
-
             await self.tieba_client.get_note_all_comments(
                 note_detail=note_detail,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
                 callback=tieba_store.batch_update_tieba_note_comments,
                 max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
+            # 评论分页全部爬取完成后才记录，中途失败的帖子下次运行会重新爬取
+            await mark_seen_after_write("tieba", SEEN_KIND_COMMENT, note_detail.note_id)
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -383,7 +385,6 @@ class TieBaCrawler(AbstractCrawler):
                 all_notes_list = (
                     await self.tieba_client.get_all_notes_by_creator_user_name(
                         user_name=creator_info.user_name,
-                        crawl_interval=0,
                         callback=tieba_store.batch_update_tieba_notes,
                         max_note_count=config.CRAWLER_MAX_NOTES_COUNT,
                         creator_page_html_content=creator_page_html_content,
@@ -414,9 +415,9 @@ class TieBaCrawler(AbstractCrawler):
             utils.logger.info("[TieBaCrawler] Step 1: 访问百度首页 https://www.baidu.com/")
             await self.context_page.goto("https://www.baidu.com/", wait_until="domcontentloaded")
 
-            # Step 2: 等待页面加载,使用配置文件中的延时设置
-            utils.logger.info(f"[TieBaCrawler] Step 2: 等待 {config.CRAWLER_MAX_SLEEP_SEC}秒 模拟用户浏览...")
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            # Step 2: 等待页面加载完成
+            utils.logger.info("[TieBaCrawler] Step 2: 等待百度首页加载完成...")
+            await self.context_page.wait_for_load_state("load")
 
             # Step 3: 查找并点击"贴吧"链接
             utils.logger.info("[TieBaCrawler] Step 3: 查找并点击'贴吧'链接...")
@@ -474,9 +475,9 @@ class TieBaCrawler(AbstractCrawler):
                 async with self.context_page.expect_navigation(wait_until="domcontentloaded"):
                     await tieba_link.click()
 
-            # Step 5: 等待页面稳定,使用配置文件中的延时设置
-            utils.logger.info(f"[TieBaCrawler] Step 5: 页面加载完成,等待 {config.CRAWLER_MAX_SLEEP_SEC}秒...")
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            # Step 5: 等待贴吧页面加载完成
+            utils.logger.info("[TieBaCrawler] Step 5: 等待贴吧页面加载完成...")
+            await self.context_page.wait_for_load_state("load")
 
             current_url = self.context_page.url
             utils.logger.info(f"[TieBaCrawler] ✅ 成功通过百度首页进入贴吧! 当前URL: {current_url}")
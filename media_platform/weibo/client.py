@@ -29,19 +29,27 @@ import re
 from typing import Callable, Dict, List, Optional, Union
 from urllib.parse import parse_qs, unquote, urlencode
 
-import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
-from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
+from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_SEARCH
+from tools.retry_policy import retry_with_policy
 
-from .exception import DataFetchError
+from .exception import DataFetchError, IPBlockError
 from .field import SearchType
 
 
-class WeiboClient:
+class WeiboClient(AbstractApiClient):
+    platform = "wb"
+    endpoint_classes = [
+        ("/api/container/getIndex", ENDPOINT_SEARCH),
+        ("/comments/", ENDPOINT_COMMENTS),
+    ]
+    # 432 为请求过于频繁被拦截
+    block_status_codes = (429, 432)
 
     def __init__(
         self,
@@ -60,11 +68,10 @@ class WeiboClient:
         self.cookie_dict = cookie_dict
         self._image_agent_host = "https://i1.wp.com/"
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(3))
+    @retry_with_policy()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         enable_return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, **kwargs)
 
         if enable_return_response:
             return response
@@ -77,7 +84,7 @@ class WeiboClient:
             await self.playwright_page.goto(self._host)
             await asyncio.sleep(2)
             await self.update_cookies(browser_context=self.playwright_page.context)
-            raise DataFetchError(f"get response code error: {response.status_code}")
+            raise IPBlockError(f"get response code error: {response.status_code}")
 
         ok_code = data.get("ok")
         if ok_code == 0:  # response error
@@ -184,14 +191,12 @@ class WeiboClient:
     async def get_note_all_comments(
         self,
         note_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ):
         """
         get note all comments include sub comments
         :param note_id:
-        :param crawl_interval:
         :param callback:
         :param max_count:
         :return:
@@ -210,7 +215,6 @@ class WeiboClient:
                 comment_list = comment_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(note_id, comment_list)
-            await asyncio.sleep(crawl_interval)
             result.extend(comment_list)
             sub_comment_result = await self.get_comments_all_sub_comments(note_id, comment_list, callback)
             result.extend(sub_comment_result)
@@ -251,22 +255,26 @@ class WeiboClient:
         :return:
         """
         url = f"{self._host}/detail/{note_id}"
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if response.status_code != 200:
-                raise DataFetchError(f"get weibo detail err: {response.text}")
-            match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
-            if match:
-                render_data_json = match.group(1)
-                render_data_dict = json.loads(render_data_json)
-                note_detail = render_data_dict[0].get("status")
-                note_item = {"mblog": note_detail}
-                return note_item
-            else:
-                utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
-                return dict()
+        response = await self.send_request("GET", url, headers=self.headers)
+        if response.status_code != 200:
+            raise DataFetchError(f"get weibo detail err: {response.text}")
+        match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
+        if match:
+            render_data_json = match.group(1)
+            render_data_dict = json.loads(render_data_json)
+            note_detail = render_data_dict[0].get("status")
+            note_item = {"mblog": note_detail}
+            return note_item
+        else:
+            utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
+            return dict()
 
-    async def get_note_image(self, image_url: str) -> bytes:
+    def get_image_agent_url(self, image_url: str) -> str:
+        """
+        将微博图片地址转换为高清大图的代理访问地址
+        :param image_url: 微博图片地址
+        :return:
+        """
         image_url = image_url[8:]  # 去掉 https://
         sub_url = image_url.split("/")
         image_url = ""
@@ -279,20 +287,17 @@ class WeiboClient:
                 image_url += sub_url[i] + "/"
         # 微博图床对外存在防盗链，所以需要代理访问
         # 由于微博图片是通过 i1.wp.com 来访问的，所以需要拼接一下
-        final_uri = (f"{self._image_agent_host}"
-                     f"{image_url}")
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", final_uri, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")    # 保留原始异常类型名称，以便开发者调试
-                return None
+        return (f"{self._image_agent_host}"
+                f"{image_url}")
+
+    async def download_note_image(self, image_url: str, save_path: str) -> bool:
+        """
+        流式下载微博图片到本地文件
+        :param image_url: 微博图片地址
+        :param save_path: 保存路径
+        :return: 是否下载成功
+        """
+        return await self.download_media(self.get_image_agent_url(image_url), save_path)
 
     async def get_creator_container_info(self, creator_id: str) -> Dict:
         """
@@ -362,7 +367,6 @@ class WeiboClient:
         self,
         creator_id: str,
         container_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -370,7 +374,6 @@ class WeiboClient:
         Args:
             creator_id:
             container_id:
-            crawl_interval:
             callback:
 
         Returns:
@@ -395,7 +398,6 @@ class WeiboClient:
             notes = [note for note in notes if note.get("card_type") == 9]
             if callback:
                 await callback(notes)
-            await asyncio.sleep(crawl_interval)
             result.extend(notes)
             crawler_total_count += 10
             notes_has_more = notes_res.get("cardlistInfo", {}).get("total", 0) > crawler_total_count
@@ -23,8 +23,8 @@
 # @Desc    : 微博爬虫主流程代码
 
 import asyncio
+import functools
 import os
-# import random  # Removed as we now use fixed config.CRAWLER_MAX_SLEEP_SEC intervals
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -38,10 +38,13 @@ from playwright.async_api import (
 
 import config
 from base.base_crawler import AbstractCrawler
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
 from store import weibo as weibo_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.media_pipeline import MediaDownloadJob, MediaDownloadPipeline
+from tools.seen_index import SEEN_KIND_COMMENT, filter_unseen
+from tools.store_write_queue import mark_seen_after_write
 from var import crawler_type_var, source_keyword_var
 
 from .client import WeiboClient
@@ -63,9 +66,11 @@ class WeiboCrawler(AbstractCrawler):
         self.user_agent = utils.get_user_agent()
         self.mobile_user_agent = utils.get_mobile_user_agent()
         self.cdp_manager = None
+        self.media_pipeline = MediaDownloadPipeline()
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
+        ip_proxy_pool: Optional[ProxyIpPool] = None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
@@ -98,6 +103,8 @@ class WeiboCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.wb_client = await self.create_weibo_client(httpx_proxy_format)
+            # 请求被封禁或代理快过期时，客户端从代理池换一个新代理
+            self.wb_client.ip_pool = ip_proxy_pool
             if not await self.wb_client.pong():
                 login_obj = WeiboLogin(
                     login_type=config.LOGIN_TYPE,
@@ -130,6 +137,12 @@ class WeiboCrawler(AbstractCrawler):
                 await self.get_creators_and_notes()
             else:
                 pass
+            # 等待后台媒体下载任务完成后，再释放API客户端持有的HTTP连接池
+            await self.media_pipeline.drain()
+            await self.wb_client.close()
+            if ip_proxy_pool:
+                await ip_proxy_pool.close()
+
             utils.logger.info("[WeiboCrawler.start] Weibo Crawler finished ...")
 
     async def search(self):
@@ -179,10 +192,6 @@ class WeiboCrawler(AbstractCrawler):
 
                 page += 1
 
-                # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
-
                 await self.batch_get_notes_comments(note_id_list)
 
     async def get_specified_notes(self):
@@ -209,10 +218,6 @@ class WeiboCrawler(AbstractCrawler):
             try:
                 result = await self.wb_client.get_note_info_by_id(note_id)
 
-                # Sleep after fetching note details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.get_note_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note details {note_id}")
-
                 return result
             except DataFetchError as ex:
                 utils.logger.error(f"[WeiboCrawler.get_note_info_task] Get note detail error: {ex}")
@@ -234,7 +239,7 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}")
         semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
-        for note_id in note_id_list:
+        for note_id in filter_unseen("weibo", SEEN_KIND_COMMENT, note_id_list):
             task = asyncio.create_task(self.get_note_comments(note_id, semaphore), name=note_id)
             task_list.append(task)
         await asyncio.gather(*task_list)
@@ -250,16 +255,13 @@ class WeiboCrawler(AbstractCrawler):
             try:
                 utils.logger.info(f"[WeiboCrawler.get_note_comments] begin get note_id: {note_id} comments ...")
 
-                # Sleep before fetching comments
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[WeiboCrawler.get_note_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for note {note_id}")
-
                 await self.wb_client.get_note_all_comments(
                     note_id=note_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,  # Use fixed interval instead of random
                     callback=weibo_store.batch_update_weibo_note_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
+                # 评论分页全部爬取完成后才记录，中途失败的微博下次运行会重新爬取
+                await mark_seen_after_write("weibo", SEEN_KIND_COMMENT, note_id)
             except DataFetchError as ex:
                 utils.logger.error(f"[WeiboCrawler.get_note_comments] get note_id: {note_id} comment error: {ex}")
             except Exception as e:
@@ -282,12 +284,13 @@ class WeiboCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.wb_client.get_note_image(url)
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[WeiboCrawler.get_note_images] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching image")
-            if content != None:
-                extension_file_name = url.split(".")[-1]
-                await weibo_store.update_weibo_note_image(pic["pid"], content, extension_file_name)
+            extension_file_name = url.split(".")[-1]
+            await self.media_pipeline.submit(MediaDownloadJob(
+                platform="weibo",
+                url=url,
+                download_func=self.wb_client.download_note_image,
+                store_func=functools.partial(weibo_store.update_weibo_note_image, pic["pid"], extension_file_name=extension_file_name),
+            ))
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -309,7 +312,6 @@ class WeiboCrawler(AbstractCrawler):
                 all_notes_list = await self.wb_client.get_all_notes_by_creator_id(
                     creator_id=user_id,
                     container_id=f"107603{user_id}",
-                    crawl_interval=0,
                     callback=weibo_store.batch_update_weibo_notes,
                 )
 
@@ -20,27 +20,38 @@
 import asyncio
 import json
 import time
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
 from urllib.parse import urlencode, urlparse, parse_qs
 
 
 import httpx
 from playwright.async_api import BrowserContext, Page
-from tenacity import retry, stop_after_attempt, wait_fixed
 from xhshow import Xhshow
 
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.browser_state_cache import BrowserStateCache
+from tools.http_client import build_request_headers
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_SEARCH
+from tools.retry_policy import mark_non_retryable, retry_with_policy
 
 
-from .exception import DataFetchError, IPBlockError
+from .exception import AuthExpiredError, DataFetchError, IPBlockError
 from .field import SearchNoteType, SearchSortType
 from .help import get_search_id, sign
 from .extractor import XiaoHongShuExtractor
 
 
 class XiaoHongShuClient(AbstractApiClient):
+    platform = "xhs"
+    endpoint_classes = [
+        ("/search/notes", ENDPOINT_SEARCH),
+        ("/user_posted", ENDPOINT_SEARCH),
+        ("/comment/", ENDPOINT_COMMENTS),
+    ]
+    # 461/471 为需要验证码
+    block_status_codes = (429, 461, 471)
 
     def __init__(
         self,
@@ -65,8 +76,15 @@ class XiaoHongShuClient(AbstractApiClient):
         self._extractor = XiaoHongShuExtractor()
         # 初始化 xhshow 客户端用于签名生成
         self._xhshow_client = Xhshow()
+        # 签名用到的 localStorage 快照，避免每次请求都访问浏览器
+        self._local_storage_cache = BrowserStateCache(self._load_local_storage)
 
-    async def _pre_headers(self, url: str, params: Optional[Dict] = None, payload: Optional[Dict] = None) -> Dict:
+    async def _load_local_storage(self) -> Dict:
+        if not self.playwright_page:
+            return {}
+        return await self.playwright_page.evaluate("() => window.localStorage")
+
+    async def _pre_headers(self, url: str, params: Optional[Dict] = None, payload: Optional[Dict] = None) -> Mapping[str, str]:
         """请求头参数签名
 
         Args:
@@ -75,8 +93,10 @@ class XiaoHongShuClient(AbstractApiClient):
             payload: POST请求的参数
 
         Returns:
-            Dict: 请求头参数签名
+            Mapping: 本次请求专用的只读请求头，不会修改 self.headers，并发请求之间互不影响
         """
+        # 签名前先固定 cookie 和公共请求头，避免等待期间 update_cookies 导致签名和 cookie 不一致
+        base_headers = dict(self.headers)
         a1_value = self.cookie_dict.get("a1", "")
         parsed = urlparse(url)
         uri = parsed.path
@@ -94,11 +114,8 @@ class XiaoHongShuClient(AbstractApiClient):
         # 获取 b1 值
         b1_value = ""
         try:
-            if self.playwright_page:
-                local_storage = await self.playwright_page.evaluate(
-                    "() => window.localStorage"
-                )
-                b1_value = local_storage.get("b1", "")
+            local_storage = await self._local_storage_cache.get()
+            b1_value = local_storage.get("b1", "")
         except Exception as e:
             utils.logger.warning(
                 f"[XiaoHongShuClient._pre_headers] Failed to get b1 from localStorage: {e}"
@@ -111,16 +128,14 @@ class XiaoHongShuClient(AbstractApiClient):
             x_t=str(int(time.time() * 1000)),
         )
 
-        headers = {
+        return build_request_headers(base_headers, {
             "X-S": signs["x-s"],
             "X-T": signs["x-t"],
             "x-S-Common": signs["x-s-common"],
             "X-B3-Traceid": signs["x-b3-traceid"],
-        }
-        self.headers.update(headers)
-        return self.headers
+        })
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry_with_policy()
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -134,8 +149,11 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, **kwargs)
+
+        if response.status_code != 200:
+            # 出现验证码或请求失败时，签名用到的 b1 可能已经过期，下次请求重新从浏览器读取
+            self._local_storage_cache.invalidate()
 
         # 检查状态码
         if response.status_code == 471 or response.status_code == 461:
@@ -144,13 +162,20 @@ class XiaoHongShuClient(AbstractApiClient):
             verify_uuid = response.headers.get("Verifyuuid", "unknown")
             msg = f"出现验证码,请求失败,Verifytype: {verify_type},Verifyuuid: {verify_uuid}, Response: {response.text[:200]}"
             utils.logger.error(msg)
-            raise Exception(msg)
-        
-        # 检查其他错误状态码
+            # send_request 已经按封禁上报（暂停该平台请求并剔除代理），这里不再重试，避免同一次封禁被重复计数
+            raise mark_non_retryable(IPBlockError(msg))
+
+        if response.status_code == 401:
+            # 请求头在 get/post 中签名，用同一组请求头重试不会成功，交给调用方重新签名后请求
+            msg = f"登录态或签名失效,状态码: {response.status_code}, 响应: {response.text[:200]}"
+            utils.logger.error(msg)
+            raise mark_non_retryable(AuthExpiredError(msg))
+
+        # 检查其他错误状态码，按状态码分类：429 为限流，5xx 为偶发错误，其他 4xx 为确定性失败不再重试
         if response.status_code != 200:
             msg = f"请求失败,状态码: {response.status_code}, 响应: {response.text[:200]}"
             utils.logger.error(msg)
-            raise Exception(msg)
+            raise httpx.HTTPStatusError(msg, request=response.request, response=response)
 
         if return_response:
             return response.text
@@ -165,7 +190,8 @@ class XiaoHongShuClient(AbstractApiClient):
         if data.get("success"):
             return data.get("data", data.get("success", {}))
         elif data.get("code") == self.IP_ERROR_CODE:
-            raise IPBlockError(self.IP_ERROR_STR)
+            self.report_blocked(response)
+            raise mark_non_retryable(IPBlockError(self.IP_ERROR_STR))
         else:
             err_msg = data.get("msg", None) or f"{response.text[:200]}"
             raise DataFetchError(err_msg)
@@ -214,25 +240,17 @@ class XiaoHongShuClient(AbstractApiClient):
             **kwargs,
         )
 
-    async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(
-                        f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                    )
-                    return None
-                else:
-                    return response.content
-            except (
-                httpx.HTTPError
-            ) as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(
-                    f"[XiaoHongShuClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}"
-                )  # 保留原始异常类型名称，以便开发者调试
-                return None
+    async def download_note_media(self, url: str, save_path: str) -> bool:
+        """
+        流式下载笔记的图片或视频到本地文件
+        Args:
+            url: 媒体文件地址
+            save_path: 保存路径
+
+        Returns:
+            是否下载成功
+        """
+        return await self.download_media(url, save_path)
 
     async def pong(self) -> bool:
         """
@@ -266,6 +284,7 @@ class XiaoHongShuClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        self._local_storage_cache.invalidate()
 
     async def get_note_by_keyword(
         self,
@@ -402,7 +421,6 @@ class XiaoHongShuClient(AbstractApiClient):
         self,
         note_id: str,
         xsec_token: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ) -> List[Dict]:
@@ -411,7 +429,6 @@ class XiaoHongShuClient(AbstractApiClient):
         Args:
             note_id: 笔记ID
             xsec_token: 验证token
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
             max_count: 一次笔记爬取的最大评论数量
         Returns:
@@ -436,12 +453,10 @@ class XiaoHongShuClient(AbstractApiClient):
                 comments = comments[: max_count - len(result)]
             if callback:
                 await callback(note_id, comments)
-            await asyncio.sleep(crawl_interval)
             result.extend(comments)
             sub_comments = await self.get_comments_all_sub_comments(
                 comments=comments,
                 xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
                 callback=callback,
             )
             result.extend(sub_comments)
@@ -451,7 +466,6 @@ class XiaoHongShuClient(AbstractApiClient):
         self,
         comments: List[Dict],
         xsec_token: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -459,7 +473,6 @@ class XiaoHongShuClient(AbstractApiClient):
         Args:
             comments: 评论列表
             xsec_token: 验证token
-            crawl_interval: 爬取一次评论的延迟单位（秒）
             callback: 一次评论爬取结束后
 
         Returns:
@@ -509,7 +522,6 @@ class XiaoHongShuClient(AbstractApiClient):
                 comments = comments_res["comments"]
                 if callback:
                     await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
                 result.extend(comments)
         return result
 
@@ -571,7 +583,6 @@ class XiaoHongShuClient(AbstractApiClient):
     async def get_all_notes_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         xsec_token: str = "",
         xsec_source: str = "pc_feed",
@@ -580,7 +591,6 @@ class XiaoHongShuClient(AbstractApiClient):
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
         Args:
             user_id: 用户ID
-            crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
             xsec_token: 验证token
             xsec_source: 渠道来源
@@ -623,7 +633,6 @@ class XiaoHongShuClient(AbstractApiClient):
                 await callback(notes_to_add)
 
             result.extend(notes_to_add)
-            await asyncio.sleep(crawl_interval)
 
         utils.logger.info(
             f"[XiaoHongShuClient.get_all_notes_by_creator] Finished getting notes for user {user_id}, total: {len(result)}"
@@ -643,7 +652,6 @@ class XiaoHongShuClient(AbstractApiClient):
         data = {"original_url": f"{self._domain}/discovery/item/{note_id}"}
         return await self.post(uri, data=data, return_response=True)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_note_by_id_from_html(
         self,
         note_id: str,
@@ -652,7 +660,7 @@ class XiaoHongShuClient(AbstractApiClient):
         enable_cookie: bool = False,
     ) -> Optional[Dict]:
         """
-        通过解析网页版的笔记详情页HTML，获取笔记详情, 该接口可能会出现失败的情况，这里尝试重试3次
+        通过解析网页版的笔记详情页HTML，获取笔记详情, 该接口可能会出现失败的情况，由 request 按统一重试策略重试
         copy from https://github.com/ReaJason/xhs/blob/eb1c5a0213f6fbb592f0a2897ee552847c69ea2d/xhs/core.py#L217-L259
         thanks for ReaJason
         Args:
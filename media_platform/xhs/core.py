@@ -18,8 +18,8 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
+import functools
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional
 
@@ -36,14 +36,17 @@ import config
 from base.base_crawler import AbstractCrawler
 from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo, CreatorUrlInfo
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
 from store import xhs as xhs_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.media_pipeline import MediaDownloadJob, MediaDownloadPipeline
+from tools.seen_index import SEEN_KIND_COMMENT, SEEN_KIND_CONTENT, is_seen
+from tools.store_write_queue import mark_seen_after_write
 from var import crawler_type_var, source_keyword_var
 
 from .client import XiaoHongShuClient
-from .exception import DataFetchError
+from .exception import AuthExpiredError, DataFetchError, IPBlockError
 from .field import SearchSortType
 from .help import parse_note_info_from_note_url, parse_creator_info_from_url, get_search_id
 from .login import XiaoHongShuLogin
@@ -60,9 +63,11 @@ class XiaoHongShuCrawler(AbstractCrawler):
         # self.user_agent = utils.get_user_agent()
         self.user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
         self.cdp_manager = None
+        self.media_pipeline = MediaDownloadPipeline()
 
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
+        ip_proxy_pool: Optional[ProxyIpPool] = None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
@@ -96,6 +101,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
+            # 请求被封禁或代理快过期时，客户端从代理池换一个新代理
+            self.xhs_client.ip_pool = ip_proxy_pool
             if not await self.xhs_client.pong():
                 login_obj = XiaoHongShuLogin(
                     login_type=config.LOGIN_TYPE,
@@ -120,6 +127,12 @@ class XiaoHongShuCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 等待后台媒体下载任务完成后，再释放API客户端持有的HTTP连接池
+            await self.media_pipeline.drain()
+            await self.xhs_client.close()
+            if ip_proxy_pool:
+                await ip_proxy_pool.close()
+
             utils.logger.info("[XiaoHongShuCrawler.start] Xhs Crawler finished ...")
 
     async def search(self) -> None:
@@ -193,12 +206,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                         utils.logger.info("No more content!")
                         break
                     
-                    # 获取已存在的笔记ID集合（用于断点续爬）
-                    existing_note_ids = xhs_store.XhsStoreFactory.get_existing_note_ids()
-                    if existing_note_ids:
-                        utils.logger.info(f"[XiaoHongShuCrawler.search] Found {len(existing_note_ids)} existing notes, will skip them")
-                    
-                    # 过滤已爬取的笔记，只对新笔记请求详情
+                    # 过滤已爬取的笔记（断点续爬），只对新笔记请求详情
                     semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
                     task_list = []
                     skipped_count = 0
@@ -210,7 +218,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                         note_id = post_item.get("id")
                         
                         # 检查是否已爬取，已存在则跳过
-                        if note_id in existing_note_ids:
+                        if is_seen("xhs", SEEN_KIND_CONTENT, note_id):
                             utils.logger.info(f"[XiaoHongShuCrawler.search] Skip existing note: {note_id}")
                             skipped_count += 1
                             continue
@@ -231,7 +239,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
                     if not task_list:
                         utils.logger.info(f"[XiaoHongShuCrawler.search] No new notes on page {page}, continue to next page")
                         page += 1
-                        await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
                         continue
                     
                     note_details = await asyncio.gather(*task_list)
@@ -282,9 +289,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
                     utils.logger.info(f"[XiaoHongShuCrawler.search] Note details: {note_details}")
                     await self.batch_get_note_comments(note_ids, xsec_tokens)
 
-                    # Sleep after each page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
                 except DataFetchError:
                     utils.logger.error("[XiaoHongShuCrawler.search] Get note detail error")
                     break
@@ -311,12 +315,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 utils.logger.error(f"[XiaoHongShuCrawler.get_creators_and_notes] Failed to parse creator URL: {e}")
                 continue
 
-            # Use fixed crawling interval
-            crawl_interval = config.CRAWLER_MAX_SLEEP_SEC
             # Get all note information of the creator
             all_notes_list = await self.xhs_client.get_all_notes_by_creator(
                 user_id=user_id,
-                crawl_interval=crawl_interval,
                 callback=self.fetch_creator_notes_detail,
                 xsec_token=creator_info.xsec_token,
                 xsec_source=creator_info.xsec_source,
@@ -340,7 +341,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 xsec_source=post_item.get("xsec_source"),
                 xsec_token=post_item.get("xsec_token"),
                 semaphore=semaphore,
-            ) for post_item in note_list
+            ) for post_item in note_list if not is_seen("xhs", SEEN_KIND_CONTENT, post_item.get("note_id"))
         ]
 
         note_details = await asyncio.gather(*task_list)
@@ -403,7 +404,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
             try:
                 try:
                     note_detail = await self.xhs_client.get_note_by_id(note_id, xsec_source, xsec_token)
-                except RetryError:
+                except (RetryError, DataFetchError, IPBlockError, AuthExpiredError):
+                    # 接口获取失败（包括出现验证码、签名失效）时从网页HTML中解析
                     pass
 
                 if not note_detail:
@@ -414,10 +416,6 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
                 note_detail.update({"xsec_token": xsec_token, "xsec_source": xsec_source})
 
-                # Sleep after fetching note detail
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[get_note_detail_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note {note_id}")
-
                 return note_detail
 
             except DataFetchError as ex:
@@ -433,18 +431,13 @@ class XiaoHongShuCrawler(AbstractCrawler):
             utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Crawling comment mode is not enabled")
             return
 
-        # 获取已经爬取过评论的笔记ID集合（用于断点续爬）
-        existing_comment_note_ids = xhs_store.XhsStoreFactory.get_existing_comment_note_ids()
-        if existing_comment_note_ids:
-            utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Found {len(existing_comment_note_ids)} notes with existing comments, will skip them")
-        
-        # 过滤已爬取过评论的笔记
+        # 过滤已爬取过评论的笔记（断点续爬）
         filtered_note_list = []
         filtered_xsec_tokens = []
         skipped_count = 0
         
         for index, note_id in enumerate(note_list):
-            if note_id in existing_comment_note_ids:
+            if is_seen("xhs", SEEN_KIND_COMMENT, note_id):
                 utils.logger.info(f"[XiaoHongShuCrawler.batch_get_note_comments] Skip note {note_id} - comments already crawled")
                 skipped_count += 1
                 continue
@@ -470,19 +463,14 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """Get note comments with keyword filtering and quantity limitation"""
         async with semaphore:
             utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}")
-            # Use fixed crawling interval
-            crawl_interval = config.CRAWLER_MAX_SLEEP_SEC
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
                 callback=xhs_store.batch_update_xhs_note_comments,
                 max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
-
-            # Sleep after fetching comments
-            await asyncio.sleep(crawl_interval)
-            utils.logger.info(f"[XiaoHongShuCrawler.get_comments] Sleeping for {crawl_interval} seconds after fetching comments for note {note_id}")
+            # 评论分页全部爬取完成后才记录，中途失败的笔记下次运行会重新爬取
+            await mark_seen_after_write("xhs", SEEN_KIND_COMMENT, note_id)
 
     async def create_xhs_client(self, httpx_proxy: Optional[str]) -> XiaoHongShuClient:
         """Create xhs client"""
@@ -613,13 +601,14 @@ class XiaoHongShuCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{picNum}.jpg"
             picNum += 1
-            await xhs_store.update_xhs_note_image(note_id, content, extension_file_name)
+            await self.media_pipeline.submit(MediaDownloadJob(
+                platform="xhs",
+                url=url,
+                download_func=self.xhs_client.download_note_media,
+                store_func=functools.partial(xhs_store.update_xhs_note_image, note_id, extension_file_name=extension_file_name),
+            ))
 
     async def get_notice_video(self, note_item: Dict):
         """
@@ -637,10 +626,11 @@ class XiaoHongShuCrawler(AbstractCrawler):
             return
         videoNum = 0
         for url in videos:
-            content = await self.xhs_client.get_note_media(url)
-            await asyncio.sleep(random.random())
-            if content is None:
-                continue
             extension_file_name = f"{videoNum}.mp4"
             videoNum += 1
-            await xhs_store.update_xhs_note_video(note_id, content, extension_file_name)
+            await self.media_pipeline.submit(MediaDownloadJob(
+                platform="xhs",
+                url=url,
+                download_func=self.xhs_client.download_note_media,
+                store_func=functools.partial(xhs_store.update_xhs_note_video, note_id, extension_file_name=extension_file_name),
+            ))
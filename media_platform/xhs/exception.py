@@ -20,10 +20,19 @@
 
 from httpx import RequestError
 
+from tools.retry_policy import ERROR_AUTH_EXPIRED, ERROR_PERMANENT, ERROR_THROTTLED
+
 
 class DataFetchError(RequestError):
     """something error when fetch"""
+    error_class = ERROR_PERMANENT
 
 
 class IPBlockError(RequestError):
     """fetch so fast that the server block us ip"""
+    error_class = ERROR_THROTTLED
+
+
+class AuthExpiredError(RequestError):
+    """login state or signature expired"""
+    error_class = ERROR_AUTH_EXPIRED
@@ -20,19 +20,21 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import json
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
 from urllib.parse import urlencode
 
 import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
-from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
 from base.base_crawler import AbstractApiClient
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from tools import utils
+from tools.http_client import build_request_headers
+from tools.rate_limiter import ENDPOINT_COMMENTS, ENDPOINT_SEARCH
+from tools.retry_policy import retry_with_policy
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
@@ -40,6 +42,14 @@ from .help import ZhihuExtractor, sign
 
 
 class ZhiHuClient(AbstractApiClient):
+    platform = "zhihu"
+    endpoint_classes = [
+        ("/search_v3", ENDPOINT_SEARCH),
+        ("/members/", ENDPOINT_SEARCH),
+        ("/comment_v5/", ENDPOINT_COMMENTS),
+    ]
+    # 403 为触发风控需要验证
+    block_status_codes = (429, 403)
 
     def __init__(
         self,
@@ -56,24 +66,26 @@ class ZhiHuClient(AbstractApiClient):
         self.cookie_dict = cookie_dict
         self._extractor = ZhihuExtractor()
 
-    async def _pre_headers(self, url: str) -> Dict:
+    async def _pre_headers(self, url: str) -> Mapping[str, str]:
         """
         请求头参数签名
         Args:
             url:  请求的URL需要包含请求的参数
         Returns:
-
+            本次请求专用的只读请求头，并发请求之间互不影响
         """
         d_c0 = self.cookie_dict.get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
-        headers = self.default_headers.copy()
-        headers['x-zst-81'] = sign_res["x-zst-81"]
-        headers['x-zse-96'] = sign_res["x-zse-96"]
-        return headers
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+        # 签名前先固定请求头，保证签名用的 cookie 和实际发送的 cookie 一致
+        base_headers = dict(self.default_headers)
+        sign_res = await sign(url, base_headers["cookie"])
+        return build_request_headers(base_headers, {
+            'x-zst-81': sign_res["x-zst-81"],
+            'x-zse-96': sign_res["x-zse-96"],
+        })
+
+    @retry_with_policy()
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -88,8 +100,7 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, **kwargs)
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
@@ -273,14 +284,12 @@ class ZhiHuClient(AbstractApiClient):
     async def get_note_all_comments(
         self,
         content: ZhihuContent,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuComment]:
         """
         获取指定帖子下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
         Args:
             content: 内容详情对象(问题｜文章｜视频)
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
@@ -306,15 +315,13 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(comments)
 
             result.extend(comments)
-            await self.get_comments_all_sub_comments(content, comments, crawl_interval=crawl_interval, callback=callback)
-            await asyncio.sleep(crawl_interval)
+            await self.get_comments_all_sub_comments(content, comments, callback=callback)
         return result
 
     async def get_comments_all_sub_comments(
         self,
         content: ZhihuContent,
         comments: List[ZhihuComment],
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuComment]:
         """
@@ -322,7 +329,6 @@ class ZhiHuClient(AbstractApiClient):
         Args:
             content: 内容详情对象(问题｜文章｜视频)
             comments: 评论列表
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
@@ -355,7 +361,6 @@ class ZhiHuClient(AbstractApiClient):
                     await callback(sub_comments)
 
                 all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
         return all_sub_comments
 
     async def get_creator_info(self, url_token: str) -> Optional[ZhihuCreator]:
@@ -434,12 +439,11 @@ class ZhiHuClient(AbstractApiClient):
         }
         return await self.get(uri, params)
 
-    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0, callback: Optional[Callable] = None) -> List[ZhihuContent]:
+    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, callback: Optional[Callable] = None) -> List[ZhihuContent]:
         """
         获取创作者的所有回答
         Args:
             creator: 创作者信息
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
@@ -461,20 +465,17 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_articles_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有文章
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -495,20 +496,17 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_videos_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有视频
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -529,7 +527,6 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_answer_info(
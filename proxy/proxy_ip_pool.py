@@ -21,11 +21,13 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
 # @Desc    : ip代理池实现
+import asyncio
 import random
-from typing import Dict, List
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
 from proxy.providers import (
@@ -33,11 +35,49 @@ from proxy.providers import (
     new_wandou_http_proxy,
 )
 from tools import utils
+from tools.retry_policy import retry_with_policy
 
 from .base_proxy import ProxyProvider
 from .types import IpInfoModel, ProviderNameEnum
 
 
+def get_httpx_proxy_url(proxy: IpInfoModel) -> str:
+    """
+    代理对应的 httpx 代理地址，同时作为代理在池子里的唯一标识
+    Args:
+        proxy: 代理信息
+
+    Returns:
+
+    """
+    if proxy.user and proxy.password:
+        return f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
+    return f"http://{proxy.ip}:{proxy.port}"
+
+
+@dataclass
+class ProxyState:
+    """代理的健康状态，分数由成功率、延迟和被封禁次数计算"""
+    proxy: IpInfoModel
+    validated: bool = False
+    success_count: int = 0
+    failure_count: int = 0
+    consecutive_failures: int = 0
+    block_count: int = 0
+    # 请求耗时的指数移动平均，单位秒
+    latency: Optional[float] = None
+
+    @property
+    def score(self) -> float:
+        # 成功率加上先验，没有请求过的新代理按 50% 计算，避免一次失败就被排到最后
+        success_rate = (self.success_count + 1) / (self.success_count + self.failure_count + 2)
+        return success_rate / (1 + (self.latency or 0)) / (1 + self.block_count)
+
+    def is_expiring(self, now: float) -> bool:
+        expired_time_ts = self.proxy.expired_time_ts
+        return bool(expired_time_ts) and now + config.PROXY_EXPIRE_BUFFER_SEC >= expired_time_ts
+
+
 class ProxyIpPool:
 
     def __init__(
@@ -53,16 +93,46 @@ class ProxyIpPool:
         self.valid_ip_url = "https://echo.apifox.cn/"  # 验证 IP 是否有效的地址
         self.ip_pool_count = ip_pool_count
         self.enable_validate_ip = enable_validate_ip
-        self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
+        self._states: Dict[str, ProxyState] = {}
+        # 被剔除的代理及其过期时间，代理商缓存里可能还有，补充时跳过
+        self._evicted: Dict[str, Optional[int]] = {}
+        self._refill_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # 代理被剔除时的回调，参数为 httpx 代理地址
+        self._evict_listeners: List[Callable[[str], None]] = []
+
+    @property
+    def proxy_list(self) -> List[IpInfoModel]:
+        return [state.proxy for state in self._states.values()]
 
     async def load_proxies(self) -> None:
         """
-        加载IP代理
+        从代理商补充代理，直到池子里未过期的代理达到 ip_pool_count 个
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxy(self.ip_pool_count)
+        self._remove_expiring()
+        need_count = self.ip_pool_count - len(self._states)
+        if need_count <= 0:
+            return
+        now = time.time()
+        self._evicted = {
+            url: expired_time_ts for url, expired_time_ts in self._evicted.items()
+            if not expired_time_ts or expired_time_ts > now
+        }
+        # 代理商优先返回缓存中的IP（包括池子里已有的和已剔除的），多取一些把它们跳过
+        proxies = await self.ip_provider.get_proxy(self.ip_pool_count + len(self._evicted))
+        for proxy in proxies:
+            proxy_url = get_httpx_proxy_url(proxy)
+            if proxy_url in self._states or proxy_url in self._evicted:
+                continue
+            state = ProxyState(proxy=proxy)
+            if state.is_expiring(now):
+                continue
+            self._states[proxy_url] = state
+            if len(self._states) >= self.ip_pool_count:
+                break
 
     async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
         """
@@ -75,12 +145,7 @@ class ProxyIpPool:
         )
         try:
             # httpx 0.28.1 需要直接传入代理URL字符串，而不是字典
-            if proxy.user and proxy.password:
-                proxy_url = f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
-            else:
-                proxy_url = f"http://{proxy.ip}:{proxy.port}"
-
-            async with httpx.AsyncClient(proxy=proxy_url) as client:
+            async with httpx.AsyncClient(proxy=get_httpx_proxy_url(proxy)) as client:
                 response = await client.get(self.valid_ip_url)
             if response.status_code == 200:
                 return True
@@ -92,31 +157,157 @@ class ProxyIpPool:
             )
             raise e
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @retry_with_policy()
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        租用一个代理IP：从池子里选健康分最高的代理（分数相同时随机），代理可以被多个请求同时使用
+        池子里没有可用代理时先从代理商补充
         :return:
         """
-        if len(self.proxy_list) == 0:
-            await self._reload_proxies()
+        self._ensure_refresh_task()
+        self._remove_expiring()
+        if not self._states:
+            await self._refill()
+        if not self._states:
+            raise Exception("[ProxyIpPool.get_proxy] no proxy available from provider")
 
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy)  # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
+        best_score = max(state.score for state in self._states.values())
+        proxy_url, state = random.choice(
+            [(url, state) for url, state in self._states.items() if state.score >= best_score]
+        )
+        if self.enable_validate_ip and not state.validated:
+            try:
+                is_valid = await self._is_valid_proxy(state.proxy)
+            except Exception:
+                is_valid = False
+            if not is_valid:
+                self.evict(proxy_url, "validate failed")
                 raise Exception(
                     "[ProxyIpPool.get_proxy] current ip invalid and again get it"
                 )
-        return proxy
+            state.validated = True
+        return state.proxy
 
-    async def _reload_proxies(self):
+    def is_usable(self, proxy_url: str) -> bool:
         """
-        # 重新加载代理池
-        :return:
+        代理是否还在池子里（没有被剔除，也没有快过期）
+        Args:
+            proxy_url: httpx 代理地址
+
+        Returns:
+
+        """
+        state = self._states.get(proxy_url)
+        return state is not None and not state.is_expiring(time.time())
+
+    def report_success(self, proxy_url: str, latency: Optional[float] = None) -> None:
+        """
+        上报一次成功的请求
+        Args:
+            proxy_url: httpx 代理地址
+            latency: 请求耗时，单位秒，为None时（例如耗时取决于文件大小的媒体下载）不更新延迟
+
+        Returns:
+
+        """
+        state = self._states.get(proxy_url)
+        if not state:
+            return
+        state.success_count += 1
+        state.consecutive_failures = 0
+        if latency is not None:
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+
+    def report_failure(self, proxy_url: str) -> None:
+        """
+        上报一次网络错误，连续失败 PROXY_MAX_CONSECUTIVE_FAILURES 次后剔除
+        Args:
+            proxy_url: httpx 代理地址
+
+        Returns:
+
+        """
+        state = self._states.get(proxy_url)
+        if not state:
+            return
+        state.failure_count += 1
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= config.PROXY_MAX_CONSECUTIVE_FAILURES:
+            self.evict(proxy_url, f"{state.consecutive_failures} consecutive failures")
+
+    def report_blocked(self, proxy_url: str) -> None:
+        """
+        上报代理被封禁，立即剔除，使用该代理的客户端在下一次请求前换成新代理
+        Args:
+            proxy_url: httpx 代理地址
+
+        Returns:
+
+        """
+        state = self._states.get(proxy_url)
+        if not state:
+            return
+        state.block_count += 1
+        self.evict(proxy_url, "blocked")
+
+    def add_evict_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        注册代理被剔除时的回调，使用代理的客户端用来关闭该代理对应的连接池，同一个回调只注册一次
+        Args:
+            listener: 回调函数，参数为被剔除的 httpx 代理地址
+
+        Returns:
+
+        """
+        if listener not in self._evict_listeners:
+            self._evict_listeners.append(listener)
+
+    def evict(self, proxy_url: str, reason: str) -> None:
+        state = self._states.pop(proxy_url, None)
+        if not state:
+            return
+        self._evicted[proxy_url] = state.proxy.expired_time_ts
+        utils.logger.warning(
+            f"[ProxyIpPool.evict] evict proxy {state.proxy.ip}:{state.proxy.port}, reason: {reason}, "
+            f"success: {state.success_count}, failure: {state.failure_count}, block: {state.block_count}"
+        )
+        for listener in self._evict_listeners:
+            listener(proxy_url)
+
+    def _remove_expiring(self) -> None:
+        now = time.time()
+        for proxy_url in [url for url, state in self._states.items() if state.is_expiring(now)]:
+            self.evict(proxy_url, "expiring")
+
+    async def _refill(self) -> None:
+        if self._refill_lock is None:
+            self._refill_lock = asyncio.Lock()
+        async with self._refill_lock:
+            await self.load_proxies()
+
+    def _ensure_refresh_task(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """后台定时剔除快过期的代理，并在代理过期之前补充新的代理"""
+        while True:
+            await asyncio.sleep(config.PROXY_REFRESH_INTERVAL_SEC)
+            try:
+                await self._refill()
+            except Exception as e:
+                utils.logger.error(f"[ProxyIpPool._refresh_loop] refill proxies error: {e}")
+
+    async def close(self) -> None:
+        """
+        停止后台补充任务
+        Returns:
+
         """
-        self.proxy_list = []
-        await self.load_proxies()
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
 
 
 IpProxyProvider: Dict[str, ProxyProvider] = {
@@ -22,3 +22,45 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:29
 # @Desc    :
+
+from typing import Dict, Tuple, Type
+
+from base.base_crawler import AbstractStore
+from tools import utils
+from tools.store_write_queue import close_store_write_queue, wrap_write_behind
+
+# (平台, 存储类) -> 本次运行使用的存储实例
+_opened_stores: Dict[Tuple[str, Type[AbstractStore]], AbstractStore] = {}
+
+
+def open_store(platform: str, store_class: Type[AbstractStore]) -> AbstractStore:
+    """
+    获取本次运行的存储实例，每个平台的存储只在第一次使用时创建，之后所有数据共用这一个实例
+    运行结束时由 close_stores 统一 flush 和关闭
+    Args:
+        platform: 平台名称
+        store_class: 存储实现类
+
+    Returns:
+
+    """
+    key = (platform, store_class)
+    if key not in _opened_stores:
+        _opened_stores[key] = wrap_write_behind(platform, store_class())
+    return _opened_stores[key]
+
+
+async def close_stores() -> None:
+    """
+    写完存储写入队列中的数据，然后依次 flush 和关闭本次运行打开的所有存储，可以重复调用
+    Returns:
+
+    """
+    await close_store_write_queue()
+    for (platform, _), store in list(_opened_stores.items()):
+        try:
+            await store.flush()
+            await store.close()
+        except Exception as e:
+            utils.logger.error(f"[close_stores] close {platform} store error: {e}")
+    _opened_stores.clear()
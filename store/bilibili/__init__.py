@@ -22,9 +22,12 @@
 # @Time    : 2024/1/14 19:34
 # @Desc    :
 
-from typing import List
+from typing import Dict, List
 
 import config
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from ._store_impl import *
@@ -37,6 +40,7 @@ class BiliStoreFactory:
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement,
         "sqlite": BiliSqliteStoreImplement,
+        "parquet": BiliParquetStoreImplement,
         "mongodb": BiliMongoStoreImplement,
     }
 
@@ -44,8 +48,8 @@ class BiliStoreFactory:
     def create_store() -> AbstractStore:
         store_class = BiliStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+            raise ValueError("[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("bili", store_class)
 
 
 async def update_bilibili_video(video_item: Dict):
@@ -76,7 +80,10 @@ async def update_bilibili_video(video_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.bilibili.update_bilibili_video] bilibili video id:{video_id}, title:{save_content_item.get('title')}")
-    await BiliStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_and_mark_seen(
+        BiliStoreFactory.create_store(), "contents", [save_content_item],
+        "bili", SEEN_KIND_CONTENT, video_id, video_item_view.get("bvid"),
+    )
 
 
 async def update_up_info(video_item: Dict):
@@ -101,11 +108,14 @@ async def update_up_info(video_item: Dict):
 async def batch_update_bilibili_video_comments(video_id: str, comments: List[Dict]):
     if not comments:
         return
-    for comment_item in comments:
-        await update_bilibili_video_comment(video_id, comment_item)
+    save_comment_items = [_build_bilibili_video_comment(video_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        BiliStoreFactory.create_store(), save_comment_items,
+        "bili", video_id,
+    )
 
 
-async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
+def _build_bilibili_video_comment(video_id: str, comment_item: Dict) -> Dict:
     comment_id = str(comment_item.get("rpid"))
     parent_comment_id = str(comment_item.get("parent", 0))
     content: Dict = comment_item.get("content")
@@ -127,7 +137,12 @@ async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.bilibili.update_bilibili_video_comment] Bilibili video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
+    save_comment_item = _build_bilibili_video_comment(video_id, comment_item)
+    await BiliStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def store_video(aid, video_content, extension_file_name):
@@ -135,7 +150,7 @@ async def store_video(aid, video_content, extension_file_name):
     video video storage implementation
     Args:
         aid:
-        video_content:
+        video_content: 视频内容，或已下载完成的本地文件路径
         extension_file_name:
     """
     await BilibiliVideo().store_video({
@@ -27,7 +27,7 @@ import csv
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 
 import aiofiles
 from sqlalchemy import select
@@ -35,9 +35,11 @@ from sqlalchemy.orm import sessionmaker
 
 import config
 from base.base_crawler import AbstractStore
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from database.models import BilibiliVideoComment, BilibiliVideo, BilibiliUpInfo, BilibiliUpDynamic, BilibiliContactInfo
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 from tools import utils, words
 from var import crawler_type_var
 from database.mongodb_store_base import MongoDBStoreBase
@@ -47,7 +49,8 @@ class BiliCsvStoreImplement(AbstractStore):
     def __init__(self):
         self.file_writer = AsyncFileWriter(
             crawler_type=crawler_type_var.get(),
-            platform="bili"
+            platform="bili",
+            content_id_field="video_id",
         )
 
     async def store_content(self, content_item: Dict):
@@ -162,6 +165,15 @@ class BiliDbStoreImplement(AbstractStore):
                     setattr(comment_detail, key, value)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        Bilibili comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        async with get_session() as session:
+            await bulk_upsert(session, BilibiliVideoComment, comment_items, conflict_column="comment_id")
+
     async def store_creator(self, creator: Dict):
         """
         Bilibili creator DB storage implementation
@@ -230,7 +242,8 @@ class BiliJsonStoreImplement(AbstractStore):
     def __init__(self):
         self.file_writer = AsyncFileWriter(
             crawler_type=crawler_type_var.get(),
-            platform="bili"
+            platform="bili",
+            content_id_field="video_id",
         )
 
     async def store_content(self, content_item: Dict):
@@ -305,6 +318,86 @@ class BiliJsonStoreImplement(AbstractStore):
 
 
 
+class BiliParquetStoreImplement(AbstractStore):
+    def __init__(self):
+        ensure_pyarrow_available()
+        self.file_writer = AsyncFileWriter(
+            crawler_type=crawler_type_var.get(),
+            platform="bili",
+            content_id_field="video_id",
+        )
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=content_item,
+            item_type="videos"
+        )
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=comment_item,
+            item_type="comments"
+        )
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=creator,
+            item_type="creators"
+        )
+
+    async def store_contact(self, contact_item: Dict):
+        """
+        creator contact Parquet storage implementation
+        Args:
+            contact_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=contact_item,
+            item_type="contacts"
+        )
+
+    async def store_dynamic(self, dynamic_item: Dict):
+        """
+        creator dynamic Parquet storage implementation
+        Args:
+            dynamic_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=dynamic_item,
+            item_type="dynamics"
+        )
+
+
 class BiliSqliteStoreImplement(BiliDbStoreImplement):
     pass
 
@@ -349,6 +442,19 @@ class BiliMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[BiliMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[BiliMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储UP主信息到MongoDB
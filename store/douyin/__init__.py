@@ -21,9 +21,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 18:46
 # @Desc    :
-from typing import List
+from typing import Dict, List, Optional
 
 import config
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from ._store_impl import *
@@ -36,6 +39,7 @@ class DouyinStoreFactory:
         "db": DouyinDbStoreImplement,
         "json": DouyinJsonStoreImplement,
         "sqlite": DouyinSqliteStoreImplement,
+        "parquet": DouyinParquetStoreImplement,
         "mongodb": DouyinMongoStoreImplement,
     }
 
@@ -43,8 +47,8 @@ class DouyinStoreFactory:
     def create_store() -> AbstractStore:
         store_class = DouyinStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+            raise ValueError("[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("douyin", store_class)
 
 
 def _extract_note_image_list(aweme_detail: Dict) -> List[str]:
@@ -182,21 +186,27 @@ async def update_douyin_aweme(aweme_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.douyin.update_douyin_aweme] douyin aweme id:{aweme_id}, title:{save_content_item.get('title')}")
-    await DouyinStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_and_mark_seen(
+        DouyinStoreFactory.create_store(), "contents", [save_content_item],
+        "douyin", SEEN_KIND_CONTENT, aweme_id,
+    )
 
 
 async def batch_update_dy_aweme_comments(aweme_id: str, comments: List[Dict]):
     if not comments:
         return
-    for comment_item in comments:
-        await update_dy_aweme_comment(aweme_id, comment_item)
+    save_comment_items = [_build_dy_aweme_comment(aweme_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        DouyinStoreFactory.create_store(), [item for item in save_comment_items if item],
+        "douyin", aweme_id,
+    )
 
 
-async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
+def _build_dy_aweme_comment(aweme_id: str, comment_item: Dict) -> Optional[Dict]:
     comment_aweme_id = comment_item.get("aweme_id")
     if aweme_id != comment_aweme_id:
         utils.logger.error(f"[store.douyin.update_dy_aweme_comment] comment_aweme_id: {comment_aweme_id} != aweme_id: {aweme_id}")
-        return
+        return None
     user_info = comment_item.get("user", {})
     comment_id = comment_item.get("cid")
     parent_comment_id = comment_item.get("reply_id", "0")
@@ -221,8 +231,13 @@ async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
         "pictures": ",".join(_extract_comment_image_list(comment_item)),
     }
     utils.logger.info(f"[store.douyin.update_dy_aweme_comment] douyin aweme comment: {comment_id}, content: {save_comment_item.get('content')}")
+    return save_comment_item
 
-    await DouyinStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+
+async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
+    save_comment_item = _build_dy_aweme_comment(aweme_id, comment_item)
+    if save_comment_item:
+        await DouyinStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -251,7 +266,7 @@ async def update_dy_aweme_image(aweme_id, pic_content, extension_file_name):
     更新抖音笔记图片
     Args:
         aweme_id:
-        pic_content:
+        pic_content: 图片内容，或已下载完成的本地文件路径
         extension_file_name:
 
     Returns:
@@ -266,7 +281,7 @@ async def update_dy_aweme_video(aweme_id, video_content, extension_file_name):
     更新抖音短视频
     Args:
         aweme_id:
-        video_content:
+        video_content: 视频内容，或已下载完成的本地文件路径
         extension_file_name:
 
     Returns:
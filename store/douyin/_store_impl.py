@@ -26,16 +26,18 @@ import asyncio
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 
 from sqlalchemy import select
 
 import config
 from base.base_crawler import AbstractStore
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from database.models import DouyinAweme, DouyinAwemeComment, DyCreator
 from tools import utils, words
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 from var import crawler_type_var
 from database.mongodb_store_base import MongoDBStoreBase
 
@@ -44,7 +46,8 @@ class DouyinCsvStoreImplement(AbstractStore):
     def __init__(self):
         self.file_writer = AsyncFileWriter(
             crawler_type=crawler_type_var.get(),
-            platform="douyin"
+            platform="douyin",
+            content_id_field="aweme_id",
         )
 
     async def store_content(self, content_item: Dict):
@@ -132,6 +135,15 @@ class DouyinDbStoreImplement(AbstractStore):
                     setattr(comment_detail, key, value)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        Douyin comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        async with get_session() as session:
+            await bulk_upsert(session, DouyinAwemeComment, comment_items, conflict_column="comment_id")
+
     async def store_creator(self, creator: Dict):
         """
         Douyin creator DB storage implementation
@@ -157,7 +169,8 @@ class DouyinJsonStoreImplement(AbstractStore):
     def __init__(self):
         self.file_writer = AsyncFileWriter(
             crawler_type=crawler_type_var.get(),
-            platform="douyin"
+            platform="douyin",
+            content_id_field="aweme_id",
         )
 
     async def store_content(self, content_item: Dict):
@@ -204,6 +217,58 @@ class DouyinJsonStoreImplement(AbstractStore):
 
 
 
+class DouyinParquetStoreImplement(AbstractStore):
+    def __init__(self):
+        ensure_pyarrow_available()
+        self.file_writer = AsyncFileWriter(
+            crawler_type=crawler_type_var.get(),
+            platform="douyin",
+            content_id_field="aweme_id",
+        )
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=content_item,
+            item_type="contents"
+        )
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=comment_item,
+            item_type="comments"
+        )
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.file_writer.write_to_parquet(
+            item=creator,
+            item_type="creators"
+        )
+
+
 class DouyinSqliteStoreImplement(DouyinDbStoreImplement):
     pass
 
@@ -248,6 +313,19 @@ class DouyinMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[DouyinMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[DouyinMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
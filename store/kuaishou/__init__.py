@@ -22,9 +22,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 20:03
 # @Desc    :
-from typing import List
+from typing import Dict, List
 
 import config
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from ._store_impl import *
@@ -36,6 +39,7 @@ class KuaishouStoreFactory:
         "db": KuaishouDbStoreImplement,
         "json": KuaishouJsonStoreImplement,
         "sqlite": KuaishouSqliteStoreImplement,
+        "parquet": KuaishouParquetStoreImplement,
         "mongodb": KuaishouMongoStoreImplement,
     }
 
@@ -44,8 +48,8 @@ class KuaishouStoreFactory:
         store_class = KuaishouStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("kuaishou", store_class)
 
 
 async def update_kuaishou_video(video_item: Dict):
@@ -73,18 +77,24 @@ async def update_kuaishou_video(video_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_kuaishou_video] Kuaishou video id:{video_id}, title:{save_content_item.get('title')}")
-    await KuaishouStoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_and_mark_seen(
+        KuaishouStoreFactory.create_store(), "contents", [save_content_item],
+        "kuaishou", SEEN_KIND_CONTENT, video_id,
+    )
 
 
 async def batch_update_ks_video_comments(video_id: str, comments: List[Dict]):
     utils.logger.info(f"[store.kuaishou.batch_update_ks_video_comments] video_id:{video_id}, comments:{comments}")
     if not comments:
         return
-    for comment_item in comments:
-        await update_ks_video_comment(video_id, comment_item)
+    save_comment_items = [_build_ks_video_comment(video_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        KuaishouStoreFactory.create_store(), save_comment_items,
+        "kuaishou", video_id,
+    )
 
 
-async def update_ks_video_comment(video_id: str, comment_item: Dict):
+def _build_ks_video_comment(video_id: str, comment_item: Dict) -> Dict:
     comment_id = comment_item.get("commentId")
     save_comment_item = {
         "comment_id": comment_id,
@@ -99,7 +109,12 @@ async def update_ks_video_comment(video_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_ks_video_comment] Kuaishou video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_ks_video_comment(video_id: str, comment_item: Dict):
+    save_comment_item = _build_ks_video_comment(video_id, comment_item)
+    await KuaishouStoreFactory.create_store().store_comment(save_comment_item)
 
 async def save_creator(user_id: str, creator: Dict):
     ownerCount = creator.get('ownerCount', {})
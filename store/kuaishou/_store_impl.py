@@ -27,14 +27,16 @@ import csv
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 
 import aiofiles
 from sqlalchemy import select
 
 import config
 from base.base_crawler import AbstractStore
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from database.models import KuaishouVideo, KuaishouVideoComment
 from tools import utils, words
@@ -60,7 +62,7 @@ def calculate_number_of_files(file_store_path: str) -> int:
 class KuaishouCsvStoreImplement(AbstractStore):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.writer = AsyncFileWriter(platform="kuaishou", crawler_type=crawler_type_var.get())
+        self.writer = AsyncFileWriter(platform="kuaishou", crawler_type=crawler_type_var.get(), content_id_field="video_id")
 
     async def store_content(self, content_item: Dict):
         """
@@ -133,11 +135,20 @@ class KuaishouDbStoreImplement(AbstractStore):
                     setattr(comment_detail, key, value)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        Kuaishou comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        async with get_session() as session:
+            await bulk_upsert(session, KuaishouVideoComment, comment_items, conflict_column="comment_id")
+
 
 class KuaishouJsonStoreImplement(AbstractStore):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.writer = AsyncFileWriter(platform="kuaishou", crawler_type=crawler_type_var.get())
+        self.writer = AsyncFileWriter(platform="kuaishou", crawler_type=crawler_type_var.get(), content_id_field="video_id")
 
     async def store_content(self, content_item: Dict):
         """
@@ -165,6 +176,38 @@ class KuaishouJsonStoreImplement(AbstractStore):
         pass
 
 
+class KuaishouParquetStoreImplement(AbstractStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        ensure_pyarrow_available()
+        self.writer = AsyncFileWriter(platform="kuaishou", crawler_type=crawler_type_var.get(), content_id_field="video_id")
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="contents", item=content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="comments", item=comment_item)
+
+    async def store_creator(self, creator: Dict):
+        pass
+
+
 class KuaishouSqliteStoreImplement(KuaishouDbStoreImplement):
     async def store_creator(self, creator: Dict):
         pass
@@ -210,6 +253,19 @@ class KuaishouMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[KuaishouMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[KuaishouMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
@@ -19,9 +19,12 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from ._store_impl import *
@@ -33,6 +36,7 @@ class TieBaStoreFactory:
         "db": TieBaDbStoreImplement,
         "json": TieBaJsonStoreImplement,
         "sqlite": TieBaSqliteStoreImplement,
+        "parquet": TieBaParquetStoreImplement,
         "mongodb": TieBaMongoStoreImplement,
     }
 
@@ -41,8 +45,8 @@ class TieBaStoreFactory:
         store_class = TieBaStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("tieba", store_class)
 
 
 async def batch_update_tieba_notes(note_list: List[TiebaNote]):
@@ -74,7 +78,10 @@ async def update_tieba_note(note_item: TiebaNote):
     save_note_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note] tieba note: {save_note_item}")
 
-    await TieBaStoreFactory.create_store().store_content(save_note_item)
+    await store_and_mark_seen(
+        TieBaStoreFactory.create_store(), "contents", [save_note_item],
+        "tieba", SEEN_KIND_CONTENT, note_item.note_id,
+    )
 
 
 async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaComment]):
@@ -89,8 +96,18 @@ async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaCom
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_tieba_note_comment(note_id, comment_item)
+    save_comment_items = [_build_tieba_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        TieBaStoreFactory.create_store(), save_comment_items,
+        "tieba", note_id,
+    )
+
+
+def _build_tieba_note_comment(note_id: str, comment_item: TiebaComment) -> Dict:
+    save_comment_item = comment_item.model_dump()
+    save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
+    utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
+    return save_comment_item
 
 
 async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
@@ -103,9 +120,7 @@ async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
     Returns:
 
     """
-    save_comment_item = comment_item.model_dump()
-    save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
+    save_comment_item = _build_tieba_note_comment(note_id, comment_item)
     await TieBaStoreFactory.create_store().store_comment(save_comment_item)
 
 
@@ -27,7 +27,7 @@ import csv
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 
 import aiofiles
 from sqlalchemy import select
@@ -37,9 +37,11 @@ import config
 from base.base_crawler import AbstractStore
 from database.models import TiebaNote, TiebaComment, TiebaCreator
 from tools import utils, words
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from var import crawler_type_var
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 from database.mongodb_store_base import MongoDBStoreBase
 
 
@@ -136,6 +138,15 @@ class TieBaDbStoreImplement(AbstractStore):
                 session.add(db_comment)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        tieba comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        async with get_session() as session:
+            await bulk_upsert(session, TiebaComment, comment_items, conflict_column="comment_id")
+
     async def store_creator(self, creator: Dict):
         """
         tieba content DB storage implementation
@@ -195,6 +206,46 @@ class TieBaJsonStoreImplement(AbstractStore):
         await self.writer.write_single_item_to_json(item_type="creators", item=creator)
 
 
+class TieBaParquetStoreImplement(AbstractStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        ensure_pyarrow_available()
+        self.writer = AsyncFileWriter(platform="tieba", crawler_type=crawler_type_var.get())
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="contents", item=content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="comments", item=comment_item)
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="creators", item=creator)
+
+
 class TieBaSqliteStoreImplement(TieBaDbStoreImplement):
     """
     Tieba sqlite store implement
@@ -242,6 +293,19 @@ class TieBaMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[TieBaMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[TieBaMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
@@ -23,8 +23,11 @@
 # @Desc    :
 
 import re
-from typing import List
+from typing import Dict, List, Optional
 
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from .weibo_store_media import *
@@ -37,6 +40,7 @@ class WeibostoreFactory:
         "db": WeiboDbStoreImplement,
         "json": WeiboJsonStoreImplement,
         "sqlite": WeiboSqliteStoreImplement,
+        "parquet": WeiboParquetStoreImplement,
         "mongodb": WeiboMongoStoreImplement,
     }
 
@@ -44,8 +48,8 @@ class WeibostoreFactory:
     def create_store() -> AbstractStore:
         store_class = WeibostoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+            raise ValueError("[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("weibo", store_class)
 
 
 async def batch_update_weibo_notes(note_list: List[Dict]):
@@ -102,7 +106,10 @@ async def update_weibo_note(note_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.weibo.update_weibo_note] weibo note id:{note_id}, title:{save_content_item.get('content')[:24]} ...")
-    await WeibostoreFactory.create_store().store_content(content_item=save_content_item)
+    await store_and_mark_seen(
+        WeibostoreFactory.create_store(), "contents", [save_content_item],
+        "weibo", SEEN_KIND_CONTENT, note_id,
+    )
 
 
 async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
@@ -117,22 +124,16 @@ async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_weibo_note_comment(note_id, comment_item)
+    save_comment_items = [_build_weibo_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        WeibostoreFactory.create_store(), [item for item in save_comment_items if item],
+        "weibo", note_id,
+    )
 
 
-async def update_weibo_note_comment(note_id: str, comment_item: Dict):
-    """
-    Update weibo note comment
-    Args:
-        note_id: weibo note id
-        comment_item: weibo comment item
-
-    Returns:
-
-    """
+def _build_weibo_note_comment(note_id: str, comment_item: Dict) -> Optional[Dict]:
     if not comment_item or not note_id:
-        return
+        return None
     comment_id = str(comment_item.get("id"))
     user_info: Dict = comment_item.get("user")
     content_text = comment_item.get("text")
@@ -157,7 +158,22 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
         "avatar": user_info.get("profile_image_url", ""),
     }
     utils.logger.info(f"[store.weibo.update_weibo_note_comment] Weibo note comment: {comment_id}, content: {save_comment_item.get('content', '')[:24]} ...")
-    await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_weibo_note_comment(note_id: str, comment_item: Dict):
+    """
+    Update weibo note comment
+    Args:
+        note_id: weibo note id
+        comment_item: weibo comment item
+
+    Returns:
+
+    """
+    save_comment_item = _build_weibo_note_comment(note_id, comment_item)
+    if save_comment_item:
+        await WeibostoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def update_weibo_note_image(picid: str, pic_content, extension_file_name):
@@ -165,7 +181,7 @@ async def update_weibo_note_image(picid: str, pic_content, extension_file_name):
     Save weibo note image to local
     Args:
         picid:
-        pic_content:
+        pic_content: 图片内容，或已下载完成的本地文件路径
         extension_file_name:
 
     Returns:
@@ -27,7 +27,7 @@ import csv
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 
 import aiofiles
 from sqlalchemy import select
@@ -38,6 +38,8 @@ from base.base_crawler import AbstractStore
 from database.models import WeiboCreator, WeiboNote, WeiboNoteComment
 from tools import utils, words
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from var import crawler_type_var
 from database.mongodb_store_base import MongoDBStoreBase
@@ -151,6 +153,17 @@ class WeiboDbStoreImplement(AbstractStore):
                 session.add(db_comment)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        Weibo comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        last_modify_ts = utils.get_current_timestamp()
+        comment_items = [dict(comment_item, last_modify_ts=last_modify_ts) for comment_item in comment_items]
+        async with get_session() as session:
+            await bulk_upsert(session, WeiboNoteComment, comment_items, conflict_column="comment_id")
+
     async def store_creator(self, creator: Dict):
         """
         Weibo creator DB storage implementation
@@ -217,6 +230,46 @@ class WeiboJsonStoreImplement(AbstractStore):
         await self.writer.write_single_item_to_json(item_type="creators", item=creator)
 
 
+class WeiboParquetStoreImplement(AbstractStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        ensure_pyarrow_available()
+        self.writer = AsyncFileWriter(platform="weibo", crawler_type=crawler_type_var.get())
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="contents", item=content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="comments", item=comment_item)
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="creators", item=creator)
+
+
 class WeiboSqliteStoreImplement(WeiboDbStoreImplement):
     """
     Weibo content SQLite storage implementation
@@ -264,6 +317,19 @@ class WeiboMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[WeiboMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[WeiboMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
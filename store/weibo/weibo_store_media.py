@@ -22,12 +22,11 @@
 # @Time    : 2024/4/9 17:35
 # @Desc    : 微博媒体保存
 import pathlib
-from typing import Dict
-
-import aiofiles
+from typing import Dict, Union
 
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import write_media_file
 
 
 class WeiboStoreImage(AbstractStoreImage):
@@ -58,13 +57,13 @@ class WeiboStoreImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{picid}.{extension_file_name}"
 
-    async def save_image(self, picid: str, pic_content: str, extension_file_name="jpg"):
+    async def save_image(self, picid: str, pic_content: Union[bytes, str], extension_file_name="jpg"):
         """
         save image to local
 
         Args:
             picid: image id
-            pic_content: image content
+            pic_content: image content bytes, or the path of a downloaded file
             extension_file_name: image filename with extension
 
         Returns:
@@ -72,6 +71,5 @@ class WeiboStoreImage(AbstractStoreImage):
         """
         pathlib.Path(self.image_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(picid, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[WeiboImageStoreImplement.save_image] save image {save_file_name} success ...")
+        await write_media_file(save_file_name, pic_content)
+        utils.logger.info(f"[WeiboImageStoreImplement.save_image] save image {save_file_name} success ...")
@@ -21,9 +21,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:34
 # @Desc    :
-from typing import List
+from typing import Dict, List
 
 import config
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 from .xhs_store_media import *
@@ -36,43 +39,17 @@ class XhsStoreFactory:
         "db": XhsDbStoreImplement,
         "json": XhsJsonStoreImplement,
         "sqlite": XhsSqliteStoreImplement,
+        "parquet": XhsParquetStoreImplement,
         "mongodb": XhsMongoStoreImplement,
     }
     
-    # 单例实例，确保整个运行期间使用同一个Store实例（从而使用同一个时间戳）
-    _store_instance = None
-
     @staticmethod
     def create_store() -> AbstractStore:
-        # 如果已经创建过实例，直接返回（确保同一时间戳）
-        if XhsStoreFactory._store_instance is not None:
-            return XhsStoreFactory._store_instance
-            
         store_class = XhsStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        
-        # 创建新实例并缓存
-        XhsStoreFactory._store_instance = store_class()
-        return XhsStoreFactory._store_instance
-    
-    @staticmethod
-    def get_existing_note_ids() -> set:
-        """获取已经爬取过的笔记ID集合"""
-        store = XhsStoreFactory.create_store()
-        # 如果是JSON存储，从 writer 中获取
-        if hasattr(store, 'writer') and hasattr(store.writer, 'existing_ids'):
-            return store.writer.existing_ids.get('contents', set())
-        return set()
-    
-    @staticmethod
-    def get_existing_comment_note_ids() -> set:
-        """获取已经爬取过评论的笔记ID集合（即哪些笔记的评论已经爬取完成）"""
-        store = XhsStoreFactory.create_store()
-        if hasattr(store, 'writer') and hasattr(store.writer, 'existing_ids'):
-            # 从评论数据中提取独特的 note_id
-            return store.writer.get_comment_note_ids()
-        return set()
+            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        # 整个运行期间使用同一个Store实例（从而使用同一个时间戳）
+        return open_store("xhs", store_class)
 
 
 def get_video_url_arr(note_item: Dict) -> List:
@@ -158,7 +135,10 @@ async def update_xhs_note(note_item: Dict):
         "xsec_token": note_item.get("xsec_token"),  # xsec_token
     }
     utils.logger.info(f"[store.xhs.update_xhs_note] xhs note: {local_db_item}")
-    await XhsStoreFactory.create_store().store_content(local_db_item)
+    await store_and_mark_seen(
+        XhsStoreFactory.create_store(), "contents", [local_db_item],
+        "xhs", SEEN_KIND_CONTENT, note_id,
+    )
 
 
 async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
@@ -173,20 +153,14 @@ async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
-    for comment_item in comments:
-        await update_xhs_note_comment(note_id, comment_item)
-
-
-async def update_xhs_note_comment(note_id: str, comment_item: Dict):
-    """
-    更新小红书笔记评论
-    Args:
-        note_id:
-        comment_item:
+    save_comment_items = [_build_xhs_note_comment(note_id, comment_item) for comment_item in comments]
+    await store_comments_of(
+        XhsStoreFactory.create_store(), save_comment_items,
+        "xhs", note_id,
+    )
 
-    Returns:
 
-    """
+def _build_xhs_note_comment(note_id: str, comment_item: Dict) -> Dict:
     user_info = comment_item.get("user_info", {})
     comment_id = comment_item.get("id")
     comment_pictures = [item.get("url_default", "") for item in comment_item.get("pictures", [])]
@@ -207,7 +181,21 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
         "like_count": comment_item.get("like_count", 0),
     }
     utils.logger.info(f"[store.xhs.update_xhs_note_comment] xhs note comment:{local_db_item}")
-    await XhsStoreFactory.create_store().store_comment(local_db_item)
+    return local_db_item
+
+
+async def update_xhs_note_comment(note_id: str, comment_item: Dict):
+    """
+    更新小红书笔记评论
+    Args:
+        note_id:
+        comment_item:
+
+    Returns:
+
+    """
+    save_comment_item = _build_xhs_note_comment(note_id, comment_item)
+    await XhsStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -264,7 +252,7 @@ async def update_xhs_note_image(note_id, pic_content, extension_file_name):
     更新小红书笔记图片
     Args:
         note_id:
-        pic_content:
+        pic_content: 图片内容，或已下载完成的本地文件路径
         extension_file_name:
 
     Returns:
@@ -279,7 +267,7 @@ async def update_xhs_note_video(note_id, video_content, extension_file_name):
     更新小红书笔记视频
     Args:
         note_id:
-        video_content:
+        video_content: 视频内容，或已下载完成的本地文件路径
         extension_file_name:
 
     Returns:
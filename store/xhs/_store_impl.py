@@ -29,10 +29,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from base.base_crawler import AbstractStore
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from database.models import XhsNote, XhsNoteComment, XhsCreator
 
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 from tools.time_util import get_current_timestamp
 from var import crawler_type_var
 from database.mongodb_store_base import MongoDBStoreBase
@@ -63,9 +65,6 @@ class XhsCsvStoreImplement(AbstractStore):
     async def store_creator(self, creator_item: Dict):
         pass
 
-    def flush(self):
-        pass
-
 
 class XhsJsonStoreImplement(AbstractStore):
     def __init__(self, **kwargs):
@@ -91,13 +90,6 @@ class XhsJsonStoreImplement(AbstractStore):
     async def store_creator(self, creator_item: Dict):
         pass
 
-    def flush(self):
-        """
-        flush data to json file
-        :return:
-        """
-        pass
-
 
 
 class XhsDbStoreImplement(AbstractStore):
@@ -131,10 +123,10 @@ class XhsDbStoreImplement(AbstractStore):
             video_url=content_item.get("video_url"),
             time=content_item.get("time"),
             last_update_time=content_item.get("last_update_time"),
-            liked_count=str(content_item.get("liked_count")),
-            collected_count=str(content_item.get("collected_count")),
-            comment_count=str(content_item.get("comment_count")),
-            share_count=str(content_item.get("share_count")),
+            liked_count=content_item.get("liked_count"),
+            collected_count=content_item.get("collected_count"),
+            comment_count=content_item.get("comment_count"),
+            share_count=content_item.get("share_count"),
             image_list=json.dumps(content_item.get("image_list")),
             tag_list=json.dumps(content_item.get("tag_list")),
             note_url=content_item.get("note_url"),
@@ -148,10 +140,10 @@ class XhsDbStoreImplement(AbstractStore):
         last_modify_ts = int(get_current_timestamp())
         update_data = {
             "last_modify_ts": last_modify_ts,
-            "liked_count": str(content_item.get("liked_count")),
-            "collected_count": str(content_item.get("collected_count")),
-            "comment_count": str(content_item.get("comment_count")),
-            "share_count": str(content_item.get("share_count")),
+            "liked_count": content_item.get("liked_count"),
+            "collected_count": content_item.get("collected_count"),
+            "comment_count": content_item.get("comment_count"),
+            "share_count": content_item.get("share_count"),
             "last_update_time": content_item.get("last_update_time"),
         }
         stmt = update(XhsNote).where(XhsNote.note_id == note_id).values(**update_data)
@@ -174,10 +166,29 @@ class XhsDbStoreImplement(AbstractStore):
             else:
                 await self.add_comment(session, comment_item)
 
-    async def add_comment(self, session: AsyncSession, comment_item: Dict):
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论使用一条 upsert 语句写入，已存在的评论只更新点赞数和子评论数
+        Args:
+            comment_items: 评论列表
+
+        Returns:
+
+        """
+        async with get_session() as session:
+            await bulk_upsert(
+                session,
+                XhsNoteComment,
+                [self._build_comment_row(comment_item) for comment_item in comment_items],
+                conflict_column="comment_id",
+                update_columns=["last_modify_ts", "like_count", "sub_comment_count"],
+            )
+
+    @staticmethod
+    def _build_comment_row(comment_item: Dict) -> Dict:
         add_ts = int(get_current_timestamp())
         last_modify_ts = int(get_current_timestamp())
-        comment = XhsNoteComment(
+        return dict(
             user_id=comment_item.get("user_id"),
             nickname=comment_item.get("nickname"),
             avatar=comment_item.get("avatar"),
@@ -191,16 +202,18 @@ class XhsDbStoreImplement(AbstractStore):
             sub_comment_count=comment_item.get("sub_comment_count"),
             pictures=json.dumps(comment_item.get("pictures")),
             parent_comment_id=comment_item.get("parent_comment_id"),
-            like_count=str(comment_item.get("like_count"))
+            like_count=comment_item.get("like_count")
         )
-        session.add(comment)
+
+    async def add_comment(self, session: AsyncSession, comment_item: Dict):
+        session.add(XhsNoteComment(**self._build_comment_row(comment_item)))
 
     async def update_comment(self, session: AsyncSession, comment_item: Dict):
         comment_id = comment_item.get("comment_id")
         last_modify_ts = int(get_current_timestamp())
         update_data = {
             "last_modify_ts": last_modify_ts,
-            "like_count": str(comment_item.get("like_count")),
+            "like_count": comment_item.get("like_count"),
             "sub_comment_count": comment_item.get("sub_comment_count"),
         }
         stmt = update(XhsNoteComment).where(XhsNoteComment.comment_id == comment_id).values(**update_data)
@@ -233,9 +246,9 @@ class XhsDbStoreImplement(AbstractStore):
             last_modify_ts=last_modify_ts,
             desc=creator_item.get("desc"),
             gender=creator_item.get("gender"),
-            follows=str(creator_item.get("follows")),
-            fans=str(creator_item.get("fans")),
-            interaction=str(creator_item.get("interaction")),
+            follows=creator_item.get("follows"),
+            fans=creator_item.get("fans"),
+            interaction=creator_item.get("interaction"),
             tag_list=json.dumps(creator_item.get("tag_list"))
         )
         session.add(creator)
@@ -248,9 +261,9 @@ class XhsDbStoreImplement(AbstractStore):
             "nickname": creator_item.get("nickname"),
             "avatar": creator_item.get("avatar"),
             "desc": creator_item.get("desc"),
-            "follows": str(creator_item.get("follows")),
-            "fans": str(creator_item.get("fans")),
-            "interaction": str(creator_item.get("interaction")),
+            "follows": creator_item.get("follows"),
+            "fans": creator_item.get("fans"),
+            "interaction": creator_item.get("interaction"),
             "tag_list": json.dumps(creator_item.get("tag_list"))
         }
         stmt = update(XhsCreator).where(XhsCreator.user_id == user_id).values(**update_data)
@@ -274,6 +287,46 @@ class XhsDbStoreImplement(AbstractStore):
             return [item.__dict__ for item in result.scalars().all()]
 
 
+class XhsParquetStoreImplement(AbstractStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        ensure_pyarrow_available()
+        self.writer = AsyncFileWriter(platform="xhs", crawler_type=crawler_type_var.get())
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="contents", item=content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="comments", item=comment_item)
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="creators", item=creator)
+
+
 class XhsSqliteStoreImplement(XhsDbStoreImplement):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -320,6 +373,19 @@ class XhsMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[XhsMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[XhsMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
@@ -22,12 +22,11 @@
 # @Time    : 2024/7/11 22:35
 # @Desc    : 小红书媒体保存
 import pathlib
-from typing import Dict
-
-import aiofiles
+from typing import Dict, Union
 
 from base.base_crawler import AbstractStoreImage, AbstractStoreVideo
 from tools import utils
+from tools.media_downloader import write_media_file
 
 
 class XiaoHongShuImage(AbstractStoreImage):
@@ -58,13 +57,13 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_image(self, notice_id: str, pic_content: str, extension_file_name):
+    async def save_image(self, notice_id: str, pic_content: Union[bytes, str], extension_file_name):
         """
         save image to local
 
         Args:
             notice_id: notice id
-            pic_content: image content
+            pic_content: image content bytes, or the path of a downloaded file
             extension_file_name: image filename with extension
 
         Returns:
@@ -72,9 +71,8 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         pathlib.Path(self.image_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        await write_media_file(save_file_name, pic_content)
+        utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
 
 
 class XiaoHongShuVideo(AbstractStoreVideo):
@@ -105,13 +103,13 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         """
         return f"{self.video_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_video(self, notice_id: str, video_content: str, extension_file_name):
+    async def save_video(self, notice_id: str, video_content: Union[bytes, str], extension_file_name):
         """
         save video to local
 
         Args:
             notice_id: notice id
-            video_content: video content
+            video_content: video content bytes, or the path of a downloaded file
             extension_file_name: video filename with extension
 
         Returns:
@@ -119,6 +117,5 @@ class XiaoHongShuVideo(AbstractStoreVideo):
         """
         pathlib.Path(self.video_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
+        await write_media_file(save_file_name, video_content)
+        utils.logger.info(f"[XiaoHongShuVideoStoreImplement.save_video] save video {save_file_name} success ...")
@@ -19,7 +19,7 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
@@ -27,9 +27,13 @@ from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from ._store_impl import (ZhihuCsvStoreImplement,
                                           ZhihuDbStoreImplement,
                                           ZhihuJsonStoreImplement,
+                                          ZhihuParquetStoreImplement,
                                           ZhihuSqliteStoreImplement,
                                           ZhihuMongoStoreImplement)
 from tools import utils
+from store import open_store
+from tools.seen_index import SEEN_KIND_CONTENT
+from tools.store_write_queue import store_and_mark_seen, store_comments_of
 from var import source_keyword_var
 
 
@@ -39,6 +43,7 @@ class ZhihuStoreFactory:
         "db": ZhihuDbStoreImplement,
         "json": ZhihuJsonStoreImplement,
         "sqlite": ZhihuSqliteStoreImplement,
+        "parquet": ZhihuParquetStoreImplement,
         "mongodb": ZhihuMongoStoreImplement,
     }
 
@@ -46,8 +51,8 @@ class ZhihuStoreFactory:
     def create_store() -> AbstractStore:
         store_class = ZhihuStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
-            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb ...")
-        return store_class()
+            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite or mongodb or parquet ...")
+        return open_store("zhihu", store_class)
 
 async def batch_update_zhihu_contents(contents: List[ZhihuContent]):
     """
@@ -77,7 +82,10 @@ async def update_zhihu_content(content_item: ZhihuContent):
     local_db_item = content_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_content] zhihu content: {local_db_item}")
-    await ZhihuStoreFactory.create_store().store_content(local_db_item)
+    await store_and_mark_seen(
+        ZhihuStoreFactory.create_store(), "contents", [local_db_item],
+        "zhihu", SEEN_KIND_CONTENT, content_item.content_id,
+    )
 
 
 
@@ -93,8 +101,18 @@ async def batch_update_zhihu_note_comments(comments: List[ZhihuComment]):
     if not comments:
         return
 
-    for comment_item in comments:
-        await update_zhihu_content_comment(comment_item)
+    save_comment_items = [_build_zhihu_content_comment(comment_item) for comment_item in comments]
+    await store_comments_of(
+        ZhihuStoreFactory.create_store(), save_comment_items,
+        "zhihu", comments[0].content_id,
+    )
+
+
+def _build_zhihu_content_comment(comment_item: ZhihuComment) -> Dict:
+    local_db_item = comment_item.model_dump()
+    local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
+    utils.logger.info(f"[store.zhihu.update_zhihu_note_comment] zhihu content comment:{local_db_item}")
+    return local_db_item
 
 
 async def update_zhihu_content_comment(comment_item: ZhihuComment):
@@ -106,10 +124,8 @@ async def update_zhihu_content_comment(comment_item: ZhihuComment):
     Returns:
 
     """
-    local_db_item = comment_item.model_dump()
-    local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    utils.logger.info(f"[store.zhihu.update_zhihu_note_comment] zhihu content comment:{local_db_item}")
-    await ZhihuStoreFactory.create_store().store_comment(local_db_item)
+    save_comment_item = _build_zhihu_content_comment(comment_item)
+    await ZhihuStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(creator: ZhihuCreator):
@@ -27,7 +27,7 @@ import csv
 import json
 import os
 import pathlib
-from typing import Dict
+from typing import Dict, List
 
 import aiofiles
 from sqlalchemy import select
@@ -35,11 +35,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 import config
 from base.base_crawler import AbstractStore
+from database.bulk_upsert import bulk_upsert
 from database.db_session import get_session
 from database.models import ZhihuContent, ZhihuComment, ZhihuCreator
 from tools import utils, words
 from var import crawler_type_var
 from tools.async_file_writer import AsyncFileWriter
+from tools.parquet_writer import ensure_pyarrow_available
 from database.mongodb_store_base import MongoDBStoreBase
 
 def calculate_number_of_files(file_store_path: str) -> int:
@@ -60,7 +62,7 @@ def calculate_number_of_files(file_store_path: str) -> int:
 class ZhihuCsvStoreImplement(AbstractStore):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.writer = AsyncFileWriter(platform="zhihu", crawler_type=crawler_type_var.get())
+        self.writer = AsyncFileWriter(platform="zhihu", crawler_type=crawler_type_var.get(), content_id_field="content_id")
 
     async def store_content(self, content_item: Dict):
         """
@@ -135,6 +137,15 @@ class ZhihuDbStoreImplement(AbstractStore):
                 session.add(new_comment)
             await session.commit()
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        Zhihu comments DB storage implementation, one page of comments is written with a single upsert statement
+        Args:
+            comment_items: comment item dict list
+        """
+        async with get_session() as session:
+            await bulk_upsert(session, ZhihuComment, comment_items, conflict_column="comment_id")
+
     async def store_creator(self, creator: Dict):
         """
         Zhihu content DB storage implementation
@@ -158,7 +169,7 @@ class ZhihuDbStoreImplement(AbstractStore):
 class ZhihuJsonStoreImplement(AbstractStore):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.writer = AsyncFileWriter(platform="zhihu", crawler_type=crawler_type_var.get())
+        self.writer = AsyncFileWriter(platform="zhihu", crawler_type=crawler_type_var.get(), content_id_field="content_id")
 
     async def store_content(self, content_item: Dict):
         """
@@ -194,6 +205,46 @@ class ZhihuJsonStoreImplement(AbstractStore):
         await self.writer.write_single_item_to_json(item_type="creators", item=creator)
 
 
+class ZhihuParquetStoreImplement(AbstractStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        ensure_pyarrow_available()
+        self.writer = AsyncFileWriter(platform="zhihu", crawler_type=crawler_type_var.get(), content_id_field="content_id")
+
+    async def store_content(self, content_item: Dict):
+        """
+        content Parquet storage implementation
+        Args:
+            content_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="contents", item=content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        comment Parquet storage implementation
+        Args:
+            comment_item:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="comments", item=comment_item)
+
+    async def store_creator(self, creator: Dict):
+        """
+        creator Parquet storage implementation
+        Args:
+            creator:
+
+        Returns:
+
+        """
+        await self.writer.write_to_parquet(item_type="creators", item=creator)
+
+
 class ZhihuSqliteStoreImplement(ZhihuDbStoreImplement):
     """
     Zhihu content SQLite storage implementation
@@ -213,16 +264,16 @@ class ZhihuMongoStoreImplement(AbstractStore):
         Args:
             content_item: 内容数据
         """
-        note_id = content_item.get("note_id")
-        if not note_id:
+        content_id = content_item.get("content_id")
+        if not content_id:
             return
 
         await self.mongo_store.save_or_update(
             collection_suffix="contents",
-            query={"note_id": note_id},
+            query={"content_id": content_id},
             data=content_item
         )
-        utils.logger.info(f"[ZhihuMongoStoreImplement.store_content] Saved note {note_id} to MongoDB")
+        utils.logger.info(f"[ZhihuMongoStoreImplement.store_content] Saved content {content_id} to MongoDB")
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -241,6 +292,19 @@ class ZhihuMongoStoreImplement(AbstractStore):
         )
         utils.logger.info(f"[ZhihuMongoStoreImplement.store_comment] Saved comment {comment_id} to MongoDB")
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        一页评论合并为一次 bulk_write 写入MongoDB
+        Args:
+            comment_items: 评论数据列表
+        """
+        if await self.mongo_store.bulk_save_or_update(
+            collection_suffix="comments",
+            key_field="comment_id",
+            items=comment_items
+        ):
+            utils.logger.info(f"[ZhihuMongoStoreImplement.store_comments] Saved {len(comment_items)} comments to MongoDB")
+
     async def store_creator(self, creator_item: Dict):
         """
         存储创作者信息到MongoDB
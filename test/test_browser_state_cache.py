@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_browser_state_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from tools.browser_state_cache import BrowserStateCache
+
+
+class TestBrowserStateCache(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.load_count = 0
+
+    async def fake_local_storage(self):
+        self.load_count += 1
+        await asyncio.sleep(0.01)
+        return {"b1": f"b1-{self.load_count}"}
+
+    async def test_concurrent_get_loads_once(self):
+        cache = BrowserStateCache(self.fake_local_storage, ttl=60)
+        results = await asyncio.gather(*[cache.get() for _ in range(10)])
+        self.assertEqual(self.load_count, 1)
+        self.assertTrue(all(result["b1"] == "b1-1" for result in results))
+
+    async def test_invalidate_reloads(self):
+        cache = BrowserStateCache(self.fake_local_storage, ttl=60)
+        await cache.get()
+        cache.invalidate()
+        self.assertEqual((await cache.get())["b1"], "b1-2")
+
+    async def test_zero_ttl_disable_cache(self):
+        cache = BrowserStateCache(self.fake_local_storage, ttl=0)
+        await cache.get()
+        await cache.get()
+        self.assertEqual(self.load_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_bulk_upsert.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database.bulk_upsert import bulk_upsert
+from database.models import Base, DouyinAwemeComment
+
+
+class TestBulkUpsert(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.temp_dir.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    async def upsert(self, items):
+        async with AsyncSession(self.engine) as session:
+            await bulk_upsert(session, DouyinAwemeComment, items, conflict_column="comment_id")
+            await session.commit()
+
+    async def query_all(self):
+        async with AsyncSession(self.engine) as session:
+            result = await session.execute(select(DouyinAwemeComment).order_by(DouyinAwemeComment.comment_id))
+            return result.scalars().all()
+
+    async def test_insert_then_update_page(self):
+        await self.upsert([
+            {"comment_id": 1, "aweme_id": 100, "content": "a", "like_count": "1"},
+            {"comment_id": 2, "aweme_id": 100, "content": "b", "like_count": "2"},
+        ])
+        first_add_ts = (await self.query_all())[0].add_ts
+
+        await self.upsert([
+            {"comment_id": 1, "aweme_id": 100, "content": "a", "like_count": "10", "add_ts": first_add_ts + 1000},
+            {"comment_id": 3, "aweme_id": 100, "content": "c", "like_count": "3", "unknown_field": "ignored"},
+        ])
+        comments = await self.query_all()
+        self.assertEqual([comment.comment_id for comment in comments], [1, 2, 3])
+        self.assertEqual(comments[0].like_count, 10)
+        # 已存在的记录保留首次写入的 add_ts
+        self.assertEqual(comments[0].add_ts, first_add_ts)
+
+    async def test_duplicate_keys_in_one_page(self):
+        await self.upsert([
+            {"comment_id": 1, "aweme_id": 100, "like_count": "1"},
+            {"comment_id": 1, "aweme_id": 100, "like_count": "5"},
+            {"comment_id": None, "aweme_id": 100, "like_count": "0"},
+        ])
+        comments = await self.query_all()
+        self.assertEqual(len(comments), 1)
+        self.assertEqual(comments[0].like_count, 5)
+
+    async def test_missing_columns_keep_existing_values(self):
+        await self.upsert([
+            {"comment_id": 1, "aweme_id": 100, "content": "a", "like_count": "1"},
+        ])
+        await self.upsert([
+            {"comment_id": 1, "aweme_id": 100, "like_count": "7"},
+            {"comment_id": 2, "aweme_id": 100, "content": "b"},
+        ])
+        comments = await self.query_all()
+        self.assertEqual(comments[0].content, "a")
+        self.assertEqual(comments[0].like_count, 7)
+        self.assertEqual(comments[1].content, "b")
+
+
+if __name__ == '__main__':
+    unittest.main()
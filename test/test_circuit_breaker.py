@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_circuit_breaker.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import config
+from media_platform.kuaishou.core import KuaishouCrawler
+from tools import seen_index
+from tools.circuit_breaker import CircuitBreaker
+from tools.seen_index import SEEN_KIND_COMMENT
+
+
+class TestCircuitBreaker(IsolatedAsyncioTestCase):
+
+    async def test_recover_once_without_blocking_loop(self):
+        on_recover = AsyncMock()
+        circuit_breaker = CircuitBreaker("test", 0.05, on_recover)
+        circuit_breaker.trip("blocked")
+        circuit_breaker.trip("blocked again")
+        self.assertTrue(circuit_breaker.is_open)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while circuit_breaker.is_open:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(circuit_breaker.wait_closed(), circuit_breaker.wait_closed(), ticker())
+        self.assertFalse(circuit_breaker.is_open)
+        # 熔断期间事件循环仍在运行其他协程
+        self.assertGreater(ticks, 1)
+        on_recover.assert_awaited_once()
+        self.assertEqual(circuit_breaker.trip_count, 1)
+
+    async def test_wait_closed_when_not_tripped(self):
+        await asyncio.wait_for(CircuitBreaker("test", 10).wait_closed(), timeout=0.1)
+
+
+class TestKuaishouCommentRequeue(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+
+    def tearDown(self):
+        seen_index.close_seen_indexes()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    @patch.object(config, "ENABLE_GET_COMMENTS", True)
+    @patch.object(config, "KS_BLOCK_COOLDOWN_SEC", 0.01)
+    async def test_blocked_comment_task_requeued(self):
+        crawler = KuaishouCrawler()
+        crawler.comment_circuit_breaker.on_recover = AsyncMock()
+        crawler.ks_client = MagicMock()
+        blocked_once = set()
+
+        async def get_video_all_comments(photo_id, **kwargs):
+            if photo_id == "video-1" and photo_id not in blocked_once:
+                blocked_once.add(photo_id)
+                raise RuntimeError("captcha")
+
+        crawler.ks_client.get_video_all_comments = AsyncMock(side_effect=get_video_all_comments)
+        await crawler.batch_get_video_comments(["video-1", "video-2"])
+
+        self.assertEqual(crawler.ks_client.get_video_all_comments.await_count, 3)
+        crawler.ks_client.report_blocked.assert_called_once()
+        crawler.comment_circuit_breaker.on_recover.assert_awaited_once()
+        self.assertTrue(seen_index.is_seen("kuaishou", SEEN_KIND_COMMENT, "video-1"))
+        self.assertTrue(seen_index.is_seen("kuaishou", SEEN_KIND_COMMENT, "video-2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_concurrent_sign.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import random
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import config
+from constant import zhihu as zhihu_constant
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.zhihu.client import ZhiHuClient
+from tools.rate_limiter import RateLimiter
+
+CONCURRENCY = 50
+
+
+class EchoSignServer:
+    """本地 HTTP 服务，把收到的签名请求头和请求参数原样返回，用于检查签名是否和请求对应"""
+
+    def __init__(self):
+        self._server = None
+        self.url = ""
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode().split("\r\n")
+                path = lines[0].split(" ")[1]
+                headers = {}
+                for line in lines[1:]:
+                    if ": " in line:
+                        key, value = line.split(": ", 1)
+                        headers[key.lower()] = value
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                # 随机延迟，让并发请求交错完成
+                await asyncio.sleep(random.random() / 100)
+                data = {
+                    "path": path,
+                    "body": json.loads(body) if body else None,
+                    "x-s": headers.get("x-s"),
+                    "x-zse-96": headers.get("x-zse-96"),
+                }
+                content = json.dumps({"success": True, "data": data}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(content)}\r\n\r\n".encode()
+                    + content
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class TestConcurrentSign(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = EchoSignServer()
+        await self.server.start()
+        # 测试的是签名并发安全，关闭请求限速
+        patchers = [
+            patch.object(config, "PLATFORM_RATE_LIMITS", {}),
+            patch.object(config, "ENABLE_ADAPTIVE_RATE_LIMIT", False),
+            patch.object(config, "RATE_LIMITS", {"detail": {"rate": 0}}),
+            patch("base.base_crawler.get_rate_limiter", return_value=RateLimiter()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_xhs_concurrent_sign(self):
+        client = XiaoHongShuClient(
+            headers={"User-Agent": "test", "Cookie": "a1=test"},
+            playwright_page=None,
+            cookie_dict={"a1": "test"},
+        )
+        client._host = self.server.url
+
+        def fake_sign_xs_post(uri, a1_value, payload):
+            # 真实的 x-s 签名长度超过 57 个字符，help.sign 依赖这个长度
+            return f"sign-{payload['note_id']}-{'x' * 64}"
+
+        client._xhshow_client.sign_xs_post = fake_sign_xs_post
+        results = await asyncio.gather(*[client.post("/api/sns/web/v1/feed", {"note_id": i}) for i in range(CONCURRENCY)])
+        await client.close()
+
+        for result in results:
+            self.assertEqual(result["x-s"], f"sign-{result['body']['note_id']}-{'x' * 64}")
+        self.assertNotIn("X-S", client.headers)
+
+    async def test_zhihu_concurrent_sign(self):
+        client = ZhiHuClient(
+            headers={"User-Agent": "test", "cookie": "d_c0=test"},
+            playwright_page=None,
+            cookie_dict={"d_c0": "test"},
+        )
+
+        async def fake_sign(url, cookies):
+            await asyncio.sleep(random.random() / 100)
+            return {"x-zst-81": "test", "x-zse-96": f"sign-{url}"}
+
+        with patch("media_platform.zhihu.client.sign", fake_sign), \
+                patch.object(zhihu_constant, "ZHIHU_URL", self.server.url):
+            responses = await asyncio.gather(*[client.get("/api/v4/search_v3", {"q": i}) for i in range(CONCURRENCY)])
+        await client.close()
+
+        results = [response["data"] for response in responses]
+        for result in results:
+            self.assertEqual(result["x-zse-96"], f"sign-{result['path']}")
+        self.assertEqual(sorted(int(parse_qs(urlparse(r["path"]).query)["q"][0]) for r in results), list(range(CONCURRENCY)))
+        self.assertNotIn("x-zse-96", client.default_headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
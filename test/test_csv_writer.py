@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_csv_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import csv
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import config
+from tools.csv_writer import CSV_ENCODING, BufferedCsvWriter
+
+
+class TestBufferedCsvWriter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "search_comments.csv")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_rows(self):
+        with open(self.file_path, newline="", encoding=CSV_ENCODING) as f:
+            return list(csv.DictReader(f))
+
+    @patch.object(config, "CSV_FLUSH_ROWS", 2)
+    @patch.object(config, "CSV_FLUSH_INTERVAL_SEC", 3600)
+    async def test_batch_flush_and_schema_drift(self):
+        writer = BufferedCsvWriter(self.file_path)
+        await writer.append({"comment_id": "1", "content": "a"})
+        self.assertFalse(os.path.exists(self.file_path))
+        await writer.append({"comment_id": "2", "content": "b"})
+        self.assertEqual(len(self.read_rows()), 2)
+
+        await writer.append({"comment_id": "3", "content": "c", "ip_location": "北京"})
+        await writer.close()
+        rows = self.read_rows()
+        self.assertEqual(list(rows[0].keys()), ["comment_id", "content", "ip_location"])
+        self.assertEqual([row["ip_location"] for row in rows], ["", "", "北京"])
+
+    async def test_reopen_append_without_duplicate_header(self):
+        writer = BufferedCsvWriter(self.file_path)
+        await writer.append({"comment_id": "1", "content": "a"})
+        await writer.close()
+
+        reopened_writer = BufferedCsvWriter(self.file_path)
+        await reopened_writer.append({"comment_id": "2", "content": "b"})
+        await reopened_writer.close()
+        self.assertEqual([row["comment_id"] for row in self.read_rows()], ["1", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_http_client.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from base.base_crawler import AbstractApiClient
+from tools.http_client import RequestLatencyStats
+
+
+class DummyApiClient(AbstractApiClient):
+    def __init__(self, proxy=None, timeout=10):
+        self.proxy = proxy
+        self.timeout = timeout
+
+    async def request(self, method, url, **kwargs):
+        pass
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+class TestRequestLatencyStats(unittest.TestCase):
+
+    def test_endpoint_key_merge_id_segments(self):
+        key_a = RequestLatencyStats.endpoint_key("get", "https://m.weibo.cn/detail/4975423847663542?a=1")
+        key_b = RequestLatencyStats.endpoint_key("GET", "https://m.weibo.cn/detail/4975423847660000")
+        self.assertEqual(key_a, key_b)
+        self.assertEqual(key_a, "GET m.weibo.cn/detail/:id")
+
+    def test_summary(self):
+        stats = RequestLatencyStats()
+        for elapsed in [0.1, 0.2, 0.3, 0.4]:
+            stats.record("GET", "https://api.bilibili.com/x/web-interface/nav", elapsed)
+        summary = stats.summary()["GET api.bilibili.com/x/web-interface/nav"]
+        self.assertEqual(summary["count"], 4)
+        self.assertAlmostEqual(summary["mean_ms"], 250.0)
+        self.assertAlmostEqual(summary["p50_ms"], 200.0)
+
+
+class TestApiClientConnectionPool(IsolatedAsyncioTestCase):
+
+    async def test_http_client_reused_per_proxy(self):
+        api_client = DummyApiClient()
+        self.assertIs(api_client.get_http_client(), api_client.get_http_client())
+        self.assertIsNot(api_client.get_http_client(), api_client.get_http_client("http://127.0.0.1:8888"))
+
+        http_client = api_client.get_http_client()
+        await api_client.close()
+        self.assertTrue(http_client.is_closed)
+        self.assertIsNot(api_client.get_http_client(), http_client)
+        await api_client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
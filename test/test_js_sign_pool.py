@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_js_sign_pool.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import shutil
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from tools.js_sign_pool import JsSignError, JsSignWorkerPool
+
+
+@unittest.skipIf(shutil.which("node") is None, "node is not installed")
+class TestJsSignWorkerPool(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pool = JsSignWorkerPool("libs/douyin.js", size=2)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_concurrent_sign(self):
+        results = await asyncio.gather(*[self.pool.call("sign_datail", f"aweme_id={i}", "Mozilla/5.0") for i in range(8)])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(isinstance(result, str) and result for result in results))
+
+    async def test_script_error_keep_worker_usable(self):
+        with self.assertRaises(JsSignError):
+            await self.pool.call("function_not_exists")
+        self.assertTrue(await self.pool.call("sign_reply", "aweme_id=1", "Mozilla/5.0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_jsonl_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from tools.jsonl_writer import JsonlAppendWriter, iter_jsonl_items
+
+
+class TestJsonlAppendWriter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.temp_dir.name, "search_comments_test.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_migrate_append_and_export(self):
+        old_items = [{"comment_id": "1", "content": "旧评论", "sub": {"like_count": 1}}]
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(old_items, f, ensure_ascii=False, indent=4)
+
+        writer = JsonlAppendWriter(self.json_path, "comment_id")
+        self.assertEqual(writer.item_count, 1)
+        self.assertTrue(os.path.exists(writer.id_index_path))
+        self.assertFalse(await writer.append({"comment_id": "1", "content": "重复"}))
+        self.assertTrue(await writer.append({"comment_id": "2", "content": "新评论"}))
+        await writer.close(export_json=True)
+
+        expected_items = old_items + [{"comment_id": "2", "content": "新评论"}]
+        with open(writer.jsonl_path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], expected_items)
+        with open(self.json_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(expected_items, ensure_ascii=False, indent=4))
+
+    async def test_reopen_keep_ids(self):
+        writer = JsonlAppendWriter(self.json_path, "comment_id")
+        await writer.append({"comment_id": "1"})
+        await writer.close(export_json=False)
+
+        reopened_writer = JsonlAppendWriter(self.json_path, "comment_id")
+        self.assertFalse(os.path.exists(self.json_path))
+        self.assertFalse(await reopened_writer.append({"comment_id": "1"}))
+        await reopened_writer.close(export_json=True)
+        with open(self.json_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"comment_id": "1"}])
+
+    async def test_id_index_reset_when_data_removed(self):
+        writer = JsonlAppendWriter(self.json_path, "comment_id")
+        await writer.append({"comment_id": "1"})
+        await writer.close(export_json=False)
+        os.remove(writer.jsonl_path)
+
+        reopened_writer = JsonlAppendWriter(self.json_path, "comment_id")
+        self.assertEqual(reopened_writer.item_count, 0)
+        self.assertTrue(await reopened_writer.append({"comment_id": "1"}))
+        await reopened_writer.close(export_json=False)
+
+    async def test_iter_items_after_close_without_index(self):
+        writer = JsonlAppendWriter(self.json_path, "comment_id")
+        await writer.append({"comment_id": "1", "content": "评论"})
+        await writer.close(export_json=False)
+        os.remove(writer.id_index_path)
+        with open(writer.jsonl_path, "a", encoding="utf-8") as f:
+            f.write('{"comment_id": "2"')
+
+        self.assertEqual(list(iter_jsonl_items(writer.jsonl_path)), [{"comment_id": "1", "content": "评论"}])
+        self.assertFalse(os.path.exists(writer.id_index_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
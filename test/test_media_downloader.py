@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_media_downloader.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+
+import config
+from tools.media_downloader import segmented_download, split_segments, stream_download
+
+MEDIA_CONTENT = bytes(range(256)) * 1024
+
+
+def range_handler(request: httpx.Request) -> httpx.Response:
+    range_header = request.headers.get("Range")
+    if range_header:
+        start, _, end = range_header.split("=")[1].partition("-")
+        start = int(start)
+        end = int(end) if end else len(MEDIA_CONTENT) - 1
+        if start >= len(MEDIA_CONTENT):
+            return httpx.Response(416)
+        return httpx.Response(
+            206,
+            content=MEDIA_CONTENT[start:end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(MEDIA_CONTENT)}"},
+        )
+    return httpx.Response(200, content=MEDIA_CONTENT)
+
+
+class TestStreamDownload(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.temp_dir.name, "video.mp4")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_download_and_rename(self):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(range_handler)) as client:
+            self.assertTrue(await stream_download(client, "https://cdn.test/video.mp4", self.save_path))
+        with open(self.save_path, "rb") as f:
+            self.assertEqual(f.read(), MEDIA_CONTENT)
+        self.assertFalse(os.path.exists(f"{self.save_path}.part"))
+
+    async def test_resume_partial_file(self):
+        with open(f"{self.save_path}.part", "wb") as f:
+            f.write(MEDIA_CONTENT[:1000])
+        requested_ranges = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_ranges.append(request.headers.get("Range"))
+            return range_handler(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            self.assertTrue(await stream_download(client, "https://cdn.test/video.mp4", self.save_path))
+        self.assertEqual(requested_ranges, ["bytes=1000-"])
+        with open(self.save_path, "rb") as f:
+            self.assertEqual(f.read(), MEDIA_CONTENT)
+
+    async def test_failed_download_keeps_part_file(self):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(500))) as client:
+            self.assertFalse(await stream_download(client, "https://cdn.test/video.mp4", self.save_path))
+        self.assertFalse(os.path.exists(self.save_path))
+
+    async def test_client_error_not_retried(self):
+        request_count = [0]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            request_count[0] += 1
+            return httpx.Response(404)
+
+        # 过期的媒体地址返回 404，重试也不会成功，只请求一次
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            self.assertFalse(await stream_download(client, "https://cdn.test/video.mp4", self.save_path))
+        self.assertEqual(request_count[0], 1)
+
+    @patch.object(config, "MEDIA_DOWNLOAD_MAX_RETRIES", 1)
+    async def test_transport_error_reported(self):
+        transport_errors = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/refused.mp4":
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(404)
+
+        # 只有网络错误调用 on_transport_error，状态码错误由 on_response 处理
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for url in ("https://cdn.test/refused.mp4", "https://cdn.test/expired.mp4"):
+                self.assertFalse(
+                    await stream_download(client, url, self.save_path, on_transport_error=transport_errors.append)
+                )
+        self.assertEqual([type(e) for e in transport_errors], [httpx.ConnectError])
+
+
+class TestSegmentedDownload(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.temp_dir.name, "video.mp4")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_split_segments(self):
+        self.assertEqual(split_segments(10, 4), [(0, 3), (4, 7), (8, 9)])
+
+    @patch.object(config, "MEDIA_DOWNLOAD_SEGMENT_SIZE", 64 * 1024)
+    async def test_download_segments_and_merge(self):
+        requested_ranges = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_ranges.append(request.headers.get("Range"))
+            return range_handler(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            self.assertTrue(await segmented_download(client, "https://cdn.test/video.mp4", self.save_path))
+        # 第一个请求用于探测文件大小，之后按 64KB 切分为 4 个分段
+        self.assertEqual(requested_ranges[0], "bytes=0-0")
+        self.assertEqual(len(requested_ranges), 5)
+        with open(self.save_path, "rb") as f:
+            self.assertEqual(f.read(), MEDIA_CONTENT)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["video.mp4"])
+
+    @patch.object(config, "MEDIA_DOWNLOAD_SEGMENT_SIZE", 64 * 1024)
+    async def test_fallback_when_range_ignored(self):
+        requested_ranges = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_ranges.append(request.headers.get("Range"))
+            return httpx.Response(200, content=MEDIA_CONTENT)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            self.assertTrue(await segmented_download(
+                client, "https://cdn.test/video.mp4", self.save_path, total_size=len(MEDIA_CONTENT)
+            ))
+        # 每个分段都只请求一次，发现服务端忽略 Range 后不再重试分段，直接整体下载
+        self.assertEqual(len(requested_ranges), 5)
+        self.assertIsNone(requested_ranges[-1])
+        with open(self.save_path, "rb") as f:
+            self.assertEqual(f.read(), MEDIA_CONTENT)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["video.mp4"])
+
+    @patch.object(config, "MEDIA_DOWNLOAD_MAX_RETRIES", 1)
+    async def test_max_retries_read_at_runtime(self):
+        request_count = [0]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            request_count[0] += 1
+            return httpx.Response(500)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            self.assertFalse(await stream_download(client, "https://cdn.test/video.mp4", self.save_path))
+        self.assertEqual(request_count[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_media_pipeline.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import config
+from tools.media_blob_store import MediaBlobStore, file_sha256
+from tools.media_downloader import BandwidthLimiter
+from tools.media_pipeline import MediaDownloadJob, MediaDownloadPipeline
+
+
+class TestMediaDownloadPipeline(IsolatedAsyncioTestCase):
+
+    @patch.object(config, "ENABLE_MEDIA_DEDUP", False)
+    async def test_per_host_concurrency_and_drain(self):
+        running = {"a.cdn.test": 0, "b.cdn.test": 0}
+        max_running = {"a.cdn.test": 0, "b.cdn.test": 0}
+        stored = []
+
+        async def fake_download(url: str, save_path: str) -> bool:
+            host = url.split("/")[2]
+            running[host] += 1
+            max_running[host] = max(max_running[host], running[host])
+            await asyncio.sleep(0.01)
+            running[host] -= 1
+            return not url.endswith("broken.jpg")
+
+        async def fake_store(name: str, save_path: str):
+            stored.append(name)
+
+        pipeline = MediaDownloadPipeline(max_workers=6, per_host_concurrency=2)
+        for host in running:
+            for i in range(5):
+                await pipeline.submit(MediaDownloadJob(
+                    platform="test",
+                    url=f"https://{host}/{i}.jpg",
+                    download_func=fake_download,
+                    store_func=lambda path, name=f"{host}-{i}": fake_store(name, path),
+                ))
+        await pipeline.submit(MediaDownloadJob(
+            platform="test",
+            url="https://a.cdn.test/broken.jpg",
+            download_func=fake_download,
+            store_func=lambda path: fake_store("broken", path),
+        ))
+        await pipeline.drain()
+
+        self.assertEqual(len(stored), 10)
+        self.assertNotIn("broken", stored)
+        self.assertEqual(pipeline.failed_count, 1)
+        self.assertEqual(max_running, {"a.cdn.test": 2, "b.cdn.test": 2})
+
+    async def test_same_url_not_downloaded_concurrently(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        blob_store = MediaBlobStore(os.path.join(temp_dir.name, "blobs"))
+        self.addCleanup(blob_store.close)
+        running, download_count, stored = [0], [0], []
+
+        async def fake_download(url: str, save_path: str) -> bool:
+            running[0] += 1
+            download_count[0] += 1
+            self.assertEqual(running[0], 1)
+            await asyncio.sleep(0.01)
+            with open(save_path, "wb") as f:
+                f.write(b"shared cover")
+            running[0] -= 1
+            return True
+
+        async def fake_store(save_path: str):
+            with open(save_path, "rb") as f:
+                stored.append(f.read())
+            os.remove(save_path)
+
+        pipeline = MediaDownloadPipeline(max_workers=4, per_host_concurrency=4)
+        with patch.object(config, "ENABLE_MEDIA_DEDUP", True), \
+                patch("tools.media_pipeline.get_media_blob_store", return_value=blob_store):
+            for _ in range(3):
+                await pipeline.submit(MediaDownloadJob(
+                    platform="test",
+                    url="https://a.cdn.test/cover.jpg",
+                    download_func=fake_download,
+                    store_func=fake_store,
+                ))
+            await pipeline.drain()
+
+        self.assertEqual(download_count[0], 1)
+        self.assertEqual(pipeline.reused_count, 2)
+        self.assertEqual(stored, [b"shared cover"] * 3)
+
+    async def test_bandwidth_limiter(self):
+        limiter = BandwidthLimiter(rate=1000)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.consume(1000)
+        # 第一秒的令牌桶是满的，之后每1000字节需要等待1秒
+        self.assertGreaterEqual(time.monotonic() - start, 1.9)
+
+
+class TestMediaBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.blob_store = MediaBlobStore(os.path.join(self.temp_dir.name, "blobs"))
+
+    def tearDown(self):
+        self.blob_store.close()
+        self.temp_dir.cleanup()
+
+    def _write_file(self, name: str, content: bytes) -> str:
+        file_path = os.path.join(self.temp_dir.name, name)
+        with open(file_path, "wb") as f:
+            f.write(content)
+        return file_path
+
+    def test_same_content_stored_once(self):
+        first_path = self._write_file("first", b"same image")
+        content_hash = file_sha256(first_path)
+        self.blob_store.add_file(first_path, "https://a.cdn.test/1.jpg", content_hash)
+        second_path = self._write_file("second", b"same image")
+        self.blob_store.add_file(second_path, "https://b.cdn.test/1.jpg", file_sha256(second_path))
+
+        self.assertFalse(os.path.exists(second_path))
+        self.assertEqual(self.blob_store.lookup_url("https://b.cdn.test/1.jpg"), content_hash)
+        self.assertIsNone(self.blob_store.lookup_url("https://c.cdn.test/1.jpg"))
+
+        note_a = os.path.join(self.temp_dir.name, "note_a.jpg")
+        note_b = os.path.join(self.temp_dir.name, "note_b.jpg")
+        self.blob_store.link_to(content_hash, note_a)
+        self.blob_store.link_to(content_hash, note_b)
+        self.assertTrue(os.path.samefile(note_a, self.blob_store.get_blob_path(content_hash)))
+        self.assertTrue(os.path.samefile(note_a, note_b))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_migrate_engagement_columns.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+from database.migrate_engagement_columns import migrate_tables
+
+OLD_SCHEMA = """
+CREATE TABLE xhs_note_comment (
+    id INTEGER PRIMARY KEY, user_id VARCHAR(255), nickname TEXT, avatar TEXT, ip_location TEXT,
+    add_ts BIGINT, last_modify_ts BIGINT, comment_id VARCHAR(255), create_time BIGINT, note_id VARCHAR(255),
+    content TEXT, sub_comment_count INTEGER, pictures TEXT, parent_comment_id VARCHAR(255), like_count TEXT
+);
+CREATE INDEX ix_xhs_note_comment_comment_id ON xhs_note_comment (comment_id);
+CREATE INDEX ix_xhs_note_comment_create_time ON xhs_note_comment (create_time);
+CREATE TABLE xhs_note (
+    id INTEGER PRIMARY KEY, note_id VARCHAR(255), time BIGINT, liked_count TEXT, collected_count TEXT,
+    comment_count TEXT, share_count TEXT, source_keyword TEXT
+);
+"""
+
+
+class TestMigrateEngagementColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "old.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript(OLD_SCHEMA)
+            conn.executemany(
+                "INSERT INTO xhs_note_comment (id, comment_id, note_id, create_time, like_count) VALUES (?, ?, ?, ?, ?)",
+                [(1, "c1", "n1", 100, "1.2万"), (2, "c2", "n1", 200, "None"), (3, "c1", "n1", 100, "15")],
+            )
+            conn.execute(
+                "INSERT INTO xhs_note (id, note_id, time, liked_count, comment_count, source_keyword) "
+                "VALUES (1, 'n1', 100, '10万+', '3', '关键词')"
+            )
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def migrate(self):
+        with self.engine.begin() as conn:
+            migrate_tables(conn)
+
+    def test_migrate_sqlite(self):
+        self.migrate()
+        # 可以重复运行
+        self.migrate()
+        with self.engine.connect() as conn:
+            comments = conn.execute(
+                text("SELECT comment_id, like_count, typeof(like_count) FROM xhs_note_comment ORDER BY comment_id")
+            ).fetchall()
+            note = conn.execute(text("SELECT liked_count, comment_count, collected_count FROM xhs_note")).one()
+            indexes = {index["name"]: index for index in inspect(conn).get_indexes("xhs_note_comment")}
+            note_indexes = {index["name"] for index in inspect(conn).get_indexes("xhs_note")}
+            table_names = inspect(conn).get_table_names()
+
+        self.assertEqual([tuple(row) for row in comments], [("c1", 15, "integer"), ("c2", None, "null")])
+        self.assertEqual(tuple(note), (100000, 3, None))
+        self.assertTrue(indexes["ix_xhs_note_comment_comment_id"]["unique"])
+        self.assertIn("ix_xhs_note_comment_note_id_create_time", indexes)
+        self.assertIn("ix_xhs_note_source_keyword_time", note_indexes)
+        # 旧库中不存在的表按新的表结构创建
+        self.assertIn("douyin_aweme", table_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
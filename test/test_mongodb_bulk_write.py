@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_mongodb_bulk_write.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from database.mongodb_store_base import MongoDBConnection, MongoDBStoreBase
+from store.douyin._store_impl import DouyinMongoStoreImplement
+
+
+class TestMongoDBBulkWrite(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.collection.name = "douyin_comments"
+        self.collection.bulk_write = AsyncMock()
+        self.collection.create_index = AsyncMock()
+        db = MagicMock()
+        db.__getitem__.return_value = self.collection
+        self.get_db_patcher = patch.object(MongoDBConnection, "get_db", AsyncMock(return_value=db))
+        self.get_db_patcher.start()
+        MongoDBStoreBase._indexed_collections.clear()
+
+    def tearDown(self):
+        self.get_db_patcher.stop()
+        MongoDBStoreBase._indexed_collections.clear()
+
+    async def test_store_comments_in_one_bulk_write(self):
+        store = DouyinMongoStoreImplement()
+        await store.store_comments([{"comment_id": 1, "content": "a"}, {"comment_id": 2, "content": "b"}, {}])
+        await store.store_comments([{"comment_id": 3, "content": "c"}])
+
+        self.assertEqual(self.collection.bulk_write.await_count, 2)
+        operations = self.collection.bulk_write.await_args_list[0].args[0]
+        self.assertEqual([operation._filter for operation in operations], [{"comment_id": 1}, {"comment_id": 2}])
+        self.assertTrue(all(operation._upsert for operation in operations))
+        self.assertEqual(self.collection.bulk_write.await_args_list[0].kwargs, {"ordered": False})
+
+        # 索引只在第一次访问集合时创建
+        index_calls = [(call.args[0], call.kwargs["unique"]) for call in self.collection.create_index.await_args_list]
+        self.assertEqual(index_calls, [
+            ([("comment_id", 1)], True),
+            ([("aweme_id", 1), ("create_time", -1)], False),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
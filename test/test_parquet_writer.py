@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_parquet_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import config
+from tools.parquet_writer import ParquetDatasetWriter, is_pyarrow_available
+
+if is_pyarrow_available():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+
+@unittest.skipUnless(is_pyarrow_available(), "pyarrow is not installed")
+class TestParquetDatasetWriter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dataset_dir = os.path.join(self.temp_dir.name, "comments")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def list_files(self):
+        # _common_metadata 只保存 schema，不计入数据文件
+        return sorted(name for name in os.listdir(self.dataset_dir) if not name.startswith("_"))
+
+    @patch.object(config, "PARQUET_ROW_GROUP_SIZE", 2)
+    async def test_row_groups_and_typed_columns(self):
+        writer = ParquetDatasetWriter(self.dataset_dir)
+        await writer.append({"comment_id": "1", "like_count": 3, "ip_location": None})
+        self.assertEqual(self.list_files(), [])
+        await writer.append({"comment_id": "2", "like_count": 5, "ip_location": "北京"})
+        # 攒够一个 row group 后写入，文件关闭前以 . 开头
+        self.assertTrue(self.list_files()[0].startswith("."))
+        await writer.append({"comment_id": "3", "like_count": 7, "ip_location": "上海"})
+        await writer.close()
+
+        files = self.list_files()
+        self.assertEqual(len(files), 1)
+        parquet_file = pq.ParquetFile(os.path.join(self.dataset_dir, files[0]))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        self.assertEqual(parquet_file.schema_arrow.field("like_count").type, pa.int64())
+        self.assertEqual(parquet_file.read().column("like_count").to_pylist(), [3, 5, 7])
+
+    @patch.object(config, "PARQUET_ROW_GROUP_SIZE", 1)
+    async def test_new_file_when_schema_changes(self):
+        writer = ParquetDatasetWriter(self.dataset_dir)
+        await writer.append({"comment_id": "1", "like_count": 3})
+        await writer.append({"comment_id": "2", "like_count": "1.2万", "sub_comments": [{"id": 1}]})
+        await writer.close()
+
+        # 之前的文件按合并后的 schema 重写，不传 schema 也能直接读取整个数据集
+        part_files = self.list_files()
+        self.assertEqual(len(part_files), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.dataset_dir, "_common_metadata")))
+        for name in part_files:
+            self.assertTrue(pq.read_schema(os.path.join(self.dataset_dir, name)).equals(writer.schema))
+        table = pq.read_table(self.dataset_dir)
+        self.assertEqual(table.schema.field("like_count").type, pa.string())
+        self.assertEqual(sorted(table.column("like_count").to_pylist()), ["1.2万", "3"])
+        self.assertIn('[{"id": 1}]', table.column("sub_comments").to_pylist())
+
+    @patch.object(config, "PARQUET_ROW_GROUP_SIZE", 1)
+    async def test_schema_kept_across_runs(self):
+        writer = ParquetDatasetWriter(self.dataset_dir)
+        await writer.append({"comment_id": "1", "like_count": 3})
+        await writer.close()
+
+        # 再次运行时沿用已有 schema，缺少的列不会把已有的整数列放宽
+        writer = ParquetDatasetWriter(self.dataset_dir)
+        await writer.append({"comment_id": "2", "ip_location": "北京"})
+        await writer.close()
+
+        table = pq.read_table(self.dataset_dir)
+        self.assertEqual(table.schema.field("like_count").type, pa.int64())
+        self.assertIn("北京", table.column("ip_location").to_pylist())
+        self.assertEqual(table.num_rows, 2)
+
+    @patch.object(config, "PARQUET_ROW_GROUP_SIZE", 1)
+    @patch.object(config, "PARQUET_MAX_FILE_SIZE", 1)
+    async def test_roll_over_by_size(self):
+        writer = ParquetDatasetWriter(self.dataset_dir)
+        for i in range(3):
+            await writer.append({"comment_id": str(i)})
+        await writer.close()
+
+        self.assertEqual(len(self.list_files()), 3)
+        self.assertEqual(pq.read_table(self.dataset_dir).num_rows, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
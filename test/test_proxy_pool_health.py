@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_proxy_pool_health.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import unittest
+from typing import List
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+import config
+from base.base_crawler import AbstractApiClient
+from proxy.base_proxy import ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool, get_httpx_proxy_url
+from proxy.types import IpInfoModel
+
+
+def new_proxy(port: int, ttl: int = 3600) -> IpInfoModel:
+    return IpInfoModel(ip="127.0.0.1", port=port, user="", password="", expired_time_ts=int(time.time()) + ttl)
+
+
+class FakeProxyProvider(ProxyProvider):
+    def __init__(self, proxies: List[IpInfoModel]):
+        self.proxies = proxies
+
+    async def get_proxy(self, num: int) -> List[IpInfoModel]:
+        return self.proxies[:num]
+
+
+class DummyApiClient(AbstractApiClient):
+    def __init__(self, proxy=None, timeout=10):
+        self.proxy = proxy
+        self.timeout = timeout
+
+    async def request(self, method, url, **kwargs):
+        pass
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+class TestProxyIpPoolHealth(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.proxies = [new_proxy(8001), new_proxy(8002)]
+        self.pool = ProxyIpPool(ip_pool_count=2, enable_validate_ip=False, ip_provider=FakeProxyProvider(self.proxies))
+        await self.pool.load_proxies()
+        self.urls = [get_httpx_proxy_url(proxy) for proxy in self.proxies]
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_get_proxy_prefers_healthy_proxy(self):
+        self.pool.report_success(self.urls[0], 2.0)
+        self.pool.report_success(self.urls[1], 0.1)
+        for _ in range(5):
+            self.assertEqual(get_httpx_proxy_url(await self.pool.get_proxy()), self.urls[1])
+
+    async def test_blocked_proxy_evicted_and_not_reloaded(self):
+        self.pool.report_blocked(self.urls[0])
+        self.assertFalse(self.pool.is_usable(self.urls[0]))
+        await self.pool.load_proxies()
+        self.assertEqual([get_httpx_proxy_url(proxy) for proxy in self.pool.proxy_list], [self.urls[1]])
+
+    @patch.object(config, "PROXY_MAX_CONSECUTIVE_FAILURES", 2)
+    async def test_consecutive_failures_evict(self):
+        self.pool.report_failure(self.urls[0])
+        self.pool.report_success(self.urls[0], 0.1)
+        self.pool.report_failure(self.urls[0])
+        self.assertTrue(self.pool.is_usable(self.urls[0]))
+        self.pool.report_failure(self.urls[0])
+        self.assertFalse(self.pool.is_usable(self.urls[0]))
+
+    @patch.object(config, "PROXY_EXPIRE_BUFFER_SEC", 60)
+    async def test_expiring_proxy_replaced(self):
+        self.proxies[0].expired_time_ts = int(time.time()) + 30
+        self.proxies.append(new_proxy(8003))
+        await self.pool.load_proxies()
+        self.assertEqual(
+            sorted(get_httpx_proxy_url(proxy) for proxy in self.pool.proxy_list),
+            sorted([self.urls[1], get_httpx_proxy_url(self.proxies[2])]),
+        )
+
+
+class TestApiClientProxyRotation(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.proxies = [new_proxy(8001), new_proxy(8002)]
+        self.pool = ProxyIpPool(ip_pool_count=2, enable_validate_ip=False, ip_provider=FakeProxyProvider(self.proxies))
+        await self.pool.load_proxies()
+        self.api_client = DummyApiClient()
+        self.api_client.ip_pool = self.pool
+
+    async def asyncTearDown(self):
+        await self.api_client.close()
+        await self.pool.close()
+
+    @patch.object(config, "PROXY_LEASE_MODE", "session")
+    async def test_session_switch_proxy_after_blocked(self):
+        proxy = await self.api_client.lease_proxy()
+        self.assertEqual(await self.api_client.lease_proxy(), proxy)
+
+        response = httpx.Response(200, extensions={"proxy": proxy})
+        with patch("base.base_crawler.get_rate_limiter"):
+            self.api_client.report_blocked(response)
+        new_proxy_url = await self.api_client.lease_proxy()
+        self.assertNotEqual(new_proxy_url, proxy)
+        self.assertEqual(self.api_client.proxy, new_proxy_url)
+
+    async def test_http_client_closed_when_proxy_evicted(self):
+        proxy = await self.api_client.lease_proxy()
+        http_client = self.api_client.get_http_client(proxy)
+        self.pool.report_blocked(proxy)
+        await asyncio.sleep(0)
+        self.assertTrue(http_client.is_closed)
+        self.assertNotIn(proxy, self.api_client._http_clients)
+        self.assertIsNot(self.api_client.get_http_client(proxy), http_client)
+
+    async def _download_media(self, status_code=None, transport_error=None):
+        """用模拟的 stream_download 下载一次，返回所用的连接池和 mock 的限速器"""
+        used_clients = []
+
+        async def fake_stream_download(
+            http_client, url, save_path, headers=None, on_response=None, on_transport_error=None
+        ):
+            used_clients.append(http_client)
+            if transport_error:
+                on_transport_error(transport_error)
+            else:
+                on_response(httpx.Response(status_code))
+            return False
+
+        rate_limiter = MagicMock()
+        rate_limiter.acquire = AsyncMock()
+        with patch("base.base_crawler.get_rate_limiter", return_value=rate_limiter), \
+                patch("base.base_crawler.stream_download", side_effect=fake_stream_download):
+            self.assertFalse(await self.api_client.download_media("https://cdn.test/1.jpg", "/tmp/1.jpg"))
+        return used_clients, rate_limiter
+
+    @patch.object(config, "PROXY_LEASE_MODE", "session")
+    async def test_media_download_uses_leased_proxy(self):
+        proxy = await self.api_client.lease_proxy()
+        used_clients, rate_limiter = await self._download_media(status_code=429)
+        # 下载走租用代理的连接池，被封禁时剔除代理，按媒体下载单独的限速平台上报，不影响接口限速
+        rate_limiter.acquire.assert_awaited_once_with("DummyApiClient/media", "media")
+        rate_limiter.record_block.assert_called_once_with("DummyApiClient/media", None)
+        self.assertFalse(self.pool.is_usable(proxy))
+        await asyncio.sleep(0)
+        self.assertTrue(used_clients[0].is_closed)
+
+    @patch.object(config, "PROXY_LEASE_MODE", "session")
+    @patch.object(config, "PROXY_MAX_CONSECUTIVE_FAILURES", 1)
+    async def test_media_client_error_not_charged_to_proxy(self):
+        proxy = await self.api_client.lease_proxy()
+        # 过期的媒体地址返回 404，不是代理的问题
+        _, rate_limiter = await self._download_media(status_code=404)
+        self.assertTrue(self.pool.is_usable(proxy))
+        rate_limiter.record_success.assert_called_once_with("DummyApiClient/media")
+        # 网络错误计入代理失败
+        _, rate_limiter = await self._download_media(transport_error=httpx.ConnectError("refused"))
+        rate_limiter.record_error.assert_called_once_with("DummyApiClient/media")
+        self.assertFalse(self.pool.is_usable(proxy))
+
+if __name__ == '__main__':
+    unittest.main()
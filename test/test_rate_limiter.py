@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_rate_limiter.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+import config
+from media_platform.kuaishou.client import KuaiShouClient
+from test.test_http_client import DummyApiClient
+from tools.rate_limiter import (
+    ENDPOINT_COMMENTS,
+    ENDPOINT_DETAIL,
+    ENDPOINT_MEDIA,
+    ENDPOINT_SEARCH,
+    AdaptiveController,
+    RateLimiter,
+    TokenBucket,
+    get_media_rate_limit_platform,
+    get_rate_limit_config,
+    parse_retry_after,
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        # 桶空后按预约顺序排队，每个请求间隔 1/rate 秒
+        self.assertAlmostEqual(bucket.reserve(), 0.5, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 1.0, places=2)
+
+    def test_jitter_only_when_waiting(self):
+        bucket = TokenBucket(rate=1, burst=1, jitter=0.5)
+        with patch("tools.rate_limiter.random.uniform", return_value=0.3) as uniform:
+            self.assertEqual(bucket.reserve(), 0)
+            uniform.assert_not_called()
+            self.assertAlmostEqual(bucket.reserve(), 1.3, places=2)
+            uniform.assert_called_once_with(0, 0.5)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(rate=0)
+        self.assertEqual([bucket.reserve() for _ in range(10)], [0] * 10)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=1, burst=5)
+        bucket.pause(30)
+        self.assertAlmostEqual(bucket.reserve(), 30, places=1)
+        self.assertAlmostEqual(bucket.reserve(), 31, places=1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+        retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(retry_at), 60, delta=2)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+@patch.multiple(
+    config,
+    ADAPTIVE_INCREASE_INTERVAL=5,
+    ADAPTIVE_RATE_INCREASE_STEP=0.1,
+    ADAPTIVE_MAX_RATE_FACTOR=2.0,
+    ADAPTIVE_MIN_RATE_FACTOR=0.1,
+    ADAPTIVE_DECREASE_FACTOR=0.5,
+    ADAPTIVE_ERROR_WINDOW=10,
+    ADAPTIVE_ERROR_RATE_THRESHOLD=0.3,
+    ADAPTIVE_DECREASE_COOLDOWN_SEC=0,
+)
+class TestAdaptiveController(IsolatedAsyncioTestCase):
+
+    def test_additive_increase(self):
+        controller = AdaptiveController(max_concurrency=3)
+        for _ in range(20):
+            controller.record_success()
+        # 每 5 个正常响应增大一次，并发数不超过上限
+        self.assertEqual(controller.concurrency_limit, 3)
+        self.assertAlmostEqual(controller.rate_factor, 1.4)
+
+    def test_block_multiplicative_decrease(self):
+        controller = AdaptiveController(max_concurrency=8)
+        for _ in range(35):
+            controller.record_success()
+        self.assertEqual(controller.concurrency_limit, 8)
+        self.assertTrue(controller.record_block())
+        self.assertEqual(controller.concurrency_limit, 4)
+        self.assertAlmostEqual(controller.rate_factor, 0.85)
+
+    def test_decrease_cooldown(self):
+        controller = AdaptiveController(max_concurrency=8)
+        controller.concurrency_limit = 8
+        with patch.object(config, "ADAPTIVE_DECREASE_COOLDOWN_SEC", 60):
+            self.assertTrue(controller.record_block())
+            self.assertFalse(controller.record_block())
+        self.assertEqual(controller.concurrency_limit, 4)
+
+    def test_error_rate_decrease(self):
+        controller = AdaptiveController(max_concurrency=8)
+        for _ in range(4):
+            controller.record_success()
+        # 样本不足窗口的一半时不判断
+        self.assertFalse(controller.record_error())
+        self.assertTrue(controller.record_error())
+        self.assertAlmostEqual(controller.rate_factor, 0.5)
+
+    async def test_slot_limits_in_flight(self):
+        controller = AdaptiveController(max_concurrency=8)
+        controller.concurrency_limit = 2
+        max_in_flight = 0
+
+        async def request():
+            nonlocal max_in_flight
+            async with controller.slot():
+                max_in_flight = max(max_in_flight, controller.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[request() for _ in range(10)])
+        self.assertEqual(max_in_flight, 2)
+        self.assertEqual(controller.in_flight, 0)
+
+
+class TestRateLimitConfig(unittest.TestCase):
+
+    @patch.object(config, "RATE_LIMITS", {"search": {"rate": 0.1, "burst": 1}, "detail": {"rate": 0.2, "burst": 2}})
+    @patch.object(config, "PLATFORM_RATE_LIMITS", {"bili": {"search": {"rate": 0.5}}})
+    def test_platform_override(self):
+        self.assertEqual(get_rate_limit_config("bili", ENDPOINT_SEARCH), {"rate": 0.5, "burst": 1})
+        self.assertEqual(get_rate_limit_config("xhs", ENDPOINT_SEARCH), {"rate": 0.1, "burst": 1})
+        # 未配置的接口类型使用 detail 的配置
+        self.assertEqual(get_rate_limit_config("bili", ENDPOINT_COMMENTS), {"rate": 0.2, "burst": 2})
+        # 媒体下载的限速平台使用所属平台的配置
+        self.assertEqual(get_rate_limit_config(get_media_rate_limit_platform("bili"), ENDPOINT_SEARCH), {"rate": 0.5, "burst": 1})
+
+    @patch.object(config, "RATE_LIMIT_JITTER", 0)
+    def test_bucket_shared_per_platform_and_endpoint(self):
+        rate_limiter = RateLimiter()
+        self.assertIs(rate_limiter.get_bucket("xhs", ENDPOINT_SEARCH), rate_limiter.get_bucket("xhs", ENDPOINT_SEARCH))
+        self.assertIsNot(rate_limiter.get_bucket("xhs", ENDPOINT_SEARCH), rate_limiter.get_bucket("dy", ENDPOINT_SEARCH))
+        self.assertIsNot(rate_limiter.get_bucket("xhs", ENDPOINT_SEARCH), rate_limiter.get_bucket("xhs", ENDPOINT_DETAIL))
+
+
+class TestClassifyEndpoint(IsolatedAsyncioTestCase):
+
+    def test_classify_by_url(self):
+        api_client = DummyApiClient()
+        api_client.endpoint_classes = [("/search/", ENDPOINT_SEARCH), ("/comment/", ENDPOINT_COMMENTS)]
+        self.assertEqual(api_client.classify_endpoint("https://api.test/search/notes?page=2"), ENDPOINT_SEARCH)
+        self.assertEqual(api_client.classify_endpoint("https://api.test/comment/page"), ENDPOINT_COMMENTS)
+        self.assertEqual(api_client.classify_endpoint("https://api.test/feed"), ENDPOINT_DETAIL)
+
+    def test_kuaishou_classify_by_operation_name(self):
+        ks_client = KuaiShouClient(headers={}, playwright_page=None, cookie_dict={})
+        url = "https://www.kuaishou.com/graphql"
+        search_data = json.dumps({"operationName": "visionSearchPhoto", "variables": {}})
+        comment_data = json.dumps({"operationName": "commentListQuery", "variables": {}})
+        self.assertEqual(ks_client.classify_endpoint(url, data=search_data), ENDPOINT_SEARCH)
+        self.assertEqual(ks_client.classify_endpoint(url, data=comment_data), ENDPOINT_COMMENTS)
+        self.assertEqual(ks_client.classify_endpoint(url, data="{}"), ENDPOINT_DETAIL)
+
+    async def test_media_download_waits_for_media_token(self):
+        api_client = DummyApiClient()
+        api_client.platform = "test"
+        rate_limiter = AsyncMock()
+        with patch("base.base_crawler.get_rate_limiter", return_value=rate_limiter), \
+                patch("base.base_crawler.stream_download", new_callable=AsyncMock, return_value=True):
+            await api_client.download_media("https://cdn.test/1.jpg", "/tmp/1.jpg")
+        # 媒体下载使用单独的限速平台，CDN 的响应不影响接口限速
+        rate_limiter.acquire.assert_called_once_with(get_media_rate_limit_platform("test"), ENDPOINT_MEDIA)
+        await api_client.close()
+
+
+@patch.multiple(
+    config,
+    ENABLE_ADAPTIVE_RATE_LIMIT=True,
+    RATE_LIMITS={"detail": {"rate": 10, "burst": 10}},
+    PLATFORM_RATE_LIMITS={},
+    RATE_LIMIT_JITTER=0,
+    ADAPTIVE_DECREASE_FACTOR=0.5,
+    ADAPTIVE_DECREASE_COOLDOWN_SEC=0,
+    ADAPTIVE_BLOCK_PAUSE_SEC=30,
+)
+class TestAdaptiveRateLimit(IsolatedAsyncioTestCase):
+
+    async def test_block_status_cuts_rate_and_honors_retry_after(self):
+        rate_limiter = RateLimiter()
+        api_client = DummyApiClient()
+        api_client.platform = "test"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, headers={"Retry-After": "5"})
+
+        with patch("base.base_crawler.get_rate_limiter", return_value=rate_limiter), \
+                patch("base.base_crawler.create_async_http_client",
+                      side_effect=lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            await api_client.send_request("GET", "https://api.test/detail")
+            await api_client.close()
+
+        metrics = rate_limiter.metrics()["test"]
+        self.assertEqual(metrics["block_count"], 1)
+        self.assertEqual(metrics["rates"], {ENDPOINT_DETAIL: 5})
+        # 下一个请求要等到 Retry-After 结束
+        self.assertAlmostEqual(rate_limiter.get_bucket("test", ENDPOINT_DETAIL).reserve(), 5, places=1)
+
+    async def test_report_blocked_without_retry_after(self):
+        rate_limiter = RateLimiter()
+        rate_limiter.get_bucket("test", ENDPOINT_DETAIL)
+        rate_limiter.record_block("test")
+        self.assertAlmostEqual(rate_limiter.get_bucket("test", ENDPOINT_DETAIL).reserve(), 30, places=1)
+
+    async def test_disabled(self):
+        rate_limiter = RateLimiter()
+        rate_limiter.get_bucket("test", ENDPOINT_DETAIL)
+        with patch.object(config, "ENABLE_ADAPTIVE_RATE_LIMIT", False):
+            rate_limiter.record_block("test", retry_after=5)
+        self.assertEqual(rate_limiter.get_bucket("test", ENDPOINT_DETAIL).reserve(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_retry_policy.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from tenacity import RetryError
+
+import config
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.xhs.exception import AuthExpiredError, DataFetchError, IPBlockError
+from tools import retry_policy
+from tools.retry_policy import (
+    ERROR_AUTH_EXPIRED,
+    ERROR_PERMANENT,
+    ERROR_THROTTLED,
+    ERROR_TRANSIENT,
+    RetryBudget,
+    RetryStats,
+    classify_error,
+    mark_non_retryable,
+    retry_with_policy,
+)
+
+NO_DELAY_POLICIES = {
+    "transient": {"max_attempts": 3, "base_delay": 0, "max_delay": 0},
+    "throttled": {"max_attempts": 2, "base_delay": 0, "max_delay": 0},
+    "auth_expired": {"max_attempts": 2, "base_delay": 0, "max_delay": 0},
+    "permanent": {"max_attempts": 1, "base_delay": 0, "max_delay": 0},
+}
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.test/feed")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request))
+
+
+class FlakyClient:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.call_count = 0
+
+    @retry_with_policy()
+    async def request(self, method, url, **kwargs):
+        self.call_count += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class FlakyHtmlClient(FlakyClient):
+
+    @retry_with_policy(endpoint="GET html.test/explore/:id", host="html.test")
+    async def get_note_from_html(self, note_id, xsec_source):
+        self.call_count += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestClassifyError(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify_error(httpx.ConnectError("refused")), ERROR_TRANSIENT)
+        self.assertEqual(classify_error(status_error(429)), ERROR_THROTTLED)
+        self.assertEqual(classify_error(status_error(401)), ERROR_AUTH_EXPIRED)
+        self.assertEqual(classify_error(status_error(502)), ERROR_TRANSIENT)
+        self.assertEqual(classify_error(status_error(404)), ERROR_PERMANENT)
+        self.assertEqual(classify_error(DataFetchError("note not found")), ERROR_PERMANENT)
+        self.assertEqual(classify_error(IPBlockError("captcha")), ERROR_THROTTLED)
+        self.assertEqual(classify_error(Exception("unknown")), ERROR_TRANSIENT)
+
+
+@patch.object(config, "RETRY_POLICIES", NO_DELAY_POLICIES)
+@patch.object(config, "HOST_CIRCUIT_BREAKER_THRESHOLD", 3)
+@patch.object(config, "HOST_CIRCUIT_BREAKER_COOLDOWN_SEC", 0.01)
+class TestRetryWithPolicy(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.stats = RetryStats()
+        patchers = [
+            patch.object(retry_policy, "_retry_budget", RetryBudget(ratio=0.2, max_tokens=10)),
+            patch.object(retry_policy, "_retry_stats", self.stats),
+            patch.dict(retry_policy._host_circuit_breakers, clear=True),
+            patch.dict(retry_policy._host_failure_counts, clear=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_permanent_error_not_retried(self):
+        client = FlakyClient([DataFetchError("note not found")])
+        with self.assertRaises(DataFetchError):
+            await client.request("GET", "https://api.test/feed")
+        self.assertEqual(client.call_count, 1)
+        self.assertEqual(self.stats.summary()["GET api.test/feed"], {"calls": 1, ERROR_PERMANENT: 1})
+
+    async def test_transient_error_retried(self):
+        client = FlakyClient([httpx.ConnectError("refused")])
+        self.assertEqual(await client.request("GET", "https://api.test/feed"), "ok")
+        self.assertEqual(client.call_count, 2)
+        self.assertEqual(self.stats.summary()["GET api.test/feed"]["retries"], 1)
+
+    async def test_attempts_per_error_class(self):
+        client = FlakyClient([IPBlockError("captcha")] * 5)
+        with self.assertRaises(RetryError):
+            await client.request(method="GET", url="https://api.test/feed")
+        self.assertEqual(client.call_count, NO_DELAY_POLICIES["throttled"]["max_attempts"])
+        self.assertEqual(self.stats.summary()["GET api.test/feed"]["gave_up"], 1)
+
+    async def test_retry_budget(self):
+        retry_policy._retry_budget = RetryBudget(ratio=0, max_tokens=1)
+        client = FlakyClient([httpx.ConnectError("refused")] * 5)
+        with self.assertRaises(RetryError):
+            await client.request("GET", "https://api.test/feed")
+        # 预算只够重试一次
+        self.assertEqual(client.call_count, 2)
+        self.assertEqual(self.stats.summary()["GET api.test/feed"]["budget_exhausted"], 1)
+
+    async def test_host_circuit_breaker(self):
+        client = FlakyClient([httpx.ConnectError("refused")] * 3)
+        with self.assertRaises(RetryError):
+            await client.request("GET", "https://api.test/feed")
+        self.assertTrue(retry_policy.get_host_circuit_breaker("api.test").is_open)
+        await retry_policy.wait_host_available("api.test")
+        self.assertFalse(retry_policy.get_host_circuit_breaker("api.test").is_open)
+        self.assertEqual(await client.request("GET", "https://api.test/feed"), "ok")
+
+
+    async def test_explicit_endpoint_and_host(self):
+        client = FlakyHtmlClient([httpx.ConnectError("refused")] * 3)
+        with self.assertRaises(RetryError):
+            await client.get_note_from_html("65a1b2c3", "pc_search")
+        # 参数不是 (method, url) 时按传入的接口名称统计，失败计入对应域名的熔断
+        self.assertEqual(list(self.stats.summary()), ["GET html.test/explore/:id"])
+        self.assertTrue(retry_policy.get_host_circuit_breaker("html.test").is_open)
+
+    async def test_non_url_args_use_function_name(self):
+        client = FlakyHtmlClient([httpx.ConnectError("refused")])
+        self.assertEqual(await FlakyClient.request(client, "65a1b2c3", "pc_search"), "ok")
+        self.assertEqual(list(self.stats.summary()), ["FlakyClient.request"])
+        self.assertEqual(retry_policy._host_failure_counts, {})
+
+
+    async def test_non_retryable_error_not_retried(self):
+        client = FlakyClient([mark_non_retryable(IPBlockError("captcha"))])
+        with self.assertRaises(IPBlockError):
+            await client.request("GET", "https://api.test/feed")
+        self.assertEqual(client.call_count, 1)
+        self.assertEqual(self.stats.summary()["GET api.test/feed"], {"calls": 1, ERROR_THROTTLED: 1})
+
+    async def test_xhs_captcha_and_auth_expired_not_retried(self):
+        client = XiaoHongShuClient(
+            headers={"User-Agent": "test", "Cookie": "a1=test"},
+            playwright_page=None,
+            cookie_dict={"a1": "test"},
+        )
+        request = httpx.Request("GET", "https://edith.xiaohongshu.com/api/sns/web/v1/feed")
+        for status_code, error_type in ((461, IPBlockError), (401, AuthExpiredError)):
+            # 验证码已经在 send_request 中按封禁上报，签名失效时用同一组请求头重试不会成功，都只请求一次
+            send_request = AsyncMock(return_value=httpx.Response(status_code, request=request))
+            with patch.object(client, "send_request", send_request):
+                with self.assertRaises(error_type):
+                    await client.request("GET", str(request.url))
+            self.assertEqual(send_request.await_count, 1)
+
+    async def test_xhs_error_status_classified(self):
+        client = XiaoHongShuClient(
+            headers={"User-Agent": "test", "Cookie": "a1=test"},
+            playwright_page=None,
+            cookie_dict={"a1": "test"},
+        )
+        request = httpx.Request("GET", "https://edith.xiaohongshu.com/api/sns/web/v1/feed")
+        for status_code, error_type, attempts in ((404, httpx.HTTPStatusError, 1), (429, RetryError, 2), (500, RetryError, 3)):
+            send_request = AsyncMock(return_value=httpx.Response(status_code, request=request))
+            with patch.object(client, "send_request", send_request):
+                with self.assertRaises(error_type):
+                    await client.request("GET", str(request.url))
+            self.assertEqual(send_request.await_count, attempts)
+
+
+if __name__ == '__main__':
+    unittest.main()
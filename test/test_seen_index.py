@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_seen_index.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import config
+from tools import seen_index
+from tools.async_file_writer import AsyncFileWriter
+from tools.jsonl_writer import close_jsonl_writers
+from media_platform.xhs import XiaoHongShuCrawler
+from store import close_stores
+from tools.seen_index import SEEN_KIND_COMMENT, SEEN_KIND_CONTENT, BloomFilter, SeenIndex
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negative(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"note-{i}")
+        self.assertTrue(all(f"note-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestSeenIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "seen_index.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_kinds_are_independent(self):
+        index = SeenIndex(self.db_path, bloom_capacity=100)
+        index.add(SEEN_KIND_CONTENT, "a")
+        index.add_many(SEEN_KIND_COMMENT, ["b", 123])
+        self.assertTrue(index.contains(SEEN_KIND_CONTENT, "a"))
+        self.assertFalse(index.contains(SEEN_KIND_COMMENT, "a"))
+        self.assertTrue(index.contains(SEEN_KIND_COMMENT, "123"))
+        self.assertEqual(index.filter_unseen(SEEN_KIND_COMMENT, ["a", "b", 123, "c"]), ["a", "c"])
+        index.close()
+
+    def test_persist_across_runs(self):
+        index = SeenIndex(self.db_path, bloom_capacity=100)
+        index.add(SEEN_KIND_CONTENT, "a")
+        index.close()
+
+        index = SeenIndex(self.db_path, bloom_capacity=100)
+        self.assertTrue(index.contains(SEEN_KIND_CONTENT, "a"))
+        self.assertFalse(index.contains(SEEN_KIND_CONTENT, "b"))
+        index.close()
+
+    def test_import_once(self):
+        index = SeenIndex(self.db_path)
+        self.assertTrue(index.import_once("contents.json", SEEN_KIND_CONTENT, lambda: ["a", "b"]))
+        self.assertFalse(index.import_once("contents.json", SEEN_KIND_CONTENT, lambda: self.fail("should not load")))
+        self.assertEqual(index.filter_unseen(SEEN_KIND_CONTENT, ["a", "b", "c"]), ["c"])
+        index.close()
+
+
+class TestSeenIndexHelpers(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+
+    def tearDown(self):
+        seen_index.close_seen_indexes()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_mark_and_filter(self):
+        seen_index.mark_seen("bili", SEEN_KIND_CONTENT, 1001, "BV1xx")
+        self.assertTrue(seen_index.is_seen("bili", SEEN_KIND_CONTENT, "BV1xx"))
+        self.assertEqual(seen_index.filter_unseen("bili", SEEN_KIND_CONTENT, [1001, 1002]), [1002])
+        self.assertTrue(os.path.exists("data/bili/seen_index.db"))
+
+    @patch.object(config, "ENABLE_SEEN_INDEX", False)
+    def test_disabled(self):
+        seen_index.mark_seen("bili", SEEN_KIND_CONTENT, 1001)
+        self.assertFalse(seen_index.is_seen("bili", SEEN_KIND_CONTENT, 1001))
+        self.assertEqual(seen_index.filter_unseen("bili", SEEN_KIND_CONTENT, [1001]), [1001])
+        self.assertFalse(os.path.exists("data"))
+
+
+
+class TestCommentCompletion(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+
+    async def asyncTearDown(self):
+        await close_stores()
+        await close_jsonl_writers()
+
+    def tearDown(self):
+        seen_index.close_seen_indexes()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    async def test_import_legacy_contents_by_platform_id_field(self):
+        json_path = AsyncFileWriter("douyin", "search", content_id_field="aweme_id")._get_file_path("json", "contents")
+        await close_jsonl_writers()
+        seen_index.close_seen_indexes()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump([{"aweme_id": "7001", "title": "旧视频"}], f)
+
+        # 抖音的视频ID字段是 aweme_id，旧数据按该字段导入已爬取索引
+        AsyncFileWriter("douyin", "search", content_id_field="aweme_id")
+        self.assertTrue(seen_index.is_seen("douyin", SEEN_KIND_CONTENT, "7001"))
+
+    async def test_mark_done_after_pagination_finished(self):
+        crawler = XiaoHongShuCrawler()
+        crawler.xhs_client = AsyncMock()
+        await crawler.get_comments("note-1", "token", asyncio.Semaphore(1))
+        # 写入队列写完之前投递的数据后才记录
+        await close_stores()
+        self.assertTrue(seen_index.is_seen("xhs", SEEN_KIND_COMMENT, "note-1"))
+
+    @patch.object(config, "SAVE_DATA_OPTION", "json")
+    async def test_partial_comments_not_done(self):
+        async def get_note_all_comments(note_id, callback, **kwargs):
+            # 第一页评论保存后请求被拦截
+            await callback(note_id, [{"id": "comment-1", "content": "first page"}])
+            raise RuntimeError("blocked")
+
+        crawler = XiaoHongShuCrawler()
+        crawler.xhs_client = AsyncMock()
+        crawler.xhs_client.get_note_all_comments.side_effect = get_note_all_comments
+        with self.assertRaises(RuntimeError):
+            await crawler.get_comments("note-1", "token", asyncio.Semaphore(1))
+        await close_stores()
+        self.assertFalse(seen_index.is_seen("xhs", SEEN_KIND_COMMENT, "note-1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
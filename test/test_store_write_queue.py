@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/test/test_store_write_queue.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import config
+from base.base_crawler import AbstractStore
+from store import close_stores
+from store.douyin import DouyinStoreFactory
+from tools.seen_index import SEEN_KIND_COMMENT
+from tools.store_write_queue import SeenMark, StoreWriteQueue, WriteBehindStore
+
+
+class RecordingStore(AbstractStore):
+    def __init__(self):
+        self.batches = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.fail_times = 0
+
+    async def store_content(self, content_item):
+        pass
+
+    async def store_comment(self, comment_item):
+        pass
+
+    async def store_creator(self, creator):
+        pass
+
+    async def store_contents(self, content_items):
+        await self.release.wait()
+        self.batches.append(("contents", content_items))
+
+    async def store_comments(self, comment_items):
+        await self.release.wait()
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append(("comments", comment_items))
+
+    async def store_contact(self, contact_item):
+        return contact_item
+
+
+class TestStoreWriteQueue(IsolatedAsyncioTestCase):
+
+    async def test_group_batches_by_item_type(self):
+        store = RecordingStore()
+        store.release.clear()
+        write_queue = StoreWriteQueue(max_size=100, batch_size=10)
+        await write_queue.put("xhs", "contents", store, {"note_id": "0"})
+        # 等待写入任务取走第一条数据并阻塞在写入上，之后投递的数据在下一批一起写入
+        await asyncio.sleep(0)
+        for i in range(1, 4):
+            await write_queue.put("xhs", "contents", store, {"note_id": str(i)})
+            await write_queue.put("xhs", "comments", store, {"comment_id": str(i)})
+        store.release.set()
+        await write_queue.drain()
+
+        self.assertEqual(store.batches[0], ("contents", [{"note_id": "0"}]))
+        self.assertEqual(store.batches[1], ("contents", [{"note_id": str(i)} for i in range(1, 4)]))
+        self.assertEqual(store.batches[2], ("comments", [{"comment_id": str(i)} for i in range(1, 4)]))
+        self.assertEqual(write_queue.written_count, 7)
+
+    async def test_put_blocks_when_queue_full(self):
+        store = RecordingStore()
+        store.release.clear()
+        write_queue = StoreWriteQueue(max_size=1, batch_size=10)
+        await write_queue.put("xhs", "contents", store, {"note_id": "0"})
+        await asyncio.sleep(0)
+        await write_queue.put("xhs", "contents", store, {"note_id": "1"})
+        blocked_put = asyncio.create_task(write_queue.put("xhs", "contents", store, {"note_id": "2"}))
+        await asyncio.sleep(0.01)
+        self.assertFalse(blocked_put.done())
+
+        store.release.set()
+        await blocked_put
+        await write_queue.drain()
+        self.assertEqual(sum(len(items) for _, items in store.batches), 3)
+
+    @patch.object(config, "STORE_WRITE_RETRY_WAIT_SEC", 0)
+    async def test_mark_seen_only_after_written(self):
+        store = RecordingStore()
+        write_queue = StoreWriteQueue(max_size=100, batch_size=10)
+        with patch("tools.store_write_queue.mark_seen") as mark_seen:
+            # 第一次写入失败，重试后成功才记录
+            store.fail_times = 1
+            await write_queue.put("xhs", "comments", store, {"comment_id": "1"}, SeenMark("xhs", None, ("note-1",)))
+            await write_queue.put_seen_marker(SeenMark("xhs", SEEN_KIND_COMMENT, ("note-1",)))
+            await write_queue.drain()
+            # 评论本身不记录索引，分页完成标记在评论写入后记录
+            mark_seen.assert_called_once_with("xhs", SEEN_KIND_COMMENT, "note-1")
+
+            # 重试次数用完仍然失败时不记录，之后的完成标记也不记录
+            mark_seen.reset_mock()
+            store.fail_times = config.STORE_WRITE_MAX_RETRIES + 1
+            await write_queue.put("xhs", "comments", store, {"comment_id": "2"}, SeenMark("xhs", None, ("note-2",)))
+            await write_queue.put_seen_marker(SeenMark("xhs", SEEN_KIND_COMMENT, ("note-2",)))
+            await write_queue.drain()
+            mark_seen.assert_not_called()
+        self.assertEqual(write_queue.failed_count, 1)
+
+    async def test_write_behind_store(self):
+        store = RecordingStore()
+        write_behind_store = WriteBehindStore("bili", store)
+        self.assertEqual(await write_behind_store.store_contact({"up_id": 1}), {"up_id": 1})
+
+
+class TestStoreLifecycle(IsolatedAsyncioTestCase):
+
+    @patch.object(config, "SAVE_DATA_OPTION", "db")
+    async def test_one_store_per_run(self):
+        store = DouyinStoreFactory.create_store()
+        self.assertIs(DouyinStoreFactory.create_store(), store)
+
+        with patch.object(store, "flush", AsyncMock()) as flush, patch.object(store, "close", AsyncMock()) as close:
+            await close_stores()
+        flush.assert_awaited_once()
+        close.assert_awaited_once()
+        self.assertIsNot(DouyinStoreFactory.create_store(), store)
+        await close_stores()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,3 +28,12 @@ def test_convert_cookies():
     cookie_dict = utils.convert_str_cookie_to_dict(xhs_cookies)
     assert cookie_dict.get("webId") == "1190c4d3cxxxx125xxx"
     assert cookie_dict.get("a1") == "x000101360"
+
+
+def test_parse_count():
+    assert utils.parse_count("1.2万") == 12000
+    assert utils.parse_count("10万+") == 100000
+    assert utils.parse_count("1,234") == 1234
+    assert utils.parse_count(56) == 56
+    assert utils.parse_count("赞") is None
+    assert utils.parse_count(None) is None
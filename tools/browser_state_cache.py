@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/browser_state_cache.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 请求签名所需浏览器状态（localStorage 等）的快照缓存，避免每次签名都和浏览器做一次 IPC 往返
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import config
+
+
+class BrowserStateCache:
+    """
+    缓存 loader 的返回值，过期、调用 invalidate（更新cookies后、签名相关错误后）时才重新加载
+    并发请求同时遇到缓存失效时只会加载一次
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None):
+        """
+        Args:
+            loader: 从浏览器读取状态的异步函数，抛出异常时不缓存
+            ttl: 快照有效期（秒），默认取 BROWSER_STATE_CACHE_TTL，0 表示不缓存
+        """
+        self._loader = loader
+        self.ttl = config.BROWSER_STATE_CACHE_TTL if ttl is None else ttl
+        self._value: Any = None
+        self._expire_at: float = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _is_valid(self) -> bool:
+        return self._value is not None and time.monotonic() < self._expire_at
+
+    async def get(self) -> Any:
+        """
+        获取状态快照
+        Returns:
+
+        """
+        if self._is_valid():
+            return self._value
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._is_valid():
+                self._value = await self._loader()
+                self._expire_at = time.monotonic() + self.ttl
+        return self._value
+
+    def invalidate(self) -> None:
+        """
+        使快照失效，下次 get 时重新从浏览器读取
+        Returns:
+
+        """
+        self._value = None
+        self._expire_at = 0
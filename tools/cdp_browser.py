@@ -22,7 +22,6 @@ import os
 import asyncio
 import socket
 import httpx
-import signal
 import atexit
 from typing import Optional, Dict, Any
 from playwright.async_api import Browser, BrowserContext, Playwright
@@ -60,20 +59,8 @@ class CDPBrowserManager:
         # 注册atexit清理
         atexit.register(sync_cleanup)
 
-        # 注册信号处理器
-        def signal_handler(signum, frame):
-            """信号处理器"""
-            utils.logger.info(f"[CDPBrowserManager] 收到信号 {signum}，清理浏览器进程")
-            if self.launcher and self.launcher.browser_process:
-                self.launcher.cleanup()
-            # 重新引发KeyboardInterrupt以便正常退出流程
-            if signum == signal.SIGINT:
-                raise KeyboardInterrupt
-
-        # 注册SIGINT (Ctrl+C) 和 SIGTERM
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-
+        # 不在这里注册信号处理器：main.py 收到 SIGINT/SIGTERM 时取消主任务，
+        # 由 async_cleanup 在事件循环中关闭浏览器，覆盖信号处理器会打断写入剩余数据
         self._cleanup_registered = True
         utils.logger.info("[CDPBrowserManager] 清理处理器已注册")
 
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/circuit_breaker.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 协作式熔断器，疑似被封禁时让受影响的请求异步等待，并且只刷新一次会话
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from tools import utils
+
+
+class CircuitBreaker:
+    """
+    协作式熔断器：trip 之后熔断 cooldown_sec 秒，期间调用 wait_closed 的协程异步等待，不阻塞事件循环
+    熔断期结束后执行一次恢复回调（例如刷新 cookie），完成后恢复放行；熔断期间多次 trip 只会触发一次恢复
+    """
+
+    def __init__(self, name: str, cooldown_sec: float, on_recover: Optional[Callable[[], Awaitable[None]]] = None):
+        self.name = name
+        self.cooldown_sec = cooldown_sec
+        self.on_recover = on_recover
+        self.trip_count = 0
+        self._closed: Optional[asyncio.Event] = None
+        self._recover_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._recover_task is not None and not self._recover_task.done()
+
+    def trip(self, reason: str = "") -> None:
+        """
+        熔断，已经处于熔断状态时忽略
+        Args:
+            reason: 熔断原因，用于日志
+
+        Returns:
+
+        """
+        if self.is_open:
+            return
+        self.trip_count += 1
+        utils.logger.warning(f"[CircuitBreaker] {self.name} open for {self.cooldown_sec}s, reason: {reason}")
+        self._closed = asyncio.Event()
+        self._recover_task = asyncio.create_task(self._recover(self._closed))
+
+    async def _recover(self, closed: asyncio.Event) -> None:
+        try:
+            await asyncio.sleep(self.cooldown_sec)
+            if self.on_recover:
+                await self.on_recover()
+        except Exception as e:
+            utils.logger.error(f"[CircuitBreaker] {self.name} recover failed: {e}")
+        finally:
+            closed.set()
+            utils.logger.info(f"[CircuitBreaker] {self.name} closed")
+
+    async def wait_closed(self) -> None:
+        """
+        熔断期间等待恢复，未熔断时直接返回
+        Returns:
+
+        """
+        if self.is_open:
+            await self._closed.wait()
+
+    async def close(self) -> None:
+        """
+        取消还在进行的恢复任务
+        Returns:
+
+        """
+        if self.is_open:
+            self._recover_task.cancel()
+            await asyncio.gather(self._recover_task, return_exceptions=True)
@@ -174,6 +174,33 @@ def match_interact_info_count(count_str: str) -> int:
         return 0
 
 
+# 计数单位对应的倍数
+COUNT_UNITS = {"": 1, "k": 1000, "千": 1000, "w": 10000, "万": 10000, "亿": 100000000}
+
+
+def parse_count(count) -> Optional[int]:
+    """
+    把平台返回的互动计数转换为整数，支持 1234、"1234"、"1,234"、"1.2万"、"3.5w"、"1.1亿"、"10万+" 等格式
+    Args:
+        count: 原始计数
+
+    Returns:
+        整数计数，为空或无法解析（例如小红书点赞数为0时返回的 "赞"）时返回None
+    """
+    if count is None:
+        return None
+    if isinstance(count, (int, float)):
+        return int(count)
+    count_str = str(count).strip().replace(",", "").rstrip("+")
+    if count_str.isdigit():
+        return int(count_str)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kKwW千万亿]?)", count_str)
+    if not match:
+        return None
+    number, unit = match.groups()
+    return int(round(float(number) * COUNT_UNITS[unit.lower()]))
+
+
 def format_proxy_info(ip_proxy_info) -> Tuple[Optional[Dict], Optional[str]]:
     """format proxy info for playwright and httpx"""
     # fix circular import issue
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/csv_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 带缓冲的 CSV 写入，每个文件保持一个打开的句柄，数据攒批后一次写入
+
+import asyncio
+import csv
+import io
+import os
+import time
+from typing import Dict, List, Optional
+
+import config
+from tools import utils
+
+CSV_ENCODING = "utf-8-sig"
+
+
+class BufferedCsvWriter:
+    """
+    单个 CSV 文件的缓冲写入器，同一个文件在进程内只有一个实例（见 get_csv_writer）
+    行数或时间达到阈值时批量写入；出现新字段时用所有字段的并集重写表头
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.fieldnames: List[str] = self._read_header()
+        # 磁盘上文件的表头，和 fieldnames 不一致时需要重写文件
+        self._header_on_disk: List[str] = list(self.fieldnames)
+        self._buffer: List[Dict] = []
+        self._file = None
+        self._lock = asyncio.Lock()
+        self._last_flush_at = time.monotonic()
+
+    def _read_header(self) -> List[str]:
+        if not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0:
+            return []
+        with open(self.file_path, "r", newline="", encoding=CSV_ENCODING) as f:
+            return next(csv.reader(f), [])
+
+    async def append(self, item: Dict) -> None:
+        """
+        写入一行数据到缓冲区，达到阈值时落盘
+        Args:
+            item: 一行数据
+
+        Returns:
+
+        """
+        async with self._lock:
+            for key in item.keys():
+                if key not in self.fieldnames:
+                    self.fieldnames.append(key)
+            self._buffer.append(item)
+            if (len(self._buffer) >= config.CSV_FLUSH_ROWS
+                    or time.monotonic() - self._last_flush_at >= config.CSV_FLUSH_INTERVAL_SEC):
+                await self._flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        self._last_flush_at = time.monotonic()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._write_rows, rows)
+
+    def _write_rows(self, rows: List[Dict]) -> None:
+        if self._header_on_disk and self._header_on_disk != self.fieldnames:
+            self._rewrite_with_new_header(rows)
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames)
+        if not self._header_on_disk:
+            writer.writeheader()
+            self._header_on_disk = list(self.fieldnames)
+        writer.writerows(rows)
+        if self._file is None:
+            self._file = open(self.file_path, "a", newline="", encoding=CSV_ENCODING)
+        self._file.write(buffer.getvalue())
+        self._file.flush()
+
+    def _rewrite_with_new_header(self, rows: List[Dict]) -> None:
+        """
+        出现新字段时，用字段并集作为表头重写整个文件，旧数据缺少的字段留空
+        Args:
+            rows: 本次要写入的数据
+
+        Returns:
+
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        temp_path = f"{self.file_path}.tmp"
+        with open(self.file_path, "r", newline="", encoding=CSV_ENCODING) as src, \
+                open(temp_path, "w", newline="", encoding=CSV_ENCODING) as dest:
+            writer = csv.DictWriter(dest, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(csv.DictReader(src))
+            writer.writerows(rows)
+        os.replace(temp_path, self.file_path)
+        utils.logger.info(f"[BufferedCsvWriter] Rewrote {self.file_path} with new header: {self.fieldnames}")
+        self._header_on_disk = list(self.fieldnames)
+
+    async def close(self) -> None:
+        """
+        写入缓冲区中剩余的数据并关闭文件
+        Returns:
+
+        """
+        async with self._lock:
+            await self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_csv_writers: Dict[str, BufferedCsvWriter] = {}
+
+
+def get_csv_writer(file_path: str) -> BufferedCsvWriter:
+    """
+    获取 CSV 文件对应的缓冲写入器，同一个文件全局共用一个实例
+    Args:
+        file_path: CSV 文件路径
+
+    Returns:
+
+    """
+    if file_path not in _csv_writers:
+        _csv_writers[file_path] = BufferedCsvWriter(file_path)
+    return _csv_writers[file_path]
+
+
+async def close_csv_writers() -> None:
+    """
+    写入所有缓冲的数据并关闭文件，运行结束时调用
+    Returns:
+
+    """
+    for writer in list(_csv_writers.values()):
+        try:
+            await writer.close()
+        except Exception as e:
+            utils.logger.error(f"[close_csv_writers] close {writer.file_path} error: {e}")
+    _csv_writers.clear()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/http_client.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 可复用的 HTTP 连接池客户端与接口耗时统计
+
+import re
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+import config
+from tools import utils
+
+# 路径中包含数字的较长片段（笔记ID、用户ID等）统一归并，避免每个ID都成为一个独立的统计项
+_ID_SEGMENT_PATTERN = re.compile(r"^(?=.*\d)[\w\-.]{8,}$")
+
+
+def is_http2_available() -> bool:
+    """
+    检查是否安装了 HTTP/2 所需的 h2 依赖
+    Returns:
+
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_brotli_available() -> bool:
+    """
+    检查是否安装了解压 br 编码响应所需的 brotli 依赖
+    Returns:
+
+    """
+    for module_name in ("brotli", "brotlicffi"):
+        try:
+            __import__(module_name)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def create_async_http_client(proxy: Optional[str] = None, timeout: float = 10, **kwargs) -> httpx.AsyncClient:
+    """
+    创建带连接池的 httpx 异步客户端，连接会在多次请求之间保持 keep-alive 复用
+    httpx 默认会携带 Accept-Encoding 请求头并自动解压 gzip/deflate 响应
+    Args:
+        proxy: 代理地址
+        timeout: 默认超时时间
+        **kwargs: 其他传给 httpx.AsyncClient 的参数
+
+    Returns:
+
+    """
+    http2 = config.ENABLE_HTTP2
+    if http2 and not is_http2_available():
+        utils.logger.warning(
+            "[create_async_http_client] ENABLE_HTTP2 is True but h2 is not installed, "
+            "fallback to HTTP/1.1, you can install it by: pip install 'httpx[http2]'"
+        )
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=config.HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_POOL_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(proxy=proxy, timeout=timeout, limits=limits, http2=http2, **kwargs)
+
+
+def build_request_headers(base_headers: Mapping[str, str], extra_headers: Mapping[str, str]) -> Mapping[str, str]:
+    """
+    基于客户端的公共请求头生成单次请求专用的只读请求头，签名等每次请求都不同的字段放在 extra_headers
+    不修改客户端共享的请求头，并发请求之间不会串用彼此的签名
+    Args:
+        base_headers: 客户端的公共请求头
+        extra_headers: 本次请求专用的请求头
+
+    Returns:
+
+    """
+    return MappingProxyType({**base_headers, **extra_headers})
+
+
+class RequestLatencyStats:
+    """按接口统计请求耗时，用于对比开启/关闭连接池前后的请求延迟"""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+
+    @staticmethod
+    def endpoint_key(method: str, url: str) -> str:
+        """
+        生成接口的统计key，形如: GET edith.xiaohongshu.com/api/sns/web/v1/feed
+        Args:
+            method: 请求方法
+            url: 请求地址
+
+        Returns:
+
+        """
+        parsed = urlparse(str(url))
+        segments = [":id" if _ID_SEGMENT_PATTERN.match(segment) else segment for segment in parsed.path.split("/")]
+        return f"{method.upper()} {parsed.netloc}{'/'.join(segments)}"
+
+    def record(self, method: str, url: str, elapsed: float) -> None:
+        """
+        记录一次请求耗时
+        Args:
+            method: 请求方法
+            url: 请求地址
+            elapsed: 耗时，单位秒
+
+        Returns:
+
+        """
+        self._samples[self.endpoint_key(method, url)].append(elapsed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        汇总每个接口的请求次数、平均耗时、P50、P95（单位毫秒）
+        Returns:
+
+        """
+        result = {}
+        for endpoint, samples in self._samples.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+            result[endpoint] = {
+                "count": count,
+                "mean_ms": round(sum(ordered) / count * 1000, 2),
+                "p50_ms": round(ordered[int((count - 1) * 0.5)] * 1000, 2),
+                "p95_ms": round(ordered[int((count - 1) * 0.95)] * 1000, 2),
+            }
+        return result
+
+    def log_summary(self, prefix: str) -> None:
+        """
+        打印接口耗时统计
+        Args:
+            prefix: 日志前缀
+
+        Returns:
+
+        """
+        pool_label = "pooled" if config.ENABLE_HTTP_CONNECTION_POOL else "unpooled"
+        for endpoint, stats in self.summary().items():
+            utils.logger.info(
+                f"[{prefix}] latency ({pool_label}) {endpoint} count: {stats['count']}, "
+                f"mean: {stats['mean_ms']}ms, p50: {stats['p50_ms']}ms, p95: {stats['p95_ms']}ms"
+            )
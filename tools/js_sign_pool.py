@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/js_sign_pool.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 长驻的 JS 签名 worker 进程池，签名脚本只加载一次，通过管道收发签名请求
+#            execjs 使用 Node 运行时的时候每次 call 都会新起一个 node 进程，签名会成为请求速率的瓶颈
+
+import asyncio
+import json
+import shutil
+from typing import Any, Dict, Optional
+
+import execjs
+
+import config
+from tools import utils
+
+SIGN_WORKER_SCRIPT = "libs/sign_worker.js"
+
+
+class JsSignError(Exception):
+    """签名脚本执行出错"""
+
+
+class _JsSignWorker:
+    """一个常驻的 node 进程，同一时间只处理一个请求"""
+
+    def __init__(self, script_path: str):
+        self.script_path = script_path
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._request_id = 0
+
+    async def _ensure_process(self) -> asyncio.subprocess.Process:
+        if self._process is None or self._process.returncode is not None:
+            self._process = await asyncio.create_subprocess_exec(
+                "node", SIGN_WORKER_SCRIPT, self.script_path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+        return self._process
+
+    async def call(self, fn: str, *args) -> Any:
+        process = await self._ensure_process()
+        self._request_id += 1
+        request = {"id": self._request_id, "fn": fn, "args": list(args)}
+        try:
+            process.stdin.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            await process.stdin.drain()
+            line = await process.stdout.readline()
+            if not line:
+                raise JsSignError(f"sign worker for {self.script_path} exited, returncode: {process.returncode}")
+            response: Dict = json.loads(line)
+            if response.get("id") != self._request_id:
+                raise JsSignError(f"sign worker response id mismatch, expect {self._request_id}, got {response.get('id')}")
+        except BaseException:
+            # 请求中途出错或被取消时，管道里可能残留未读取的响应，直接重启该 worker
+            await self.close()
+            raise
+        if "error" in response:
+            raise JsSignError(response["error"])
+        return response.get("result")
+
+    async def close(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=3)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+class JsSignWorkerPool:
+    """
+    JS 签名 worker 进程池，worker 在第一次签名时才启动
+    本机没有安装 node 时退化为 execjs（在线程中执行，不阻塞事件循环）
+    """
+
+    def __init__(self, script_path: str, size: Optional[int] = None):
+        self.script_path = script_path
+        self.size = size or config.JS_SIGN_WORKER_POOL_SIZE
+        self._idle_workers: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._execjs_ctx = None
+        self.use_node_workers = config.ENABLE_JS_SIGN_WORKER_POOL and shutil.which("node") is not None
+
+    def _get_idle_workers(self) -> asyncio.Queue:
+        if self._idle_workers is None:
+            self._idle_workers = asyncio.Queue()
+            self._workers = [_JsSignWorker(self.script_path) for _ in range(self.size)]
+            for worker in self._workers:
+                self._idle_workers.put_nowait(worker)
+        return self._idle_workers
+
+    def _execjs_call(self, fn: str, *args) -> Any:
+        if self._execjs_ctx is None:
+            with open(self.script_path, encoding="utf-8-sig") as f:
+                self._execjs_ctx = execjs.compile(f.read())
+        return self._execjs_ctx.call(fn, *args)
+
+    async def call(self, fn: str, *args) -> Any:
+        """
+        调用签名脚本中的函数
+        Args:
+            fn: 函数名
+            *args: 函数参数，需要可以被 json 序列化
+
+        Returns:
+            函数返回值
+        """
+        if not self.use_node_workers:
+            return await asyncio.to_thread(self._execjs_call, fn, *args)
+
+        idle_workers = self._get_idle_workers()
+        worker: _JsSignWorker = await idle_workers.get()
+        try:
+            return await worker.call(fn, *args)
+        finally:
+            idle_workers.put_nowait(worker)
+
+    async def close(self) -> None:
+        """
+        关闭所有 worker 进程
+        Returns:
+
+        """
+        for worker in self._workers:
+            try:
+                await worker.close()
+            except Exception as e:
+                utils.logger.warning(f"[JsSignWorkerPool.close] close sign worker error: {e}")
+        self._workers = []
+        self._idle_workers = None
+
+
+_sign_pools: Dict[str, JsSignWorkerPool] = {}
+
+
+def get_js_sign_pool(script_path: str) -> JsSignWorkerPool:
+    """
+    获取签名脚本对应的 worker 池，同一个脚本全局共用一个池
+    Args:
+        script_path: 签名脚本路径
+
+    Returns:
+
+    """
+    if script_path not in _sign_pools:
+        _sign_pools[script_path] = JsSignWorkerPool(script_path)
+    return _sign_pools[script_path]
+
+
+async def close_js_sign_pools() -> None:
+    """
+    关闭所有签名 worker 池，需要在创建它们的事件循环中调用
+    Returns:
+
+    """
+    for pool in _sign_pools.values():
+        await pool.close()
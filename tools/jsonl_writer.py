@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/jsonl_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 只追加写的 JSONL 存储，每条数据一行，写入是 O(1) 的，运行结束时再导出为格式化的 JSON 数组
+
+import asyncio
+import json
+import os
+import textwrap
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import aiofiles
+
+import config
+from tools import utils
+from tools.seen_index import SeenIndex
+
+# ID索引中使用的 kind，每个数据文件有自己的索引库，只有这一种
+_ID_INDEX_KIND = "id"
+
+
+def get_jsonl_path(json_path: str) -> str:
+    """
+    导出的 JSON 文件对应的 jsonl 文件路径
+    Args:
+        json_path: 导出的 JSON 文件路径
+
+    Returns:
+
+    """
+    return f"{os.path.splitext(json_path)[0]}.jsonl"
+
+
+def iter_jsonl_items(jsonl_path: str) -> Iterator[Dict]:
+    """
+    逐行读取 jsonl 文件，跳过异常中断时可能残留的不完整行，只读文件，不打开ID索引
+    Args:
+        jsonl_path: jsonl 文件路径
+
+    Returns:
+
+    """
+    if not os.path.exists(jsonl_path):
+        return
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                utils.logger.warning(f"[JsonlAppendWriter] Skip broken line in {jsonl_path}")
+
+
+class JsonlAppendWriter:
+    """
+    单个数据文件的 JSONL 追加写入器，同一个文件在进程内只有一个实例（见 get_jsonl_writer）
+    数据写入 xxx.jsonl，已存在的 xxx.json 会在第一次打开时自动迁移为 jsonl
+    已写入的ID保存在 xxx.jsonl.ids.db 索引中（sqlite + 布隆过滤器），不会把全部ID读入内存
+    """
+
+    def __init__(self, json_path: str, id_field: str):
+        """
+        Args:
+            json_path: 导出的 JSON 文件路径，jsonl 文件与其同名、后缀为 .jsonl
+            id_field: 用于去重的ID字段名
+        """
+        self.json_path = json_path
+        self.jsonl_path = get_jsonl_path(json_path)
+        self.id_field = id_field
+        self.id_index_path = f"{self.jsonl_path}.ids.db"
+        self._id_index: Optional[SeenIndex] = None
+        self.item_count = 0
+        self._file = None
+        self._lock = asyncio.Lock()
+        self._last_fsync_at = time.monotonic()
+        self._dirty = False
+        self._migrate_json_file()
+        # 还没有数据的文件在第一次写入时再创建索引
+        if self.has_items():
+            self._open_id_index()
+
+    def _migrate_json_file(self) -> None:
+        """
+        把旧版本写入的 JSON 数组文件转换为 jsonl，只在 jsonl 文件还不存在时执行
+        Returns:
+
+        """
+        if os.path.exists(self.jsonl_path) or not os.path.exists(self.json_path) or os.path.getsize(self.json_path) == 0:
+            return
+        try:
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            utils.logger.warning(f"[JsonlAppendWriter] Skip migrating invalid json file {self.json_path}: {e}")
+            return
+        if not isinstance(data, list):
+            data = [data]
+        temp_path = f"{self.jsonl_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for item in data:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.jsonl_path)
+        utils.logger.info(f"[JsonlAppendWriter] Migrated {len(data)} items from {self.json_path} to {self.jsonl_path}")
+
+    def iter_items(self) -> Iterator[Dict]:
+        """
+        逐行读取已写入的数据，跳过异常中断时可能残留的不完整行
+        Returns:
+
+        """
+        return iter_jsonl_items(self.jsonl_path)
+
+    def iter_ids(self) -> Iterator[Any]:
+        """
+        逐行读取已写入数据的ID
+        Returns:
+
+        """
+        for item in self.iter_items():
+            item_id = item.get(self.id_field) if isinstance(item, dict) else None
+            if item_id is not None:
+                yield item_id
+
+    def has_items(self) -> bool:
+        return os.path.exists(self.jsonl_path) and os.path.getsize(self.jsonl_path) > 0
+
+    def _open_id_index(self) -> None:
+        """
+        打开ID索引，jsonl 文件已被删除时同时删除旧索引，索引不存在时从 jsonl 文件流式导入一次
+        Returns:
+
+        """
+        if not self.has_items():
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(f"{self.id_index_path}{suffix}"):
+                    os.remove(f"{self.id_index_path}{suffix}")
+        self._id_index = SeenIndex(
+            self.id_index_path,
+            bloom_capacity=config.SEEN_INDEX_BLOOM_CAPACITY,
+            bloom_error_rate=config.SEEN_INDEX_BLOOM_ERROR_RATE,
+        )
+        if self.has_items() and self._id_index.import_once(self.jsonl_path, _ID_INDEX_KIND, self.iter_ids):
+            utils.logger.info(f"[JsonlAppendWriter] Built ID index for {self.jsonl_path}")
+        self.item_count = self._id_index.count(_ID_INDEX_KIND)
+
+    async def append(self, item: Dict) -> bool:
+        """
+        追加一条数据，ID已存在时跳过
+        Args:
+            item: 数据
+
+        Returns:
+            是否写入
+        """
+        item_id = item.get(self.id_field)
+        line = json.dumps(item, ensure_ascii=False) + "\n"
+        async with self._lock:
+            if self._id_index is None:
+                self._open_id_index()
+            if item_id is not None and self._id_index.contains(_ID_INDEX_KIND, item_id):
+                return False
+            if self._file is None:
+                self._file = await aiofiles.open(self.jsonl_path, "a", encoding="utf-8")
+            await self._file.write(line)
+            await self._file.flush()
+            self._dirty = True
+            # 先写数据再记录ID，中途退出时最多重复写入一条，不会丢数据
+            if item_id is not None:
+                self._id_index.add(_ID_INDEX_KIND, item_id)
+            self.item_count += 1
+            if time.monotonic() - self._last_fsync_at >= config.JSONL_FSYNC_INTERVAL_SEC:
+                await self._fsync()
+        return True
+
+    async def _fsync(self) -> None:
+        if self._file is not None and self._dirty:
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+            self._dirty = False
+        self._last_fsync_at = time.monotonic()
+
+    def _export_json(self) -> int:
+        temp_path = f"{self.json_path}.tmp"
+        count = 0
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for item in self.iter_items():
+                f.write(",\n" if count else "\n")
+                # 与 json.dumps(list, indent=4) 的格式保持一致
+                f.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=4), "    "))
+                count += 1
+            f.write("\n]" if count else "]")
+        os.replace(temp_path, self.json_path)
+        return count
+
+    async def close(self, export_json: bool = True) -> None:
+        """
+        落盘并关闭文件，可选导出为格式化的 JSON 数组文件
+        Args:
+            export_json: 是否导出 JSON 文件
+
+        Returns:
+
+        """
+        async with self._lock:
+            if self._file is not None:
+                await self._fsync()
+                await self._file.close()
+                self._file = None
+            if self._id_index is not None:
+                self._id_index.close()
+                self._id_index = None
+            if export_json and os.path.exists(self.jsonl_path):
+                count = await asyncio.to_thread(self._export_json)
+                utils.logger.info(f"[JsonlAppendWriter] Exported {count} items to {self.json_path}")
+
+
+_jsonl_writers: Dict[str, JsonlAppendWriter] = {}
+
+
+def get_jsonl_writer(json_path: str, id_field: str) -> JsonlAppendWriter:
+    """
+    获取数据文件对应的 JSONL 写入器，同一个文件全局共用一个实例
+    Args:
+        json_path: 导出的 JSON 文件路径
+        id_field: 用于去重的ID字段名
+
+    Returns:
+
+    """
+    if json_path not in _jsonl_writers:
+        _jsonl_writers[json_path] = JsonlAppendWriter(json_path, id_field)
+    return _jsonl_writers[json_path]
+
+
+async def close_jsonl_writers(export_json: Optional[bool] = None) -> None:
+    """
+    关闭所有 JSONL 写入器，运行结束时调用
+    Args:
+        export_json: 是否导出 JSON 文件，默认取 ENABLE_JSONL_EXPORT_JSON
+
+    Returns:
+
+    """
+    if export_json is None:
+        export_json = config.ENABLE_JSONL_EXPORT_JSON
+    for writer in list(_jsonl_writers.values()):
+        try:
+            await writer.close(export_json=export_json)
+        except Exception as e:
+            utils.logger.error(f"[close_jsonl_writers] close {writer.jsonl_path} error: {e}")
+    _jsonl_writers.clear()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/media_blob_store.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按内容哈希存储媒体文件，跨帖子去重，并记录 url -> 内容哈希 的索引，已下载过的url无需重复下载
+
+import hashlib
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+_HASH_READ_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    计算文件内容的 sha256，分块读取，不会把大视频整个读入内存
+    Args:
+        file_path: 文件路径
+
+    Returns:
+
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_READ_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class MediaBlobStore:
+    """
+    内容寻址的媒体文件存储，相同内容只在 blob_dir 下保存一份
+    帖子目录下的文件是指向 blob 的硬链接（文件系统不支持硬链接时退化为复制）
+    方法都是同步的文件和 sqlite 操作，在事件循环中请通过 asyncio.to_thread 调用，可以在多个线程中并发调用
+    """
+
+    def __init__(self, blob_dir: str):
+        self.blob_dir = blob_dir
+        pathlib.Path(self.blob_dir).mkdir(parents=True, exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(os.path.join(self.blob_dir, "url_index.db"), check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS url_index (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+            self._conn.commit()
+        return self._conn
+
+    def get_blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], content_hash)
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        """
+        查询url对应的内容哈希，blob文件已被删除时视为未下载
+        Args:
+            url: 媒体文件地址
+
+        Returns:
+            内容哈希，未下载过返回None
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT sha256 FROM url_index WHERE url = ?", (url,)).fetchone()
+        if row and os.path.exists(self.get_blob_path(row[0])):
+            return row[0]
+        return None
+
+    def add_file(self, file_path: str, url: str, content_hash: str) -> None:
+        """
+        把下载完成的文件移动到 blob 目录，内容已存在时直接删除该文件，并记录url索引
+        Args:
+            file_path: 已下载完成的文件路径
+            url: 媒体文件地址
+            content_hash: 文件内容的 sha256
+
+        Returns:
+
+        """
+        blob_path = self.get_blob_path(content_hash)
+        if os.path.exists(blob_path):
+            os.remove(file_path)
+        else:
+            pathlib.Path(os.path.dirname(blob_path)).mkdir(parents=True, exist_ok=True)
+            os.replace(file_path, blob_path)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO url_index (url, sha256) VALUES (?, ?)", (url, content_hash))
+            self.conn.commit()
+
+    def link_to(self, content_hash: str, dest_path: str) -> None:
+        """
+        在 dest_path 创建指向 blob 的硬链接
+        Args:
+            content_hash: 内容哈希
+            dest_path: 目标路径
+
+        Returns:
+
+        """
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)
+        blob_path = self.get_blob_path(content_hash)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError:
+            shutil.copyfile(blob_path, dest_path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_blob_stores: Dict[str, MediaBlobStore] = {}
+
+
+def get_media_blob_store(platform: str) -> MediaBlobStore:
+    """
+    获取平台的媒体 blob 存储，保存在 data/{platform}/blobs 目录下
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    if platform not in _blob_stores:
+        _blob_stores[platform] = MediaBlobStore(f"data/{platform}/blobs")
+    return _blob_stores[platform]
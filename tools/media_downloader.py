@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/media_downloader.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 媒体文件流式下载，边下载边写入临时文件，支持断点续传
+
+import asyncio
+import hashlib
+import os
+import pathlib
+import shutil
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import aiofiles
+import httpx
+from tenacity import RetryCallState, RetryError, retry, retry_if_exception, stop_after_attempt, wait_fixed
+
+import config
+from tools import utils
+from tools.retry_policy import ERROR_THROTTLED, ERROR_TRANSIENT, classify_error
+
+
+class RangeNotSupportedError(Exception):
+    """分段下载时服务端忽略了 Range 请求头，需要退化为单连接下载"""
+
+
+class BandwidthLimiter:
+    """令牌桶带宽限制，所有媒体下载共享，rate 为每秒允许的字节数，小于等于0表示不限制"""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, size: int) -> None:
+        """
+        消耗 size 个字节的令牌，令牌不足时等待
+        Args:
+            size: 本次写入的字节数
+
+        Returns:
+
+        """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.rate), self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= size
+            if self._tokens < 0:
+                # 欠下的令牌按速率补足后再放行，持有锁等待保证其他下载也一起被限速
+                await asyncio.sleep(-self._tokens / self.rate)
+
+
+_bandwidth_limiter: Optional[BandwidthLimiter] = None
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter:
+    global _bandwidth_limiter
+    if _bandwidth_limiter is None:
+        _bandwidth_limiter = BandwidthLimiter(config.MEDIA_DOWNLOAD_MAX_BYTES_PER_SEC)
+    return _bandwidth_limiter
+
+
+def get_download_temp_path(platform: str, url: str) -> str:
+    """
+    获取媒体文件下载的临时路径，同一个url的临时路径固定，重试时才能续传已下载的部分
+    Args:
+        platform: 平台名称
+        url: 媒体文件地址
+
+    Returns:
+
+    """
+    temp_dir = f"data/{platform}/.downloads"
+    pathlib.Path(temp_dir).mkdir(parents=True, exist_ok=True)
+    return f"{temp_dir}/{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+
+
+async def write_media_file(save_file_name: str, content: Union[bytes, str]) -> None:
+    """
+    保存媒体文件
+    Args:
+        save_file_name: 保存的文件路径
+        content: 文件内容，或者已经下载完成的本地文件路径（直接原子移动过去，不读入内存）
+
+    Returns:
+
+    """
+    if isinstance(content, (str, os.PathLike)):
+        os.replace(content, save_file_name)
+        return
+    async with aiofiles.open(save_file_name, 'wb') as f:
+        await f.write(content)
+
+
+def _is_retryable_download_error(exc: BaseException) -> bool:
+    """网络错误、文件读写错误、5xx 和 429 重试；其他 4xx（例如过期的媒体地址返回 403/404）重试也不会成功，直接失败"""
+    return isinstance(exc, (httpx.HTTPError, OSError)) and classify_error(exc) in (ERROR_TRANSIENT, ERROR_THROTTLED)
+
+
+def _stop_after_max_retries(retry_state: RetryCallState) -> bool:
+    # 每次重试时再读取配置，运行时修改 MEDIA_DOWNLOAD_MAX_RETRIES 也能生效
+    return stop_after_attempt(config.MEDIA_DOWNLOAD_MAX_RETRIES)(retry_state)
+
+
+@retry(
+    stop=_stop_after_max_retries,
+    wait=wait_fixed(1),
+    retry=retry_if_exception(_is_retryable_download_error),
+)
+async def _download_to_part_file(
+    http_client: httpx.AsyncClient,
+    url: str,
+    part_path: str,
+    headers: Optional[Dict[str, str]] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+    on_response: Optional[Callable[[httpx.Response], None]] = None,
+    on_transport_error: Optional[Callable[[httpx.TransportError], None]] = None,
+) -> None:
+    """
+    下载到 .part 文件，已存在的 .part 文件通过 HTTP Range 请求续传
+    Args:
+        http_client: httpx客户端
+        url: 媒体文件地址
+        part_path: 临时文件路径
+        headers: 请求头
+        start: 分段下载时该分段的起始字节
+        end: 分段下载时该分段的结束字节（包含），为None时下载到文件末尾
+        on_response: 收到响应头后的回调，调用方用来按状态码上报请求结果（例如被封禁时剔除代理）
+        on_transport_error: 连接失败、超时等网络错误的回调，调用方用来上报代理失败，响应状态码错误不会调用
+
+    Returns:
+
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    range_start = start + offset
+    if end is not None and range_start > end:
+        # 该分段已经下载完整
+        return
+    request_headers = dict(headers or {})
+    if range_start or end is not None:
+        request_headers["Range"] = f"bytes={range_start}-{'' if end is None else end}"
+
+    try:
+        async with http_client.stream("GET", url, headers=request_headers, follow_redirects=True) as response:
+            if on_response:
+                on_response(response)
+            if offset and end is None and response.status_code == 416:
+                # 上次已经完整下载，只是还没来得及重命名
+                return
+            response.raise_for_status()
+            if end is not None and response.status_code != 206:
+                raise RangeNotSupportedError(f"server ignored Range header for segment {start}-{end}")
+            # 服务端不支持 Range 时会返回 200 和完整内容，需要从头写
+            file_mode = "ab" if offset and response.status_code == 206 else "wb"
+            bandwidth_limiter = get_bandwidth_limiter()
+            async with aiofiles.open(part_path, file_mode) as f:
+                async for chunk in response.aiter_bytes(config.MEDIA_DOWNLOAD_CHUNK_SIZE):
+                    await bandwidth_limiter.consume(len(chunk))
+                    await f.write(chunk)
+    except httpx.TransportError as e:
+        if on_transport_error:
+            on_transport_error(e)
+        raise
+
+
+async def stream_download(
+    http_client: httpx.AsyncClient,
+    url: str,
+    save_path: str,
+    headers: Optional[Dict[str, str]] = None,
+    on_response: Optional[Callable[[httpx.Response], None]] = None,
+    on_transport_error: Optional[Callable[[httpx.TransportError], None]] = None,
+) -> bool:
+    """
+    流式下载媒体文件，分块写入 save_path.part，下载完成后原子重命名为 save_path
+    内存占用只和分块大小有关，和文件大小无关
+    Args:
+        http_client: httpx客户端
+        url: 媒体文件地址
+        save_path: 保存路径
+        headers: 请求头
+        on_response: 收到响应头后的回调，调用方用来按状态码上报请求结果（例如被封禁时剔除代理）
+        on_transport_error: 连接失败、超时等网络错误的回调，调用方用来上报代理失败，响应状态码错误不会调用
+
+    Returns:
+        是否下载成功
+    """
+    part_path = f"{save_path}.part"
+    try:
+        await _download_to_part_file(
+            http_client, url, part_path, headers, on_response=on_response, on_transport_error=on_transport_error
+        )
+    except (RetryError, httpx.HTTPError, OSError) as e:
+        exc = e.last_attempt.exception() if isinstance(e, RetryError) else e
+        utils.logger.error(f"[stream_download] download {url} failed: {exc.__class__.__name__} - {exc}")
+        return False
+    os.replace(part_path, save_path)
+    return True
+
+
+async def probe_content_length(
+    http_client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    on_response: Optional[Callable[[httpx.Response], None]] = None,
+    on_transport_error: Optional[Callable[[httpx.TransportError], None]] = None,
+) -> Optional[int]:
+    """
+    通过只请求第一个字节的 Range 请求探测文件大小，同时确认服务端支持 Range
+    Args:
+        http_client: httpx客户端
+        url: 媒体文件地址
+        headers: 请求头
+        on_response: 收到响应头后的回调，调用方用来按状态码上报请求结果（例如被封禁时剔除代理）
+        on_transport_error: 连接失败、超时等网络错误的回调，调用方用来上报代理失败，响应状态码错误不会调用
+
+    Returns:
+        文件总大小，服务端不支持 Range 或探测失败时返回None
+    """
+    request_headers = dict(headers or {})
+    request_headers["Range"] = "bytes=0-0"
+    try:
+        async with http_client.stream("GET", url, headers=request_headers, follow_redirects=True) as response:
+            if on_response:
+                on_response(response)
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code != 206 or "/" not in content_range:
+                return None
+            total_size = content_range.rsplit("/", 1)[-1]
+            return int(total_size) if total_size.isdigit() else None
+    except httpx.HTTPError as e:
+        if on_transport_error and isinstance(e, httpx.TransportError):
+            on_transport_error(e)
+        utils.logger.warning(f"[probe_content_length] probe {url} failed: {e}")
+        return None
+
+
+def split_segments(total_size: int, segment_size: int) -> List[Tuple[int, int]]:
+    """
+    把文件按 segment_size 切分为若干字节区间
+    Args:
+        total_size: 文件总大小
+        segment_size: 每个分段的大小
+
+    Returns:
+        [(start, end), ...]，end 包含在分段内
+    """
+    return [(start, min(start + segment_size, total_size) - 1) for start in range(0, total_size, segment_size)]
+
+
+def _merge_segment_files(segment_paths: List[str], part_path: str) -> None:
+    with open(part_path, "wb") as dest:
+        for segment_path in segment_paths:
+            with open(segment_path, "rb") as src:
+                shutil.copyfileobj(src, dest, config.MEDIA_DOWNLOAD_CHUNK_SIZE)
+    for segment_path in segment_paths:
+        os.remove(segment_path)
+
+
+async def segmented_download(
+    http_client: httpx.AsyncClient,
+    url: str,
+    save_path: str,
+    headers: Optional[Dict[str, str]] = None,
+    total_size: Optional[int] = None,
+    on_response: Optional[Callable[[httpx.Response], None]] = None,
+    on_transport_error: Optional[Callable[[httpx.TransportError], None]] = None,
+) -> bool:
+    """
+    多分段并发下载大文件：按字节区间切分后并发请求，每个分段单独重试和续传，全部完成后按顺序拼接
+    文件小于一个分段或服务端不支持 Range（探测失败，或者分段请求没有返回206）时退化为单连接的 stream_download
+    Args:
+        http_client: httpx客户端
+        url: 媒体文件地址
+        save_path: 保存路径
+        headers: 请求头
+        total_size: 已知的文件大小，为None时先发一个 Range 请求探测
+        on_response: 收到响应头后的回调，调用方用来按状态码上报请求结果（例如被封禁时剔除代理）
+        on_transport_error: 连接失败、超时等网络错误的回调，调用方用来上报代理失败，响应状态码错误不会调用
+
+    Returns:
+        是否下载成功
+    """
+    segment_size = config.MEDIA_DOWNLOAD_SEGMENT_SIZE
+    if not total_size:
+        total_size = await probe_content_length(http_client, url, headers, on_response, on_transport_error)
+    if not total_size or total_size <= segment_size or config.MEDIA_DOWNLOAD_SEGMENT_CONCURRENCY <= 1:
+        return await stream_download(http_client, url, save_path, headers, on_response, on_transport_error)
+
+    segments = split_segments(total_size, segment_size)
+    segment_paths = [f"{save_path}.part{index}" for index in range(len(segments))]
+    semaphore = asyncio.Semaphore(config.MEDIA_DOWNLOAD_SEGMENT_CONCURRENCY)
+
+    async def download_segment(segment: Tuple[int, int], segment_path: str):
+        async with semaphore:
+            await _download_to_part_file(
+                http_client, url, segment_path, headers, start=segment[0], end=segment[1],
+                on_response=on_response, on_transport_error=on_transport_error,
+            )
+
+    results = await asyncio.gather(
+        *[download_segment(segment, segment_path) for segment, segment_path in zip(segments, segment_paths)],
+        return_exceptions=True,
+    )
+    if any(isinstance(result, RangeNotSupportedError) for result in results):
+        utils.logger.warning(f"[segmented_download] {url} ignored Range header, fallback to single stream download")
+        for segment_path in segment_paths:
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
+        return await stream_download(http_client, url, save_path, headers, on_response, on_transport_error)
+    for result in results:
+        if isinstance(result, BaseException):
+            exc = result.last_attempt.exception() if isinstance(result, RetryError) else result
+            utils.logger.error(f"[segmented_download] download {url} failed: {exc.__class__.__name__} - {exc}")
+            return False
+
+    downloaded_size = sum(os.path.getsize(segment_path) for segment_path in segment_paths)
+    if downloaded_size != total_size:
+        utils.logger.error(f"[segmented_download] download {url} size mismatch, expect {total_size}, got {downloaded_size}")
+        for segment_path in segment_paths:
+            os.remove(segment_path)
+        return False
+
+    part_path = f"{save_path}.part"
+    await asyncio.to_thread(_merge_segment_files, segment_paths, part_path)
+    os.replace(part_path, save_path)
+    return True
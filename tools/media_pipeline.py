@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/media_pipeline.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 独立的媒体下载流水线，爬虫只负责投递下载任务，由后台 worker 池按 CDN 域名限流下载
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import config
+from tools import utils
+from tools.media_blob_store import MediaBlobStore, file_sha256, get_media_blob_store
+from tools.media_downloader import get_download_temp_path
+
+
+@dataclass
+class MediaDownloadJob:
+    """一个媒体文件下载任务"""
+    platform: str
+    url: str
+    # 下载函数，参数为 (url, 保存路径)，返回是否下载成功
+    download_func: Callable[[str, str], Awaitable[bool]]
+    # 下载成功后的存储函数，参数为已下载完成的本地文件路径
+    store_func: Callable[[str], Awaitable[None]]
+
+
+class MediaDownloadPipeline:
+    """
+    媒体下载流水线：爬虫调用 submit 投递任务后立即返回，由固定数量的 worker 在后台下载
+    同一个 CDN 域名的并发数单独限制，整体带宽由 tools.media_downloader 中的令牌桶限制
+    开启 ENABLE_MEDIA_DEDUP 时文件按内容哈希保存到 blob 目录，已下载过的url直接复用，不再请求CDN
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or config.MEDIA_DOWNLOAD_WORKERS
+        self.per_host_concurrency = per_host_concurrency or config.MEDIA_DOWNLOAD_PER_HOST_CONCURRENCY
+        self.max_queue_size = max_queue_size if max_queue_size is not None else config.MEDIA_DOWNLOAD_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # 正在下载的url，同一个url的任务共用一个临时文件，不能同时下载
+        self._inflight_urls: Dict[str, asyncio.Event] = {}
+        self.succeeded_count = 0
+        self.failed_count = 0
+        self.reused_count = 0
+
+    def _ensure_workers(self) -> None:
+        """
+        首次投递任务时再创建队列和 worker，保证它们绑定在爬虫运行的事件循环上
+        Returns:
+
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"media-download-worker-{i}")
+                for i in range(self.max_workers)
+            ]
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def submit(self, job: MediaDownloadJob) -> None:
+        """
+        投递下载任务，队列满时会等待，避免下载积压过多占用内存
+        Args:
+            job: 下载任务
+
+        Returns:
+
+        """
+        self._ensure_workers()
+        await self._queue.put(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job: MediaDownloadJob = await self._queue.get()
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                self.failed_count += 1
+                utils.logger.error(f"[MediaDownloadPipeline._worker] process {job.url} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: MediaDownloadJob) -> None:
+        # 同一个url已经有任务在下载时先等它完成，开启去重时可以直接复用它下载的文件
+        while job.url in self._inflight_urls:
+            await self._inflight_urls[job.url].wait()
+        done_event = asyncio.Event()
+        self._inflight_urls[job.url] = done_event
+        try:
+            await self._download_and_store(job)
+        finally:
+            del self._inflight_urls[job.url]
+            done_event.set()
+
+    async def _download_and_store(self, job: MediaDownloadJob) -> None:
+        temp_file_path = get_download_temp_path(job.platform, job.url)
+        blob_store: Optional[MediaBlobStore] = get_media_blob_store(job.platform) if config.ENABLE_MEDIA_DEDUP else None
+        # blob 索引是同步的 sqlite 读写，放到线程中执行，避免阻塞爬虫的事件循环
+        content_hash = await asyncio.to_thread(blob_store.lookup_url, job.url) if blob_store else None
+        if content_hash:
+            self.reused_count += 1
+        else:
+            async with self._get_host_semaphore(job.url):
+                is_downloaded = await job.download_func(job.url, temp_file_path)
+            if not is_downloaded:
+                self.failed_count += 1
+                return
+            if blob_store:
+                content_hash = await asyncio.to_thread(file_sha256, temp_file_path)
+                await asyncio.to_thread(blob_store.add_file, temp_file_path, job.url, content_hash)
+
+        if blob_store:
+            # 存储层会把传入的文件移动到帖子目录，这里给它一个指向 blob 的硬链接
+            await asyncio.to_thread(blob_store.link_to, content_hash, temp_file_path)
+        await job.store_func(temp_file_path)
+        self.succeeded_count += 1
+
+    async def drain(self) -> None:
+        """
+        等待队列中所有任务处理完成，然后停止 worker，可以重复调用
+        Returns:
+
+        """
+        if self._queue is None:
+            return
+        try:
+            if self._workers:
+                await self._queue.join()
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            if self._workers:
+                utils.logger.info(
+                    f"[MediaDownloadPipeline.drain] media download finished, "
+                    f"succeeded: {self.succeeded_count}, reused: {self.reused_count}, failed: {self.failed_count}"
+                )
+            self._workers = []
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/parquet_writer.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 列式 parquet 数据集写入，数据攒够一个 row group 后写入，文件达到大小上限后滚动到新文件
+
+import asyncio
+import json
+import os
+import pathlib
+from typing import Any, Dict, List, Optional
+
+import config
+from tools import utils
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# int64 能表示的范围，超出范围的整数（部分平台的超长ID）按字符串保存
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+
+# 数据集的 schema 文件，记录所有文件统一的列和类型
+COMMON_METADATA_FILE = "_common_metadata"
+
+
+def is_pyarrow_available() -> bool:
+    """
+    检查是否安装了 parquet 存储所需的 pyarrow 依赖
+    Returns:
+
+    """
+    return pa is not None
+
+
+def ensure_pyarrow_available() -> None:
+    """
+    未安装 pyarrow 时直接报错，避免爬取完成后才发现数据无法写入
+    Returns:
+
+    """
+    if not is_pyarrow_available():
+        raise ImportError(
+            "SAVE_DATA_OPTION is parquet but pyarrow is not installed, you can install it by: pip install pyarrow"
+        )
+
+
+def infer_column_type(values: List[Any]) -> "pa.DataType":
+    """
+    根据一列的取值推断 parquet 列类型，只包含整数、浮点数或布尔值的列按对应类型保存，其他都按字符串保存
+    Args:
+        values: 一列的所有取值
+
+    Returns:
+
+    """
+    non_null_values = [value for value in values if value is not None]
+    if not non_null_values:
+        return pa.string()
+    if all(isinstance(value, bool) for value in non_null_values):
+        return pa.bool_()
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in non_null_values):
+        return pa.string()
+    if all(isinstance(value, int) for value in non_null_values):
+        if all(_INT64_MIN <= value <= _INT64_MAX for value in non_null_values):
+            return pa.int64()
+        return pa.string()
+    return pa.float64()
+
+
+def merge_column_type(current_type: "pa.DataType", new_type: "pa.DataType") -> "pa.DataType":
+    """
+    合并同一列在不同批次中推断出的类型，整数和浮点数合并为浮点数，其他不一致的类型合并为字符串
+    Args:
+        current_type: 已有的列类型
+        new_type: 新批次推断出的列类型
+
+    Returns:
+
+    """
+    if current_type == new_type:
+        return current_type
+    if {current_type, new_type} == {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def to_column_value(value: Any, column_type: "pa.DataType") -> Any:
+    if value is None:
+        return None
+    if column_type == pa.string():
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+    if column_type == pa.float64():
+        return float(value)
+    return value
+
+
+def merge_schemas(current_schema: "pa.Schema", new_schema: "pa.Schema") -> "pa.Schema":
+    """
+    合并两个 schema，已有字段的顺序保持不变，新字段追加在后面，同名字段按 merge_column_type 合并类型
+    Args:
+        current_schema: 已有的 schema
+        new_schema: 新的 schema
+
+    Returns:
+
+    """
+    fields = [
+        pa.field(field.name, merge_column_type(field.type, new_schema.field(field.name).type))
+        if field.name in new_schema.names else field
+        for field in current_schema
+    ]
+    fields.extend(field for field in new_schema if field.name not in current_schema.names)
+    return pa.schema(fields)
+
+
+def conform_table(table: "pa.Table", schema: "pa.Schema") -> "pa.Table":
+    """
+    把已写入的数据转换为新的 schema：缺少的列补空值，类型放宽的列按写入时相同的规则转换
+    Args:
+        table: 已写入的数据
+        schema: 新的 schema
+
+    Returns:
+
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+        elif table.schema.field(field.name).type == field.type:
+            columns.append(table.column(field.name))
+        else:
+            values = table.column(field.name).to_pylist()
+            columns.append(pa.array([to_column_value(value, field.type) for value in values], type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ParquetDatasetWriter:
+    """
+    单个 parquet 数据集目录的写入器，同一个目录在进程内只有一个实例（见 get_parquet_writer）
+    数据先在内存中缓冲，达到 PARQUET_ROW_GROUP_SIZE 条后作为一个 row group 写入当前文件
+    文件达到 PARQUET_MAX_FILE_SIZE 后关闭并开始写新文件；出现新字段或类型变化时也会开始写新文件
+    写入中的文件以 . 开头，关闭后才重命名为 part-*.parquet，读取数据集时不会读到未写完的文件
+    数据集目录下所有文件的 schema 保持一致（同时保存在 _common_metadata 中），可以直接用 pq.read_table(目录) 读取：
+    出现新字段或列类型放宽（例如整数列出现了字符串）时，按新的 schema 重写目录下已有的文件，这种情况只在字段变化时发生
+    """
+
+    def __init__(self, dataset_dir: str):
+        ensure_pyarrow_available()
+        self.dataset_dir = dataset_dir
+        pathlib.Path(dataset_dir).mkdir(parents=True, exist_ok=True)
+        self.schema: Optional["pa.Schema"] = self._load_dataset_schema()
+        # 之前运行写入的文件 schema 可能不一致，第一次写入时统一
+        self._need_conform = self.schema is not None
+        self.row_count = 0
+        self.file_count = 0
+        self._buffer: List[Dict] = []
+        self._lock = asyncio.Lock()
+        self._file_prefix = f"part-{utils.get_current_timestamp()}"
+        self._sink: Optional["pa.NativeFile"] = None
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._writing_path = ""
+        self._file_path = ""
+
+    def _part_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.dataset_dir, name) for name in os.listdir(self.dataset_dir)
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+
+    def _load_dataset_schema(self) -> Optional["pa.Schema"]:
+        """
+        读取数据集已有的 schema：_common_metadata 和已有文件的 schema 合并，只读取文件尾部的元数据
+        Returns:
+
+        """
+        schemas = []
+        common_metadata_path = os.path.join(self.dataset_dir, COMMON_METADATA_FILE)
+        if os.path.exists(common_metadata_path):
+            schemas.append(pq.read_schema(common_metadata_path))
+        schemas.extend(pq.read_schema(file_path) for file_path in self._part_files())
+        schema = None
+        for file_schema in schemas:
+            schema = file_schema if schema is None else merge_schemas(schema, file_schema)
+        return schema
+
+    async def append(self, item: Dict) -> None:
+        """
+        写入一条数据到缓冲区，攒够一个 row group 时落盘
+        Args:
+            item: 一条数据
+
+        Returns:
+
+        """
+        async with self._lock:
+            self._buffer.append(item)
+            if len(self._buffer) >= config.PARQUET_ROW_GROUP_SIZE:
+                await self._flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._write_row_group, rows)
+
+    def _merge_schema(self, rows: List[Dict]) -> "pa.Schema":
+        """
+        用已有的 schema 和本批数据合并出新的 schema，已有字段的顺序保持不变，新字段追加在后面
+        Args:
+            rows: 本批数据
+
+        Returns:
+
+        """
+        column_names = list(self.schema.names) if self.schema is not None else []
+        for row in rows:
+            for key in row.keys():
+                if key not in column_names:
+                    column_names.append(key)
+        fields = []
+        for name in column_names:
+            values = [row.get(name) for row in rows]
+            column_type = infer_column_type(values)
+            if self.schema is not None and name in self.schema.names:
+                # 本批数据缺少该列或全为空值时沿用已有类型，避免整数列被放宽为字符串
+                if all(value is None for value in values):
+                    column_type = self.schema.field(name).type
+                else:
+                    column_type = merge_column_type(self.schema.field(name).type, column_type)
+            fields.append(pa.field(name, column_type))
+        return pa.schema(fields)
+
+    def _write_row_group(self, rows: List[Dict]) -> None:
+        schema = self._merge_schema(rows)
+        if self._need_conform or self.schema is None or not schema.equals(self.schema):
+            # 同一个文件内的 schema 必须一致，字段或类型变化后关闭当前文件，并按新的 schema 重写已有文件
+            self._close_file()
+            self.schema = schema
+            self._conform_dataset()
+            self._need_conform = False
+        if self._writer is None:
+            self._open_file()
+        table = pa.Table.from_pydict(
+            {field.name: [to_column_value(row.get(field.name), field.type) for row in rows] for field in schema},
+            schema=schema,
+        )
+        self._writer.write_table(table)
+        self.row_count += len(rows)
+        if self._sink.tell() >= config.PARQUET_MAX_FILE_SIZE:
+            self._close_file()
+
+    def _conform_dataset(self) -> None:
+        """
+        把目录下 schema 和当前 schema 不一致的文件按当前 schema 重写，并更新 _common_metadata
+        Returns:
+
+        """
+        for file_path in self._part_files():
+            if pq.read_schema(file_path).equals(self.schema):
+                continue
+            table = conform_table(pq.read_table(file_path), self.schema)
+            temp_path = os.path.join(self.dataset_dir, f".{os.path.basename(file_path)}.rewrite")
+            pq.write_table(table, temp_path, compression=config.PARQUET_COMPRESSION)
+            os.replace(temp_path, file_path)
+            utils.logger.info(f"[ParquetDatasetWriter] Rewrote {file_path} with the new dataset schema")
+        pq.write_metadata(self.schema, os.path.join(self.dataset_dir, COMMON_METADATA_FILE))
+
+    def _open_file(self) -> None:
+        self.file_count += 1
+        file_name = f"{self._file_prefix}-{self.file_count:05d}.parquet"
+        self._file_path = os.path.join(self.dataset_dir, file_name)
+        self._writing_path = os.path.join(self.dataset_dir, f".{file_name}")
+        self._sink = pa.OSFile(self._writing_path, "wb")
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression=config.PARQUET_COMPRESSION)
+
+    def _close_file(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        os.replace(self._writing_path, self._file_path)
+        utils.logger.info(f"[ParquetDatasetWriter] Wrote {self._file_path}")
+        self._writer = None
+        self._sink = None
+
+    async def close(self) -> None:
+        """
+        写入缓冲区中剩余的数据并关闭当前文件
+        Returns:
+
+        """
+        async with self._lock:
+            await self._flush()
+            await asyncio.to_thread(self._close_file)
+
+
+_parquet_writers: Dict[str, ParquetDatasetWriter] = {}
+
+
+def get_parquet_writer(dataset_dir: str) -> ParquetDatasetWriter:
+    """
+    获取 parquet 数据集目录对应的写入器，同一个目录全局共用一个实例
+    Args:
+        dataset_dir: 数据集目录
+
+    Returns:
+
+    """
+    if dataset_dir not in _parquet_writers:
+        _parquet_writers[dataset_dir] = ParquetDatasetWriter(dataset_dir)
+    return _parquet_writers[dataset_dir]
+
+
+async def close_parquet_writers() -> None:
+    """
+    写入所有缓冲的数据并关闭文件，运行结束时调用
+    Returns:
+
+    """
+    for writer in list(_parquet_writers.values()):
+        try:
+            await writer.close()
+        except Exception as e:
+            utils.logger.error(f"[close_parquet_writers] close {writer.dataset_dir} error: {e}")
+    _parquet_writers.clear()
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/rate_limiter.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按 平台 + 接口类型 划分的令牌桶请求限速，请求前获取令牌，代替每次请求后固定时长的休眠
+#            每个平台一个 AIMD 控制器，根据封禁/验证码信号和错误率自动调整并发数和速率
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from email.utils import parsedate_to_datetime
+from typing import AsyncContextManager, Deque, Dict, Optional, Tuple
+
+import config
+from tools import utils
+
+# 接口类型
+ENDPOINT_SEARCH = "search"  # 搜索和列表分页（包括创作者主页的作品列表、粉丝/关注列表）
+ENDPOINT_DETAIL = "detail"  # 帖子/视频/创作者详情，以及其他未归类的接口
+ENDPOINT_COMMENTS = "comments"  # 一级评论和二级评论分页
+ENDPOINT_MEDIA = "media"  # 图片/视频文件下载
+
+
+class TokenBucket:
+    """
+    令牌桶：rate 为每秒补充的令牌数（长期平均每秒请求数），burst 为桶容量（允许连续突发的请求数），rate 小于等于0表示不限速
+    获取令牌时先在桶里预约，令牌不足时在锁外等待到预约的时间，多个协程等待同一个桶时按获取顺序依次放行
+    """
+
+    def __init__(self, rate: float, burst: int = 1, jitter: float = 0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        # 暂停期间 _updated_at 在未来，不补充令牌
+        if now > self._updated_at:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌
+        Returns:
+            需要等待的秒数，令牌充足时为0
+        """
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(0.0, self._updated_at - now)
+        if self.rate <= 0:
+            return delay
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return delay
+        # 只对需要排队的请求加随机抖动，抖动不额外消耗令牌，长期平均速率不变
+        return delay - self._tokens / self.rate + random.uniform(0, self.jitter / self.rate)
+
+    async def acquire(self) -> float:
+        """
+        获取一个令牌，令牌不足时等待
+        Returns:
+            实际等待的秒数
+        """
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def set_rate(self, rate: float) -> None:
+        """
+        调整速率，已经积累的令牌按原速率结算
+        Args:
+            rate: 新的每秒令牌数
+
+        Returns:
+
+        """
+        self._refill(time.monotonic())
+        self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """
+        暂停发放令牌，之后的请求至少等到暂停结束，用于遵守 Retry-After
+        Args:
+            seconds: 暂停秒数
+
+        Returns:
+
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, 1.0)
+        self._updated_at = max(self._updated_at, now + seconds)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式
+    Args:
+        value: 响应头的值
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveController:
+    """
+    单个平台的 AIMD 控制器：
+    连续 ADAPTIVE_INCREASE_INTERVAL 个请求正常时，并发数加1、速率倍数加 ADAPTIVE_RATE_INCREASE_STEP
+    遇到封禁/验证码，或者最近 ADAPTIVE_ERROR_WINDOW 个请求的错误率超过阈值时，并发数和速率倍数都乘以 ADAPTIVE_DECREASE_FACTOR
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        # 从1开始逐步增大到 max_concurrency，和 TCP 慢启动类似
+        self.concurrency_limit = 1
+        self.rate_factor = 1.0
+        self.in_flight = 0
+        self.success_count = 0
+        self.error_count = 0
+        self.block_count = 0
+        self._outcomes: Deque[bool] = deque(maxlen=config.ADAPTIVE_ERROR_WINDOW)
+        self._healthy_streak = 0
+        self._last_decrease_at = float("-inf")
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        占用一个并发名额，同时进行的请求数达到 concurrency_limit 时等待
+        Returns:
+
+        """
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.concurrency_limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_flight -= 1
+                condition.notify_all()
+
+    def record_success(self) -> bool:
+        """
+        记录一次正常响应
+        Returns:
+            并发数或速率是否发生变化
+        """
+        self.success_count += 1
+        self._outcomes.append(False)
+        self._healthy_streak += 1
+        if self._healthy_streak < config.ADAPTIVE_INCREASE_INTERVAL:
+            return False
+        self._healthy_streak = 0
+        concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1)
+        rate_factor = min(config.ADAPTIVE_MAX_RATE_FACTOR, self.rate_factor + config.ADAPTIVE_RATE_INCREASE_STEP)
+        changed = (concurrency_limit, rate_factor) != (self.concurrency_limit, self.rate_factor)
+        self.concurrency_limit, self.rate_factor = concurrency_limit, rate_factor
+        return changed
+
+    def record_error(self) -> bool:
+        """
+        记录一次失败的请求（网络错误、服务端错误等），错误率超过阈值时减小
+        Returns:
+            并发数或速率是否发生变化
+        """
+        self.error_count += 1
+        self._outcomes.append(True)
+        self._healthy_streak = 0
+        # 样本太少时错误率波动大，不做判断
+        if len(self._outcomes) < self._outcomes.maxlen // 2 or self.error_rate <= config.ADAPTIVE_ERROR_RATE_THRESHOLD:
+            return False
+        return self._decrease()
+
+    def record_block(self) -> bool:
+        """
+        记录一次封禁/验证码响应，立即减小
+        Returns:
+            并发数或速率是否发生变化
+        """
+        self.block_count += 1
+        self._outcomes.append(True)
+        self._healthy_streak = 0
+        return self._decrease()
+
+    def _decrease(self) -> bool:
+        now = time.monotonic()
+        # 并发中的多个请求往往同时失败，冷却时间内只减小一次
+        if now - self._last_decrease_at < config.ADAPTIVE_DECREASE_COOLDOWN_SEC:
+            return False
+        self._last_decrease_at = now
+        self._outcomes.clear()
+        self.concurrency_limit = max(1, int(self.concurrency_limit * config.ADAPTIVE_DECREASE_FACTOR))
+        self.rate_factor = max(config.ADAPTIVE_MIN_RATE_FACTOR, self.rate_factor * config.ADAPTIVE_DECREASE_FACTOR)
+        return True
+
+    def metrics(self) -> Dict:
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "in_flight": self.in_flight,
+            "rate_factor": round(self.rate_factor, 3),
+            "error_rate": round(self.error_rate, 3),
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+            "block_count": self.block_count,
+        }
+
+
+def get_rate_limit_config(platform: str, endpoint_class: str) -> Dict:
+    """
+    获取某个平台某类接口的限速配置，PLATFORM_RATE_LIMITS 中的平台配置优先于 RATE_LIMITS 中的默认配置
+    Args:
+        platform: 平台名称，与 config.PLATFORM 一致
+        endpoint_class: 接口类型
+
+    Returns:
+        {"rate": 每秒请求数, "burst": 突发请求数}
+    """
+    limit = dict(config.RATE_LIMITS.get(endpoint_class) or config.RATE_LIMITS[ENDPOINT_DETAIL])
+    # 媒体下载的限速平台名称为 "平台/media"（见 get_media_rate_limit_platform），使用该平台的配置
+    limit.update(config.PLATFORM_RATE_LIMITS.get(platform.split("/", 1)[0], {}).get(endpoint_class, {}))
+    return limit
+
+
+def get_media_rate_limit_platform(platform: str) -> str:
+    """
+    媒体下载使用的限速平台名称：媒体文件由 CDN 提供，单独使用一组令牌桶和自适应控制器，
+    CDN 的限流和错误只减小媒体下载的速率，不影响该平台接口的限速
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    return f"{platform}/{ENDPOINT_MEDIA}"
+
+
+class RateLimiter:
+    """
+    所有请求共享的限速器，每个 (平台, 接口类型) 一个令牌桶，同一平台的多个客户端和并发任务共用
+    开启 ENABLE_ADAPTIVE_RATE_LIMIT 时，令牌桶的实际速率为配置速率乘以该平台 AIMD 控制器的速率倍数
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._base_rates: Dict[Tuple[str, str], float] = {}
+        self._controllers: Dict[str, AdaptiveController] = {}
+
+    def get_controller(self, platform: str) -> AdaptiveController:
+        if platform not in self._controllers:
+            self._controllers[platform] = AdaptiveController(config.MAX_CONCURRENCY_NUM)
+        return self._controllers[platform]
+
+    def get_bucket(self, platform: str, endpoint_class: str) -> TokenBucket:
+        key = (platform, endpoint_class)
+        if key not in self._buckets:
+            limit = get_rate_limit_config(platform, endpoint_class)
+            self._base_rates[key] = limit.get("rate", 0)
+            self._buckets[key] = TokenBucket(
+                self._base_rates[key] * self.get_controller(platform).rate_factor,
+                limit.get("burst", 1),
+                config.RATE_LIMIT_JITTER,
+            )
+        return self._buckets[key]
+
+    async def acquire(self, platform: str, endpoint_class: str) -> None:
+        """
+        获取一个请求令牌，令牌不足时等待
+        Args:
+            platform: 平台名称
+            endpoint_class: 接口类型
+
+        Returns:
+
+        """
+        delay = await self.get_bucket(platform, endpoint_class).acquire()
+        if delay >= 1:
+            utils.logger.debug(f"[RateLimiter.acquire] {platform} {endpoint_class} waited {delay:.1f}s for rate limit")
+
+    def concurrency_slot(self, platform: str) -> AsyncContextManager:
+        """
+        获取该平台的并发名额，未开启自适应限速时不限制
+        Args:
+            platform: 平台名称
+
+        Returns:
+
+        """
+        if not config.ENABLE_ADAPTIVE_RATE_LIMIT:
+            return nullcontext()
+        return self.get_controller(platform).slot()
+
+    def record_success(self, platform: str) -> None:
+        if config.ENABLE_ADAPTIVE_RATE_LIMIT and self.get_controller(platform).record_success():
+            self._on_limits_changed(platform, "healthy")
+
+    def record_error(self, platform: str, retry_after: Optional[float] = None) -> None:
+        """
+        记录一次失败的请求
+        Args:
+            platform: 平台名称
+            retry_after: 响应头 Retry-After 要求等待的秒数
+
+        Returns:
+
+        """
+        if not config.ENABLE_ADAPTIVE_RATE_LIMIT:
+            return
+        if retry_after:
+            self.pause(platform, retry_after)
+        if self.get_controller(platform).record_error():
+            self._on_limits_changed(platform, "error rate rising")
+
+    def record_block(self, platform: str, retry_after: Optional[float] = None) -> None:
+        """
+        记录一次封禁/验证码响应，减小并发数和速率，并暂停该平台所有请求 Retry-After 秒（没有时为 ADAPTIVE_BLOCK_PAUSE_SEC 秒）
+        Args:
+            platform: 平台名称
+            retry_after: 响应头 Retry-After 要求等待的秒数
+
+        Returns:
+
+        """
+        if not config.ENABLE_ADAPTIVE_RATE_LIMIT:
+            return
+        if self.get_controller(platform).record_block():
+            self.pause(platform, retry_after or config.ADAPTIVE_BLOCK_PAUSE_SEC)
+            self._on_limits_changed(platform, "blocked")
+        elif retry_after:
+            self.pause(platform, retry_after)
+
+    def pause(self, platform: str, seconds: float) -> None:
+        for (bucket_platform, _), bucket in self._buckets.items():
+            if bucket_platform == platform:
+                bucket.pause(seconds)
+
+    def _on_limits_changed(self, platform: str, reason: str) -> None:
+        controller = self.get_controller(platform)
+        for key, bucket in self._buckets.items():
+            if key[0] == platform:
+                bucket.set_rate(self._base_rates[key] * controller.rate_factor)
+        log = utils.logger.info if reason == "healthy" else utils.logger.warning
+        log(
+            f"[RateLimiter] {platform} limits changed ({reason}), "
+            f"concurrency: {controller.concurrency_limit}, rate factor: {controller.rate_factor:.2f}"
+        )
+
+    def metrics(self) -> Dict[str, Dict]:
+        """
+        导出每个平台当前的并发数、速率倍数、各类接口的实际速率以及请求结果计数
+        Returns:
+
+        """
+        result = {}
+        for platform, controller in self._controllers.items():
+            result[platform] = controller.metrics()
+            result[platform]["rates"] = {
+                endpoint_class: round(bucket.rate, 4)
+                for (bucket_platform, endpoint_class), bucket in self._buckets.items()
+                if bucket_platform == platform
+            }
+        return result
+
+    def log_metrics(self, platform: str) -> None:
+        metrics = self.metrics().get(platform)
+        if metrics:
+            utils.logger.info(f"[RateLimiter] {platform} adaptive limits: {metrics}")
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
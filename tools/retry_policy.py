@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/retry_policy.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 统一的请求重试策略：按错误类型决定是否重试和退避时长，全局重试预算，按域名熔断
+
+import random
+from collections import defaultdict
+from functools import partial
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from tenacity import RetryCallState, retry
+
+import config
+from tools import utils
+from tools.circuit_breaker import CircuitBreaker
+from tools.http_client import RequestLatencyStats
+
+# 错误类型
+ERROR_TRANSIENT = "transient"  # 网络错误、超时、服务端5xx等偶发错误
+ERROR_THROTTLED = "throttled"  # 请求过快被限流/封禁、出现验证码
+ERROR_AUTH_EXPIRED = "auth_expired"  # 登录态或签名参数失效，刷新后可以恢复
+ERROR_PERMANENT = "permanent"  # 数据不存在、参数错误等确定性失败，重试也不会成功
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    判断异常属于哪类错误，异常类可以通过 error_class 属性声明自己的错误类型（见各平台的 exception.py）
+    Args:
+        exc: 请求抛出的异常
+
+    Returns:
+        错误类型
+    """
+    error_class = getattr(exc, "error_class", None)
+    if error_class:
+        return error_class
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        if status_code == 429:
+            return ERROR_THROTTLED
+        if status_code == 401:
+            return ERROR_AUTH_EXPIRED
+        if status_code >= 500:
+            return ERROR_TRANSIENT
+        return ERROR_PERMANENT
+    # 网络错误和其他没有声明类型的异常都按偶发错误处理
+    return ERROR_TRANSIENT
+
+
+def mark_non_retryable(exc: BaseException) -> BaseException:
+    """
+    标记异常在当前层不再重试，错误类型仍按原类型统计
+    用于调用方已经处理过的错误，例如已经上报封禁并剔除代理的验证码响应，或者签名失效后用同一组请求头重试也不会成功的请求
+    Args:
+        exc: 请求抛出的异常
+
+    Returns:
+        传入的异常
+    """
+    exc.retryable = False
+    return exc
+
+
+class RetryBudget:
+    """
+    全局重试预算：每次首次请求存入 ratio 个令牌，每次重试消耗1个，最多积累 max_tokens 个
+    平台大面积失败时重试次数被限制在正常请求数的 ratio 倍以内，避免重试把请求量放大
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class RetryStats:
+    """按接口统计请求次数、重试次数、各类错误次数、放弃次数"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def incr(self, endpoint: str, name: str) -> None:
+        self._counters[endpoint][name] += 1
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+
+    def log_summary(self) -> None:
+        for endpoint, counters in self.summary().items():
+            if len(counters) > 1:
+                utils.logger.info(f"[RetryStats] {endpoint} {counters}")
+
+
+_retry_budget: Optional[RetryBudget] = None
+_retry_stats = RetryStats()
+_host_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_host_failure_counts: Dict[str, int] = defaultdict(int)
+
+
+def get_retry_budget() -> RetryBudget:
+    global _retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_MAX)
+    return _retry_budget
+
+
+def get_retry_stats() -> RetryStats:
+    return _retry_stats
+
+
+def get_host_circuit_breaker(host: str) -> CircuitBreaker:
+    """
+    获取域名对应的熔断器，同一域名连续失败 HOST_CIRCUIT_BREAKER_THRESHOLD 次后熔断，熔断期间发往该域名的请求等待
+    Args:
+        host: 域名
+
+    Returns:
+
+    """
+    if host not in _host_circuit_breakers:
+        _host_circuit_breakers[host] = CircuitBreaker(f"host {host}", config.HOST_CIRCUIT_BREAKER_COOLDOWN_SEC)
+    return _host_circuit_breakers[host]
+
+
+async def wait_host_available(host: str) -> None:
+    """
+    域名处于熔断状态时等待熔断结束
+    Args:
+        host: 域名
+
+    Returns:
+
+    """
+    circuit_breaker = _host_circuit_breakers.get(host)
+    if circuit_breaker:
+        await circuit_breaker.wait_closed()
+
+
+def _request_target(
+    retry_state: RetryCallState, endpoint: Optional[str] = None, host: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    得到统计用的接口名称和熔断用的域名：优先使用装饰器传入的值，否则从被装饰函数的 (self, method, url) 参数得到，
+    参数不是请求地址时接口名称用函数名，不参与域名熔断
+    """
+    args, kwargs = retry_state.args, retry_state.kwargs
+    method = kwargs.get("method", args[1] if len(args) > 1 else None)
+    url = kwargs.get("url", args[2] if len(args) > 2 else None)
+    if isinstance(method, str) and isinstance(url, str) and url.startswith(("http://", "https://")):
+        return endpoint or RequestLatencyStats.endpoint_key(method, url), host or urlparse(url).netloc
+    return endpoint or retry_state.fn.__qualname__, host or ""
+
+
+def _record_host_outcome(host: str, error_class: Optional[str]) -> None:
+    if not host:
+        return
+    if error_class not in (ERROR_TRANSIENT, ERROR_THROTTLED):
+        _host_failure_counts[host] = 0
+        return
+    _host_failure_counts[host] += 1
+    if _host_failure_counts[host] >= config.HOST_CIRCUIT_BREAKER_THRESHOLD:
+        _host_failure_counts[host] = 0
+        get_host_circuit_breaker(host).trip(f"{config.HOST_CIRCUIT_BREAKER_THRESHOLD} consecutive {error_class} errors")
+
+
+def _should_retry(retry_state: RetryCallState, endpoint: Optional[str] = None, host: Optional[str] = None) -> bool:
+    endpoint, host = _request_target(retry_state, endpoint, host)
+    if retry_state.attempt_number == 1:
+        get_retry_stats().incr(endpoint, "calls")
+        get_retry_budget().deposit()
+    exc = retry_state.outcome.exception()
+    if exc is None:
+        _record_host_outcome(host, None)
+        return False
+    error_class = classify_error(exc)
+    get_retry_stats().incr(endpoint, error_class)
+    _record_host_outcome(host, error_class)
+    return error_class != ERROR_PERMANENT and getattr(exc, "retryable", True)
+
+
+def _should_stop(retry_state: RetryCallState, endpoint: Optional[str] = None) -> bool:
+    endpoint, _ = _request_target(retry_state, endpoint)
+    error_class = classify_error(retry_state.outcome.exception())
+    if retry_state.attempt_number >= config.RETRY_POLICIES[error_class]["max_attempts"]:
+        get_retry_stats().incr(endpoint, "gave_up")
+        return True
+    if not get_retry_budget().withdraw():
+        get_retry_stats().incr(endpoint, "budget_exhausted")
+        return True
+    get_retry_stats().incr(endpoint, "retries")
+    return False
+
+
+def _backoff(retry_state: RetryCallState) -> float:
+    """指数退避 + 全随机抖动：在 0 ~ min(max_delay, base_delay * 2^(n-1)) 之间随机等待"""
+    policy = config.RETRY_POLICIES[classify_error(retry_state.outcome.exception())]
+    return random.uniform(0, min(policy["max_delay"], policy["base_delay"] * 2 ** (retry_state.attempt_number - 1)))
+
+
+def retry_with_policy(endpoint: Optional[str] = None, host: Optional[str] = None):
+    """
+    按统一重试策略重试的装饰器，代替固定次数、固定间隔的 tenacity retry
+    确定性错误和被 mark_non_retryable 标记的错误直接抛出原异常；可重试的错误达到该类错误的最大次数或重试预算用完时，和 tenacity 一样抛出 RetryError
+    Args:
+        endpoint: 统计用的接口名称，为空时从被装饰函数的 (self, method, url) 参数得到
+        host: 熔断用的域名，被装饰函数的参数不是 (self, method, url) 时需要传入，否则该函数的失败不会计入域名熔断
+
+    Returns:
+
+    """
+    return retry(
+        retry=partial(_should_retry, endpoint=endpoint, host=host),
+        stop=partial(_should_stop, endpoint=endpoint),
+        wait=_backoff,
+    )
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/seen_index.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 持久化的"已爬取"索引，和数据存储方式无关，用于断点续爬和跳过重复的详情/评论请求
+
+import hashlib
+import itertools
+import math
+import os
+import pathlib
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional
+
+import config
+from tools import utils
+
+# 已爬取过详情的帖子/视频
+SEEN_KIND_CONTENT = "content"
+# 评论分页已经全部爬取完成的帖子/视频，由爬虫在评论爬取结束后记录
+SEEN_KIND_COMMENT = "comment"
+
+
+class BloomFilter:
+    """
+    内存中的布隆过滤器，只用于快速判断"一定不存在"，判断为存在时仍需查询 sqlite 确认
+    内存占用只和容量、误判率有关：容量100万、误判率1%时约为1.2MB
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenIndex:
+    """
+    已爬取ID索引，保存在 sqlite 的 (kind, item_id) 主键表中，查询走索引，不需要把全部ID读入内存
+    开启布隆过滤器时，未爬取过的ID（绝大多数查询）在内存中就能判断，不访问磁盘
+    """
+
+    def __init__(self, db_path: str, bloom_capacity: int = 0, bloom_error_rate: float = 0.01):
+        pathlib.Path(os.path.dirname(db_path) or ".").mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (kind TEXT NOT NULL, item_id TEXT NOT NULL, "
+            "PRIMARY KEY (kind, item_id)) WITHOUT ROWID"
+        )
+        # 记录已经导入过的历史数据文件，每个文件只导入一次
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imported_sources (source TEXT PRIMARY KEY)")
+        self._conn.commit()
+        self._bloom_capacity = bloom_capacity
+        self._bloom_error_rate = bloom_error_rate
+        self._bloom: Optional[BloomFilter] = None
+
+    @staticmethod
+    def _bloom_key(kind: str, item_id: str) -> str:
+        return f"{kind}:{item_id}"
+
+    def _get_bloom(self) -> Optional[BloomFilter]:
+        """
+        首次查询时流式扫描一遍索引表构建布隆过滤器，扫描过程中不保留ID
+        Returns:
+
+        """
+        if self._bloom is None and self._bloom_capacity > 0:
+            bloom = BloomFilter(self._bloom_capacity, self._bloom_error_rate)
+            for kind, item_id in self._conn.execute("SELECT kind, item_id FROM seen"):
+                bloom.add(self._bloom_key(kind, item_id))
+            self._bloom = bloom
+        return self._bloom
+
+    def contains(self, kind: str, item_id) -> bool:
+        """
+        判断ID是否已经爬取过
+        Args:
+            kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+            item_id: 帖子/视频ID
+
+        Returns:
+
+        """
+        item_id = str(item_id)
+        bloom = self._get_bloom()
+        if bloom is not None and self._bloom_key(kind, item_id) not in bloom:
+            return False
+        row = self._conn.execute("SELECT 1 FROM seen WHERE kind = ? AND item_id = ?", (kind, item_id)).fetchone()
+        return row is not None
+
+    def filter_unseen(self, kind: str, item_ids: Iterable) -> List:
+        """
+        过滤掉已经爬取过的ID，保持原有顺序
+        Args:
+            kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+            item_ids: ID列表
+
+        Returns:
+
+        """
+        return [item_id for item_id in item_ids if not self.contains(kind, item_id)]
+
+    def add_many(self, kind: str, item_ids: Iterable) -> None:
+        """
+        记录已经爬取过的ID，重复记录会被忽略
+        Args:
+            kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+            item_ids: ID列表
+
+        Returns:
+
+        """
+        # 分批写入，导入历史数据时不需要把全部ID读入内存
+        item_ids = (str(item_id) for item_id in item_ids if item_id)
+        while True:
+            batch = list(itertools.islice(item_ids, 10000))
+            if not batch:
+                break
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (kind, item_id) VALUES (?, ?)",
+                [(kind, item_id) for item_id in batch],
+            )
+            if self._bloom is not None:
+                for item_id in batch:
+                    self._bloom.add(self._bloom_key(kind, item_id))
+        self._conn.commit()
+
+    def add(self, kind: str, item_id) -> None:
+        self.add_many(kind, [item_id])
+
+    def import_once(self, source: str, kind: str, load_ids: Callable[[], Iterable]) -> bool:
+        """
+        把已有数据文件中的ID导入索引，同一个来源只导入一次，用于兼容开启索引之前爬取的数据
+        Args:
+            source: 数据来源标识，一般为文件路径
+            kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+            load_ids: 读取ID列表的函数，已经导入过时不会调用
+
+        Returns:
+            本次是否执行了导入
+        """
+        row = self._conn.execute("SELECT 1 FROM imported_sources WHERE source = ?", (source,)).fetchone()
+        if row is not None:
+            return False
+        self.add_many(kind, load_ids())
+        self._conn.execute("INSERT OR IGNORE INTO imported_sources (source) VALUES (?)", (source,))
+        self._conn.commit()
+        return True
+
+    def count(self, kind: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM seen WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_seen_indexes: Dict[str, SeenIndex] = {}
+
+
+def get_seen_index(platform: str) -> Optional[SeenIndex]:
+    """
+    获取平台的已爬取索引，保存在 data/{platform}/seen_index.db，未开启 ENABLE_SEEN_INDEX 时返回None
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    if not config.ENABLE_SEEN_INDEX:
+        return None
+    if platform not in _seen_indexes:
+        _seen_indexes[platform] = SeenIndex(
+            f"data/{platform}/seen_index.db",
+            bloom_capacity=config.SEEN_INDEX_BLOOM_CAPACITY,
+            bloom_error_rate=config.SEEN_INDEX_BLOOM_ERROR_RATE,
+        )
+    return _seen_indexes[platform]
+
+
+def is_seen(platform: str, kind: str, item_id) -> bool:
+    """
+    判断帖子/视频是否已经爬取过详情（SEEN_KIND_CONTENT）或评论（SEEN_KIND_COMMENT），未开启索引时总是返回False
+    Args:
+        platform: 平台名称
+        kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+        item_id: 帖子/视频ID
+
+    Returns:
+
+    """
+    seen_index = get_seen_index(platform)
+    return bool(item_id) and seen_index is not None and seen_index.contains(kind, item_id)
+
+
+def filter_unseen(platform: str, kind: str, item_ids: Iterable) -> List:
+    """
+    过滤掉已经爬取过详情或评论的帖子/视频ID，保持原有顺序，未开启索引时原样返回
+    Args:
+        platform: 平台名称
+        kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+        item_ids: 帖子/视频ID列表
+
+    Returns:
+
+    """
+    item_ids = list(item_ids)
+    seen_index = get_seen_index(platform)
+    if seen_index is None:
+        return item_ids
+    unseen_ids = seen_index.filter_unseen(kind, item_ids)
+    if len(unseen_ids) < len(item_ids):
+        utils.logger.info(
+            f"[seen_index.filter_unseen] {platform} skip {len(item_ids) - len(unseen_ids)} already crawled {kind} ids"
+        )
+    return unseen_ids
+
+
+def mark_seen(platform: str, kind: str, *item_ids) -> None:
+    """
+    记录帖子/视频已经爬取过，由 tools.store_write_queue 在数据真正保存后调用，所以对所有存储方式都生效
+    Args:
+        platform: 平台名称
+        kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+        *item_ids: 帖子/视频ID，同一个内容有多种ID（如B站的 aid 和 bvid）时一起记录
+
+    Returns:
+
+    """
+    seen_index = get_seen_index(platform)
+    if seen_index is not None:
+        seen_index.add_many(kind, item_ids)
+
+
+def close_seen_indexes() -> None:
+    for seen_index in _seen_indexes.values():
+        seen_index.close()
+    _seen_indexes.clear()
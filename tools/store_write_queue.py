@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025 relakkes@gmail.com
+#
+# This file is part of MediaCrawler project.
+# Repository: https://github.com/NanmiCoder/MediaCrawler/blob/main/tools/store_write_queue.py
+# GitHub: https://github.com/NanmiCoder
+# Licensed under NON-COMMERCIAL LEARNING LICENSE 1.1
+#
+
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 存储写入队列（write-behind），爬虫投递数据后立即返回，由后台写入任务按 (平台, 数据类型) 分组批量写入存储
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import config
+from base.base_crawler import AbstractStore
+from tools import utils
+from tools.seen_index import mark_seen
+
+# 数据类型 -> 存储的批量写入方法
+BATCH_METHODS = {
+    "contents": "store_contents",
+    "comments": "store_comments",
+    "creators": "store_creators",
+}
+
+# 只用于记录已爬取索引、没有数据要写入的队列项的数据类型
+SEEN_MARKER = "seen"
+
+
+@dataclass
+class SeenMark:
+    """
+    数据真正写入成功后再记录到已爬取索引：关联的 remaining 条数据全部写入成功后调用 mark_seen
+    任意一条写入失败时不再记录，断点续爬时这些帖子/视频会重新爬取
+    kind 为 None 时只关联帖子/视频ID、不记录索引（评论），写入失败时之后投递的这些ID的 SEEN_MARKER 也不再记录
+    """
+    platform: str
+    kind: Optional[str]
+    item_ids: Tuple
+    remaining: int = 1
+    failed: bool = False
+
+    def written(self) -> None:
+        self.remaining -= 1
+        if self.remaining <= 0 and not self.failed and self.kind:
+            mark_seen(self.platform, self.kind, *self.item_ids)
+
+
+# (平台, 数据类型, 存储实例, 数据, 写入成功后记录的已爬取索引)
+QueueItem = Tuple[str, str, Optional[AbstractStore], Optional[Dict], Optional[SeenMark]]
+
+
+class StoreWriteQueue:
+    """
+    有界的存储写入队列：一个后台写入任务从队列中取数据，把当前已积压的数据（最多 batch_size 条）按 (平台, 数据类型) 分组，
+    调用存储的批量写入方法一次写入；队列满时投递数据的爬虫会等待，避免存储跟不上时数据在内存中无限积压
+    """
+
+    def __init__(self, max_size: Optional[int] = None, batch_size: Optional[int] = None):
+        self.max_size = max_size if max_size is not None else config.STORE_WRITE_QUEUE_SIZE
+        self.batch_size = batch_size or config.STORE_WRITE_BATCH_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # 已经从队列取出、还没有写入完成的数据，进程被信号中断时由 drain 补写
+        self._pending: List[QueueItem] = []
+        self.written_count = 0
+        self.failed_count = 0
+        # 写入失败的数据关联的 (平台, 帖子/视频ID)，之后的 SEEN_MARKER 不再记录这些ID
+        self._failed_ids: Set[Tuple[str, str]] = set()
+
+    def _ensure_writer(self) -> None:
+        """
+        首次投递数据时再创建队列和写入任务，保证它们绑定在爬虫运行的事件循环上
+        Returns:
+
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer(), name="store-write-behind-writer")
+
+    async def put(
+        self,
+        platform: str,
+        item_type: str,
+        store: AbstractStore,
+        item: Dict,
+        seen_mark: Optional[SeenMark] = None,
+    ) -> None:
+        """
+        投递一条待写入的数据，队列满时等待
+        Args:
+            platform: 平台名称
+            item_type: 数据类型，contents | comments | creators
+            store: 最终写入的存储实例
+            item: 数据
+            seen_mark: 写入成功后记录的已爬取索引
+
+        Returns:
+
+        """
+        self._ensure_writer()
+        await self._queue.put((platform, item_type, store, item, seen_mark))
+
+    async def put_seen_marker(self, seen_mark: SeenMark) -> None:
+        """
+        投递一个已爬取索引记录，在它之前投递的数据全部写入后才记录，这些ID关联的数据写入失败时不记录
+        Args:
+            seen_mark: 已爬取索引记录
+
+        Returns:
+
+        """
+        self._ensure_writer()
+        await self._queue.put((seen_mark.platform, SEEN_MARKER, None, None, seen_mark))
+
+    async def _writer(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._pending = batch
+            try:
+                await self._write_batch(batch)
+            finally:
+                self._pending = []
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_batch(self, batch: List[QueueItem]) -> None:
+        groups: Dict[Tuple[str, str], List[QueueItem]] = {}
+        seen_markers: List[SeenMark] = []
+        for queue_item in batch:
+            if queue_item[1] == SEEN_MARKER:
+                seen_markers.append(queue_item[4])
+            else:
+                groups.setdefault(queue_item[:2], []).append(queue_item)
+        for (platform, item_type), group in groups.items():
+            store = group[0][2]
+            items = [queue_item[3] for queue_item in group]
+            seen_marks = [queue_item[4] for queue_item in group if queue_item[4] is not None]
+            try:
+                await self._write_group(store, item_type, items)
+            except Exception as e:
+                self.failed_count += len(items)
+                utils.logger.error(
+                    f"[StoreWriteQueue._write_batch] write {len(items)} {platform} {item_type} error: {e}, "
+                    f"they are not marked as crawled and will be crawled again next run"
+                )
+                for seen_mark in seen_marks:
+                    seen_mark.failed = True
+                    self._failed_ids.update((platform, str(item_id)) for item_id in seen_mark.item_ids)
+                continue
+            self.written_count += len(items)
+            for seen_mark in seen_marks:
+                seen_mark.written()
+        # 同一批的数据都写完后再处理 SEEN_MARKER，保证它之前投递的数据已经写入
+        for seen_mark in seen_markers:
+            if any((seen_mark.platform, str(item_id)) in self._failed_ids for item_id in seen_mark.item_ids):
+                continue
+            seen_mark.written()
+
+    async def _write_group(self, store: AbstractStore, item_type: str, items: List[Dict]) -> None:
+        """
+        调用存储的批量写入方法，失败时重试 STORE_WRITE_MAX_RETRIES 次，仍然失败时抛出异常
+        Args:
+            store: 存储实例
+            item_type: 数据类型
+            items: 数据
+
+        Returns:
+
+        """
+        for attempt in range(config.STORE_WRITE_MAX_RETRIES + 1):
+            try:
+                await getattr(store, BATCH_METHODS[item_type])(items)
+                return
+            except Exception as e:
+                if attempt >= config.STORE_WRITE_MAX_RETRIES:
+                    raise
+                utils.logger.warning(
+                    f"[StoreWriteQueue._write_group] write {len(items)} {item_type} error: {e}, retry {attempt + 1}"
+                )
+                await asyncio.sleep(config.STORE_WRITE_RETRY_WAIT_SEC * (attempt + 1))
+
+    async def drain(self) -> None:
+        """
+        等待队列中所有数据写入完成，然后停止写入任务，可以重复调用
+        被信号中断时写入任务所在的事件循环已经停止，此时在当前事件循环中直接写入剩余的数据
+        Returns:
+
+        """
+        if self._queue is None:
+            return
+        writer_task = self._writer_task
+        writer_loop = writer_task.get_loop() if writer_task else None
+        if writer_task and not writer_task.done() and writer_loop is asyncio.get_running_loop():
+            await self._queue.join()
+            writer_task.cancel()
+            await asyncio.gather(writer_task, return_exceptions=True)
+        else:
+            leftover = self._pending + [self._queue.get_nowait() for _ in range(self._queue.qsize())]
+            self._pending = []
+            if leftover:
+                await self._write_batch(leftover)
+        if self.written_count or self.failed_count:
+            utils.logger.info(
+                f"[StoreWriteQueue.drain] store write finished, "
+                f"written: {self.written_count}, failed: {self.failed_count}"
+            )
+        self._queue = None
+        self._writer_task = None
+        self._failed_ids.clear()
+
+
+_store_write_queue: Optional[StoreWriteQueue] = None
+
+
+def get_store_write_queue() -> StoreWriteQueue:
+    global _store_write_queue
+    if _store_write_queue is None:
+        _store_write_queue = StoreWriteQueue()
+    return _store_write_queue
+
+
+async def close_store_write_queue() -> None:
+    """
+    写入队列中剩余的所有数据，运行结束或收到中断信号时调用，需要在关闭 JSONL/CSV 写入器之前调用
+    Returns:
+
+    """
+    global _store_write_queue
+    if _store_write_queue is None:
+        return
+    try:
+        await _store_write_queue.drain()
+    finally:
+        _store_write_queue = None
+
+
+class WriteBehindStore(AbstractStore):
+    """
+    包装一个存储实例：store_content/store_comment(s)/store_creator 投递到写入队列后立即返回，
+    其它方法（如 B站的 store_contact、store_dynamic）直接转发给被包装的存储
+    """
+
+    def __init__(self, platform: str, store: AbstractStore):
+        self.platform = platform
+        self.store = store
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    async def store_content(self, content_item: Dict):
+        await get_store_write_queue().put(self.platform, "contents", self.store, content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        await get_store_write_queue().put(self.platform, "comments", self.store, comment_item)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        for comment_item in comment_items:
+            await self.store_comment(comment_item)
+
+    async def store_creator(self, creator: Dict):
+        await get_store_write_queue().put(self.platform, "creators", self.store, creator)
+
+    async def flush(self):
+        await self.store.flush()
+
+    async def close(self):
+        await self.store.close()
+
+
+def wrap_write_behind(platform: str, store: AbstractStore) -> AbstractStore:
+    """
+    开启 ENABLE_STORE_WRITE_BEHIND 时给存储实例套上写入队列，各平台的 StoreFactory 创建存储时调用
+    Args:
+        platform: 平台名称
+        store: 存储实例
+
+    Returns:
+
+    """
+    if not config.ENABLE_STORE_WRITE_BEHIND:
+        return store
+    return WriteBehindStore(platform, store)
+
+
+async def store_and_mark_seen(
+    store: AbstractStore,
+    item_type: str,
+    items: List[Dict],
+    platform: str,
+    kind: Optional[str],
+    *item_ids,
+) -> None:
+    """
+    写入数据，数据真正保存成功后才记录到已爬取索引，各平台的存储层保存帖子/视频时调用
+    开启写入队列时由后台写入任务在批量写入成功后记录，写入失败的数据不会被记录，断点续爬时会重新爬取
+    Args:
+        store: 存储实例
+        item_type: 数据类型，contents | comments | creators
+        items: 数据
+        platform: 平台名称
+        kind: SEEN_KIND_CONTENT，为 None 时不记录索引，只关联帖子/视频ID
+        *item_ids: 帖子/视频ID
+
+    Returns:
+
+    """
+    if isinstance(store, WriteBehindStore) and items:
+        seen_mark = SeenMark(platform, kind, item_ids, remaining=len(items))
+        for item in items:
+            await get_store_write_queue().put(platform, item_type, store.store, item, seen_mark)
+        return
+    await getattr(store, BATCH_METHODS[item_type])(items)
+    if kind:
+        mark_seen(platform, kind, *item_ids)
+
+
+async def store_comments_of(store: AbstractStore, items: List[Dict], platform: str, *item_ids) -> None:
+    """
+    写入一批评论，各平台的存储层在每页评论保存时调用
+    评论不单独记录已爬取索引，评论分页全部爬取完成后由爬虫调用 mark_seen_after_write 记录 SEEN_KIND_COMMENT；
+    这批评论写入失败时，该帖子/视频之后的 SEEN_KIND_COMMENT 不会被记录
+    Args:
+        store: 存储实例
+        items: 评论数据
+        platform: 平台名称
+        *item_ids: 评论所属的帖子/视频ID
+
+    Returns:
+
+    """
+    await store_and_mark_seen(store, "comments", items, platform, None, *item_ids)
+
+
+async def mark_seen_after_write(platform: str, kind: str, *item_ids) -> None:
+    """
+    在已投递的数据全部写入后再记录已爬取索引，用于爬虫在评论分页全部爬取完成后记录
+    这些ID关联的数据写入失败时不会记录；未开启写入队列时直接记录
+    Args:
+        platform: 平台名称
+        kind: SEEN_KIND_CONTENT | SEEN_KIND_COMMENT
+        *item_ids: 帖子/视频ID
+
+    Returns:
+
+    """
+    if not config.ENABLE_SEEN_INDEX:
+        return
+    if not config.ENABLE_STORE_WRITE_BEHIND:
+        mark_seen(platform, kind, *item_ids)
+        return
+    await get_store_write_queue().put_seen_marker(SeenMark(platform, kind, item_ids))
@@ -151,7 +151,7 @@ async def crawl_comments_for_notes():
                     crawled_comment_ids = []
                     
                     # 根据存储类型读取评论ID
-                    if hasattr(store, 'writer') and hasattr(store.writer, 'existing_ids'):
+                    if hasattr(store, 'writer') and hasattr(store.writer, '_get_jsonl_writer'):
                         # JSON/CSV存储方式
                         comment_file = store.writer._get_file_path('json', 'comments')
                         if os.path.exists(comment_file) and os.path.getsize(comment_file) > 0: